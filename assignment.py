@@ -0,0 +1,145 @@
+from collections import deque
+
+from pathfinding import INF
+
+try:
+    import numpy as np
+except ImportError: # Optional: the pure-Python augmentation below is used instead
+    np = None
+
+# Global robot/task assignment. Each tick the pending tasks and the idle
+# robots that bid on them form a cost matrix; a min-cost rectangular
+# assignment over it replaces the old greedy "best bidder per task, most urgent
+# task first" pass. The solver follows Jonker-Volgenant: augmenting row
+# reduction settles most rows, shortest augmenting paths the rest. Its column
+# prices and matches survive between ticks and restart the next solve, so rows
+# whose costs did not change keep their match without a new search.
+
+NO_BID = 10**9 # Cost of a robot/task pair without a bid; matched only when nothing else is left
+PRIORITY_WEIGHT = 50 # Extra cost per priority level, so scarce robots go to urgent tasks first
+NUMPY_MIN_SIZE = 64 # Below this the list-based augmentation is faster than array calls
+
+class Assigner:
+    """Min-cost assignment of rows to distinct columns, warm-started from the previous solve."""
+    def __init__(self):
+        self.prices = {} # column id -> dual price v_j from the last solve
+        self.matches = {} # row id -> column id from the last solve
+        self.augmentations = 0 # Rows that needed a shortest-path search in the last solve
+        self.transposed = False
+
+    def solve(self, row_ids, col_ids, costs):
+        """costs[i][j] is the cost of row_ids[i] on col_ids[j] (numbers; NO_BID or INF for impossible pairs).
+        Every row is matched when len(row_ids) <= len(col_ids); otherwise the problem is solved transposed.
+        Returns {row id: column id} for the matched pairs that have a real cost."""
+        transposed = len(row_ids) > len(col_ids)
+        if transposed != self.transposed: self.prices = {}; self.matches = {}; self.transposed = transposed # Warm state is per orientation
+        if transposed:
+            return {r: c for c, r in self._solve(col_ids, row_ids, [list(column) for column in zip(*costs)]).items()}
+        return self._solve(row_ids, col_ids, costs)
+
+    def _solve(self, row_ids, col_ids, costs):
+        n, m = len(row_ids), len(col_ids)
+        if not n: self.prices = {}; self.matches = {}; return {}
+        # Square it up with zero-cost dummy rows (a column matched to one stays free), so column prices need no sign
+        # constraint and any previous prices are a valid warm start
+        costs = [[NO_BID if c >= NO_BID else c for c in row] for row in costs] + [[0] * m for _ in range(m - n)]
+        rows = list(row_ids) + [("dummy", k) for k in range(m - n)]
+        col_index = {cid: j for j, cid in enumerate(col_ids)}
+        v = [self.prices.get(cid, 0) for cid in col_ids]
+        row_match = [-1] * m; col_match = [-1] * m
+        top_price = max(v) # Dummy rows all cost 0, so their cheapest reduced cost is -top_price
+        for i, rid in enumerate(rows): # Keep last solve's matches that are still cheapest in their row
+            j = col_index.get(self.matches.get(rid))
+            if j is None or col_match[j] != -1: continue
+            row = costs[i]
+            if (v[j] == top_price if i >= n else row[j] - v[j] <= min([c - p for c, p in zip(row, v)])): row_match[i] = j; col_match[j] = i
+        free_rows = [i for i in range(m) if row_match[i] == -1]
+        if np is not None and m >= NUMPY_MIN_SIZE and free_rows:
+            matrix = np.array(costs, dtype=float); prices = np.array(v, dtype=float)
+            row_array = np.array(row_match); col_array = np.array(col_match)
+            left = _reduce_rows(free_rows, lambda i: _two_cheapest_numpy(matrix[i] - prices), prices, row_array, col_array, 2 * m)
+            for i0 in left: _augment_numpy(i0, matrix, prices, row_array, col_array)
+            v = prices.tolist(); row_match = row_array.tolist()
+        else:
+            left = _reduce_rows(free_rows, lambda i: _two_cheapest([c - p for c, p in zip(costs[i], v)]), v, row_match, col_match, 2 * m)
+            for i0 in left: _augment(i0, costs, v, row_match, col_match)
+        self.augmentations = len(left)
+        self.prices = {cid: v[j] for j, cid in enumerate(col_ids)}
+        self.matches = {rid: col_ids[row_match[i]] for i, rid in enumerate(rows)}
+        return {rid: col_ids[row_match[i]] for i, rid in enumerate(row_ids) if costs[i][row_match[i]] < NO_BID}
+
+# --- Augmenting Row Reduction ---
+def _two_cheapest(reduced):
+    u1 = min(reduced); j1 = reduced.index(u1)
+    if len(reduced) == 1: return j1, u1, j1, u1
+    reduced[j1] = INF; u2 = min(reduced); return j1, u1, reduced.index(u2), u2
+
+def _two_cheapest_numpy(reduced):
+    if len(reduced) == 1: return 0, reduced[0], 0, reduced[0]
+    j1, j2 = np.argpartition(reduced, 1)[:2]
+    if reduced[j2] < reduced[j1]: j1, j2 = j2, j1
+    return int(j1), reduced[j1], int(j2), reduced[j2]
+
+def _reduce_rows(free_rows, two_cheapest, v, row_match, col_match, budget):
+    """Jonker-Volgenant augmenting row reduction: each free row grabs its cheapest column and lowers that column's
+    price to its runner-up, evicting the previous owner (an auction round without epsilon). Every match stays a
+    cheapest edge of its row. Returns the rows still free after budget steps, for the augmenting-path phase."""
+    queue = deque(free_rows); left = []
+    while queue and budget:
+        i = queue.popleft(); budget -= 1
+        j1, u1, j2, u2 = two_cheapest(i); owner = col_match[j1]
+        if u1 < u2: v[j1] -= u2 - u1
+        elif owner != -1: j1 = j2; owner = col_match[j2] # Tie: the runner-up is just as cheap
+        row_match[i] = j1; col_match[j1] = i
+        if owner != -1:
+            row_match[owner] = -1
+            if u1 < u2: queue.appendleft(owner)
+            else: left.append(owner)
+    return left + list(queue)
+
+# --- Augmenting Paths ---
+def _augment(i0, costs, v, row_match, col_match):
+    """Dijkstra over reduced costs from free row i0 to the nearest free column, then flips the path."""
+    m = len(v)
+    d = [c - p for c, p in zip(costs[i0], v)]; pred = [i0] * m
+    finished = []; todo = list(range(m))
+    while True:
+        mu = min([d[j] for j in todo])
+        ready = [j for j in todo if d[j] == mu]
+        end = next((j for j in ready if col_match[j] == -1), -1)
+        if end != -1: break
+        finished.extend(ready); ready_set = set(ready); todo = [j for j in todo if j not in ready_set]
+        for j in ready: # Relax through the rows owning the newly finished columns
+            i = col_match[j]; row = costs[i]; h = row[j] - v[j] - mu
+            for k, nd in [(k, nd) for k in todo if (nd := row[k] - v[k] - h) < d[k]]: d[k] = nd; pred[k] = i
+    for j in finished: v[j] += d[j] - mu
+    _flip(i0, end, pred, row_match, col_match)
+
+def _augment_numpy(i0, costs, v, row_match, col_match):
+    """_augment() with whole-row array operations; costs and v are float arrays, the matches int arrays."""
+    d = costs[i0] - v; pred = np.full(len(v), i0); todo = np.ones(len(v), dtype=bool); finished = ~todo
+    while True:
+        mu = d[todo].min(); ready = np.flatnonzero(todo & (d == mu))
+        free = ready[col_match[ready] == -1]
+        if free.size: end = int(free[0]); break
+        todo[ready] = False; finished[ready] = True
+        owners = col_match[ready] # Relax through all newly finished columns' rows at once
+        candidates = costs[owners] - v - (costs[owners, ready] - v[ready] - mu)[:, None]
+        best = candidates.argmin(axis=0); nd = candidates[best, np.arange(len(v))]
+        better = todo & (nd < d); d[better] = nd[better]; pred[better] = owners[best[better]]
+    v[finished] += d[finished] - mu
+    _flip(i0, end, pred, row_match, col_match)
+
+def _flip(i0, end, pred, row_match, col_match):
+    j = end
+    while True:
+        i = int(pred[j]); col_match[j] = i; j, row_match[i] = int(row_match[i]), j
+        if i == i0: break
+
+def greedy_assignment(row_ids, col_ids, costs, order=None):
+    """The old pass: rows in the given order each take their cheapest still-free column."""
+    taken = set(); result = {}
+    for i in (order if order is not None else range(len(row_ids))):
+        best = min((j for j in range(len(col_ids)) if j not in taken and costs[i][j] < NO_BID), key=costs[i].__getitem__, default=None)
+        if best is not None: taken.add(best); result[row_ids[i]] = col_ids[best]
+    return result
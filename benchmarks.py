@@ -0,0 +1,277 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+from assignment import NO_BID, PRIORITY_WEIGHT, Assigner, greedy_assignment
+from hierarchical import hpa
+from occupancy import OccupancyIndex
+from pathfinding import INF, DistanceField, Grid, astar, jps
+from simulation import Simulation
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Benchmarks for the simulation engine. Every map and query set is generated
+# from a fixed seed so numbers stay comparable between runs and machines. The
+# "suite" benchmark times the hot paths as machine-readable JSON and compares
+# a run against a stored baseline, for catching regressions.
+
+SUITE_REPEAT = 5 # Timed repetitions per suite case; the median is reported
+REGRESSION_THRESHOLD = 0.10 # Slowdown over the baseline that counts as a regression
+
+# --- Map Generators ---
+def floor_plan(size, seed=0, ward=24, corridor=3, lobby_ratio=0.2):
+    """Hospital-like floor: blocks of walled rooms separated by corridors, with some blocks left open as lobbies."""
+    rng = random.Random(seed); grid = Grid(size, size)
+    for top in range(0, size, ward):
+        for left in range(0, size, ward):
+            if rng.random() < lobby_ratio: continue # Open lobby
+            r0, r1 = top + corridor, min(top + ward, size) - 1
+            c0, c1 = left + corridor, min(left + ward, size) - 1
+            if r1 - r0 < 4 or c1 - c0 < 4: continue
+            for c in range(c0, c1 + 1): grid[r0][c] = 1; grid[r1][c] = 1
+            for r in range(r0, r1 + 1): grid[r][c0] = 1; grid[r][c1] = 1
+            for c in range(c0 + 7, c1 - 2, 7): # Room dividers
+                for r in range(r0, r1 + 1): grid[r][c] = 1
+            for c in range(c0 + 1, c1 - 1, 7): # One door per room, top or bottom
+                door_c = min(c + rng.randrange(5), c1 - 1)
+                grid[r0 if rng.random() < 0.5 else r1][door_c] = 0
+    return grid
+
+def random_map(size, density, seed=0):
+    """Uniform random obstacles covering density of the cells."""
+    rng = random.Random(seed)
+    return Grid(size, size, bytes(1 if rng.random() < density else 0 for _ in range(size * size)))
+
+def random_free_cell(grid, rng):
+    while True:
+        r = rng.randrange(grid.rows); c = rng.randrange(grid.cols)
+        if grid[r][c] == 0: return (r, c)
+
+def long_queries(grid, count, seed=0):
+    """Pairs of free cells at least half the map apart."""
+    rng = random.Random(seed); queries = []
+    while len(queries) < count:
+        a = random_free_cell(grid, rng); b = random_free_cell(grid, rng)
+        if abs(a[0] - b[0]) + abs(a[1] - b[1]) >= grid.rows // 2: queries.append((a, b))
+    return queries
+
+def timed(fn, *args):
+    start = time.perf_counter(); result = fn(*args); return result, time.perf_counter() - start
+
+# --- Benchmarks ---
+def bench_jps(sizes=(256, 1024), queries=5, seed=0):
+    """A* vs Jump Point Search on generated floor plans; checks both return the same path cost."""
+    print(f"{'map':>10} {'query':>5} {'cost':>7} {'A* ms':>9} {'A* nodes':>9} {'JPS ms':>8} {'JPS nodes':>9} {'speedup':>8}")
+    for size in sizes:
+        grid = floor_plan(size, seed)
+        astar(grid, (0, 0), (0, 0)); jps(grid, (0, 0), (0, 0)) # Allocate search arrays outside the timings
+        total_astar = total_jps = 0.0
+        for n, (start, goal) in enumerate(long_queries(grid, queries, seed)):
+            (_, astar_cost), astar_time = timed(astar, grid, start, goal, INF)
+            (_, jps_cost), jps_time = timed(jps, grid, start, goal, INF)
+            if astar_cost != jps_cost: raise AssertionError(f"JPS cost {jps_cost} != A* cost {astar_cost} for {start}->{goal}")
+            total_astar += astar_time; total_jps += jps_time
+            print(f"{size:>4}x{size:<5} {n:>5} {astar_cost:>7} {astar_time*1000:>9.1f} {grid.searcher.nodes_expanded:>9} "
+                  f"{jps_time*1000:>8.1f} {grid.jump_searcher.nodes_expanded:>9} {astar_time/jps_time:>7.1f}x")
+        print(f"{size:>4}x{size:<5} {'all':>5} {'':>7} {total_astar*1000:>9.1f} {'':>9} {total_jps*1000:>8.1f} {'':>9} {total_astar/total_jps:>7.1f}x")
+
+def bench_cooperative(fleet_sizes=(3, 6, 10), ticks=3000, task_rate=1.0, seed=0):
+    """Reactive waiting vs cooperative space-time planning: deliveries and wait-ticks per delivery."""
+    print(f"{'robots':>6} {'mode':>12} {'deliveries':>10} {'wait-ticks':>10} {'waits/deliv':>11} {'deliv/min':>9} {'wall s':>7}")
+    for robots in fleet_sizes:
+        for cooperative in (False, True):
+            sim = Simulation(seed=seed, task_rate=task_rate, robot_count=robots, cooperative=cooperative)
+            _, wall = timed(sim.run, ticks)
+            print(f"{robots:>6} {'cooperative' if cooperative else 'reactive':>12} {sim.deliveries:>10} {sim.wait_ticks:>10} "
+                  f"{sim.wait_ticks / max(1, sim.deliveries):>11.1f} {sim.deliveries / (sim.now / 60):>9.2f} {wall:>7.2f}")
+
+def bench_hpa(sizes=(256, 1024), queries=5, seed=0, cluster_size=16):
+    """A* vs HPA*: one-off abstraction build, per-query time, path-cost overhead and the cost of one obstacle toggle."""
+    print(f"{'map':>10} {'build s':>8} {'A* ms':>9} {'HPA* ms':>9} {'speedup':>8} {'worst cost':>10} {'toggle ms':>9}")
+    for size in sizes:
+        grid = floor_plan(size, seed); astar(grid, (0, 0), (0, 0))
+        _, build = timed(hpa, grid, (0, 0), (0, 0), None, cluster_size)
+        total_astar = total_hpa = 0.0; worst = 1.0
+        for start, goal in long_queries(grid, queries, seed):
+            (_, astar_cost), astar_time = timed(astar, grid, start, goal, INF)
+            (_, hpa_cost), hpa_time = timed(hpa, grid, start, goal, None, cluster_size)
+            if (astar_cost == INF) != (hpa_cost == INF): raise AssertionError(f"HPA* and A* disagree on reachability for {start}->{goal}")
+            total_astar += astar_time; total_hpa += hpa_time
+            if astar_cost not in (0, INF): worst = max(worst, hpa_cost / astar_cost)
+        cell = random_free_cell(grid, random.Random(seed)); grid[cell[0]][cell[1]] = 1
+        _, toggle = timed(hpa, grid, (0, 0), (0, 0), None, cluster_size) # Repairs only the clusters around cell
+        grid[cell[0]][cell[1]] = 0
+        print(f"{size:>4}x{size:<5} {build:>8.2f} {total_astar*1000:>9.1f} {total_hpa*1000:>9.1f} {total_astar/total_hpa:>7.1f}x "
+              f"{worst:>9.3f}x {toggle*1000:>9.1f}")
+
+def bench_assignment(shapes=((10, 10), (100, 100), (500, 500), (500, 100), (100, 500)), size=128, waypoints=24, seed=0):
+    """Greedy pass vs optimal matching on robots x tasks bid matrices over a floor plan: total travel and solve time.
+    The warm column re-solves after a tenth of the tasks were replaced, as the next tick would."""
+    print(f"{'robots':>6} {'tasks':>5} {'greedy travel':>13} {'optimal travel':>14} {'saved':>6} {'greedy ms':>9} {'cold ms':>8} {'warm ms':>8}")
+    rng = random.Random(seed); grid = floor_plan(size, seed)
+    fields = [DistanceField(grid, random_free_cell(grid, rng)) for _ in range(waypoints)]
+    for robot_count, task_count in shapes:
+        robots = [(random_free_cell(grid, rng), rng.uniform(20, 100)) for _ in range(robot_count)]
+        tasks = [(rng.randrange(waypoints), rng.randint(1, 5)) for _ in range(task_count)]
+        def cost(w, prio, pos, energy): # Same terms as Simulation.place_bids() plus the priority weight, as integers
+            distance = fields[w].cost_from(pos)
+            return NO_BID if distance == INF else round((distance + (100 - energy) / 10 + prio * 5 + prio * PRIORITY_WEIGHT) * 100)
+        matrix = lambda: [[cost(w, prio, pos, energy) for pos, energy in robots] for w, prio in tasks]
+        costs = matrix(); task_ids = list(range(task_count)); robot_ids = list(range(robot_count))
+        travel = lambda matches: sum(fields[tasks[t][0]].cost_from(robots[r][0]) for t, r in matches.items())
+        order = sorted(task_ids, key=lambda t: tasks[t][1])
+        greedy, greedy_time = timed(greedy_assignment, task_ids, robot_ids, costs, order)
+        assigner = Assigner(); optimal, cold_time = timed(assigner.solve, task_ids, robot_ids, costs)
+        if len(optimal) < len(greedy): raise AssertionError("optimal matching served fewer tasks than greedy")
+        greedy_travel, optimal_travel = travel(greedy), travel(optimal)
+        for t in rng.sample(task_ids, max(1, task_count // 10)): tasks[t] = (rng.randrange(waypoints), rng.randint(1, 5))
+        costs = matrix(); _, warm_time = timed(assigner.solve, task_ids, robot_ids, costs)
+        print(f"{robot_count:>6} {task_count:>5} {greedy_travel:>13} {optimal_travel:>14} {1 - optimal_travel / greedy_travel:>5.0%} "
+              f"{greedy_time*1000:>9.1f} {cold_time*1000:>8.1f} {warm_time*1000:>8.1f}")
+
+# --- Regression Suite ---
+def measure(fn, repeat=SUITE_REPEAT, setup=None):
+    """Median and min wall seconds of fn() over repeat runs; setup() runs untimed before each one."""
+    times = []
+    for _ in range(repeat):
+        if setup: setup()
+        start = time.perf_counter(); fn(); times.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(times), "min_s": min(times), "repeat": repeat}
+
+def fleet_sim(robots, size=128, waypoints=12, task_rate=None, seed=0, fleet="objects"):
+    """Simulation of robots on a generated floor plan with waypoints random free cells (the first is ENT)."""
+    grid = floor_plan(size, seed); rng = random.Random(seed); cells = set()
+    while len(cells) < waypoints: cells.add(random_free_cell(grid, rng))
+    names = ["ENT"] + [f"W{i}" for i in range(1, waypoints)]; targets = dict(zip(names, sorted(cells)))
+    rates = {name: (task_rate if task_rate is not None else robots / 200) / (waypoints - 1) for name in names[1:]}
+    return Simulation(seed=seed, robot_count=robots, grid=grid, waypoints=targets, priorities={name: 1 + i % 5 for i, name in enumerate(names)},
+                      moving_obstacles=[], task_rates=rates, fleet=fleet)
+
+def suite_astar(sizes=(64, 256, 1024), densities=(0.1, 0.25), queries=5, seed=0):
+    results = {}
+    maps = [(f"floor{size}", floor_plan(size, seed)) for size in sizes]
+    maps += [(f"random{size}-d{density}", random_map(size, density, seed)) for size in sizes for density in densities]
+    for name, grid in maps:
+        pairs = long_queries(grid, queries, seed); astar(grid, (0, 0), (0, 0)); nodes = []
+        def run():
+            nodes.clear()
+            for start, goal in pairs: astar(grid, start, goal, INF); nodes.append(grid.searcher.nodes_expanded)
+        results[f"astar/{name}"] = dict(measure(run), queries=queries, nodes_expanded=sum(nodes))
+    return results
+
+def suite_bidding(fleet_sizes=(10, 100, 1000), seed=0):
+    """Robot.calculate_bid one robot at a time vs the batched Simulation.place_bids, for one task and a whole fleet."""
+    results = {}
+    for robots in fleet_sizes:
+        sim = fleet_sim(robots, seed=seed); fleet = list(sim.robots.values())
+        task = sim.create_task("W1"); sim.distance_fields.field("W1") # Field build is a one-off per waypoint and toggle
+        def bidding(): # What create_task() leaves behind: every idle robot wants to bid
+            task.bids = {}
+            for robot in fleet: robot.status = "BIDDING"; robot.pending_bid_task = task
+        results[f"bid/single/{robots}"] = dict(measure(lambda: [robot.calculate_bid(task) for robot in fleet], setup=bidding), robots=robots)
+        results[f"bid/batched/{robots}"] = dict(measure(lambda: sim.place_bids(task, fleet), setup=bidding), robots=robots)
+    return results
+
+def suite_assignment(shapes=((10, 10), (100, 100), (500, 500)), size=128, waypoints=24, seed=0):
+    results = {}; rng = random.Random(seed); grid = floor_plan(size, seed)
+    fields = [DistanceField(grid, random_free_cell(grid, rng)) for _ in range(waypoints)]
+    for robot_count, task_count in shapes:
+        robots = [random_free_cell(grid, rng) for _ in range(robot_count)]; tasks = [rng.randrange(waypoints) for _ in range(task_count)]
+        costs = [[NO_BID if (d := fields[w].cost_from(pos)) == INF else round(d * 100) for pos in robots] for w in tasks]
+        rows, cols = list(range(task_count)), list(range(robot_count))
+        results[f"assign/optimal-cold/{task_count}x{robot_count}"] = measure(lambda: Assigner().solve(rows, cols, costs))
+        results[f"assign/greedy/{task_count}x{robot_count}"] = measure(lambda: greedy_assignment(rows, cols, costs))
+    return results
+
+def suite_tick(fleet_sizes=(10, 100, 1000), warmup=50, ticks=20, seed=0):
+    """One full Simulation.step() at each fleet size, after warmup ticks of task traffic; with NumPy, again with the array fleet."""
+    results = {}
+    for robots in fleet_sizes:
+        for fleet in ("objects", "arrays") if np is not None else ("objects",):
+            sim = fleet_sim(robots, seed=seed, fleet=fleet); sim.run(warmup)
+            stats = measure(lambda: sim.run(ticks), repeat=3); name = f"tick/{robots}" + ("/arrays" if fleet == "arrays" else "")
+            results[name] = dict(stats, median_s=stats["median_s"] / ticks, min_s=stats["min_s"] / ticks, robots=robots, ticks=ticks)
+    return results
+
+def suite_crowd(crowd_sizes=(100, 1000), size=128, window=16, seed=0):
+    """Crowd.update() and a cooperative-planner forecast at each crowd size, walkers moving every tick."""
+    from crowd import Crowd
+    results = {}; grid = floor_plan(size, seed)
+    for agents in crowd_sizes:
+        crowd = Crowd(size, size, seed); crowd.scatter(grid, agents); crowd.bind(grid, OccupancyIndex(size, size).obstacles)
+        results[f"crowd/update/{agents}"] = dict(measure(crowd.update), agents=agents)
+        def forecast(): crowd.tick += 1; crowd.forecast(window) # A new tick each time, past the cache
+        results[f"crowd/forecast/{agents}"] = dict(measure(forecast), agents=agents, window=window)
+    return results
+
+def run_suite(quick=False, seed=0):
+    """Every suite case as {name: {"median_s", "min_s", "repeat", extra counters}}; quick drops the largest sizes."""
+    sizes = (64, 256) if quick else (64, 256, 1024); fleets = (10, 100) if quick else (10, 100, 1000)
+    shapes = ((10, 10), (100, 100)) if quick else ((10, 10), (100, 100), (500, 500))
+    results = {}
+    parts = [suite_astar(sizes, seed=seed), suite_bidding(fleets, seed), suite_assignment(shapes, seed=seed), suite_tick(fleets, seed=seed)]
+    if np is not None: parts.append(suite_crowd((100,) if quick else (100, 1000), seed=seed))
+    for part in parts: results.update(part)
+    meta = {"python": platform.python_version(), "implementation": platform.python_implementation(), "machine": platform.machine(),
+            "numpy": np.__version__ if np is not None else None, "seed": seed, "quick": quick, "created": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    return {"meta": meta, "results": results}
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """Per-case ratio of best-of-repeat times, current / baseline (the minimum is the least noisy statistic).
+    Returns (rows, regressions) with rows (name, baseline s, current s, ratio)."""
+    rows = []; regressions = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None: rows.append((name, None, result["min_s"], None)); continue
+        ratio = result["min_s"] / base["min_s"] if base["min_s"] else float("inf")
+        rows.append((name, base["min_s"], result["min_s"], ratio))
+        if ratio > 1 + threshold: regressions.append(name)
+    return rows, regressions
+
+def print_suite(report, comparison=None):
+    print(f"{'case':<32} {'median ms':>10} {'min ms':>9} {'base min ms':>12} {'ratio':>7}")
+    baselines = {name: (base, ratio) for name, base, _, ratio in comparison[0]} if comparison else {}
+    for name, result in report["results"].items():
+        base, ratio = baselines.get(name, (None, None))
+        print(f"{name:<32} {result['median_s']*1000:>10.3f} {result['min_s']*1000:>9.3f} "
+              f"{'' if base is None else f'{base*1000:.3f}':>12} {'' if ratio is None else f'{ratio:.2f}x':>7}"
+              f"{'  REGRESSION' if comparison and name in comparison[1] else ''}")
+
+BENCHMARKS = {"jps": bench_jps, "cooperative": bench_cooperative, "hpa": bench_hpa, "assignment": bench_assignment, "suite": run_suite}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulation engine benchmarks.")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[256, 1024])
+    parser.add_argument("--queries", type=int, default=5)
+    parser.add_argument("--robots", type=int, nargs="+", default=[3, 6, 10])
+    parser.add_argument("--ticks", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quick", action="store_true", help="suite: skip the largest maps, fleets and matrices")
+    parser.add_argument("--json", metavar="PATH", help="suite: write the results as JSON (usable as a later --baseline)")
+    parser.add_argument("--baseline", metavar="PATH", help="suite: compare against a stored JSON result; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="suite: slowdown ratio over baseline that fails")
+    args = parser.parse_args(argv)
+    if args.benchmark == "suite":
+        report = run_suite(args.quick, args.seed); comparison = None
+        if args.json:
+            with open(args.json, "w") as f: json.dump(report, f, indent=1)
+        if args.baseline:
+            with open(args.baseline) as f: comparison = compare(report, json.load(f), args.threshold)
+        print_suite(report, comparison)
+        if comparison and comparison[1]: print(f"{len(comparison[1])} regression(s) over {args.threshold:.0%}"); return 1
+        return 0
+    if args.benchmark == "jps": bench_jps(args.sizes, args.queries, args.seed)
+    elif args.benchmark == "hpa": bench_hpa(args.sizes, args.queries, args.seed)
+    elif args.benchmark == "assignment": bench_assignment(seed=args.seed)
+    elif args.benchmark == "cooperative": bench_cooperative(args.robots, args.ticks, seed=args.seed)
+
+if __name__ == "__main__":
+    sys.exit(main())
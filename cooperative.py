@@ -0,0 +1,139 @@
+import copy
+import heapq
+
+from pathfinding import INF
+
+# Cooperative multi-robot planning (windowed hierarchical cooperative A*,
+# WHCA*). Robots plan in space-time one after another; each finished plan is
+# written into a shared reservation table that later planners route around.
+
+WAIT_COST = 10 # Staying put for a tick costs as much as a straight step
+WAIT = (0, 0, 0, WAIT_COST) # Same (dr, dc, index delta, cost) shape as Grid.moves
+
+# --- Space-Time Reservation Table ---
+class ReservationTable:
+    """(cell, tick) -> robot id, plus the edges robots traverse (to forbid head-on swaps)
+    and 'parked' cells that a robot holds from some tick onwards (idle robots, plan ends)."""
+    def __init__(self):
+        self.cells = {}; self.edges = {}; self.parked = {} # parked: cell -> (robot id, from tick)
+        self.owned = {} # robot id -> reserved cell keys, edge keys and parked cell
+        self.last_use = {} # cell -> last tick any timed reservation touches it (never shrinks)
+
+    def release(self, agent):
+        owned = self.owned.pop(agent, None)
+        if owned is None: return
+        cell_keys, edge_keys, parked_cell = owned
+        for key in cell_keys:
+            if self.cells.get(key) == agent: del self.cells[key]
+        for key in edge_keys:
+            if self.edges.get(key) == agent: del self.edges[key]
+        if parked_cell is not None and self.parked.get(parked_cell, (None,))[0] == agent: del self.parked[parked_cell]
+
+    def reserve(self, agent, timed_path, t0):
+        """timed_path[k] is the cell agent occupies at tick t0 + k; it stays parked on the last cell afterwards."""
+        self.release(agent)
+        cell_keys = []; edge_keys = []
+        for k, cell in enumerate(timed_path):
+            key = (cell, t0 + k); self.cells[key] = agent; cell_keys.append(key)
+            if self.last_use.get(cell, -1) < t0 + k: self.last_use[cell] = t0 + k
+            if k:
+                edge = (timed_path[k-1], cell, t0 + k); self.edges[edge] = agent; edge_keys.append(edge)
+        last = timed_path[-1]; self.parked[last] = (agent, t0 + len(timed_path) - 1)
+        self.owned[agent] = (cell_keys, edge_keys, last)
+
+    def park(self, agent, cell, t):
+        self.release(agent); self.parked[cell] = (agent, t); self.owned[agent] = ([], [], cell)
+
+    def parked_cell(self, agent):
+        owned = self.owned.get(agent)
+        return owned[2] if owned and not owned[0] else None
+
+    def is_blocked(self, cell, t, agent):
+        owner = self.cells.get((cell, t))
+        if owner is not None and owner != agent: return True
+        parked = self.parked.get(cell)
+        return parked is not None and parked[0] != agent and parked[1] <= t
+
+    def is_swap(self, from_cell, to_cell, t, agent):
+        owner = self.edges.get((to_cell, from_cell, t))
+        return owner is not None and owner != agent
+
+    def free_from(self, cell, t, agent):
+        """True if nobody else needs cell at tick t or later, so agent may stay there."""
+        if self.last_use.get(cell, -1) >= t:
+            for tt in range(t, self.last_use[cell] + 1):
+                owner = self.cells.get((cell, tt))
+                if owner is not None and owner != agent: return False
+        parked = self.parked.get(cell)
+        return parked is None or parked[0] == agent
+
+# --- Windowed Cooperative A* ---
+def forecast_obstacles(moving_obstacles, ticks, cols, size):
+    """Occupancy bitmaps of the deterministic MovingObstacles: forecast[j][r * cols + c] is set if one holds (r, c)
+    after j more updates. Same shape as Crowd.forecast(), over size cells."""
+    clones = [copy.copy(obs) for obs in moving_obstacles]; forecast = []
+    for j in range(ticks + 1):
+        if j:
+            for obs in clones: obs.update()
+        occupied = bytearray(size)
+        for r, c in (obs.pos for obs in clones): occupied[r * cols + c] = 1
+        forecast.append(occupied)
+    return forecast
+
+class CooperativePlanner:
+    """Plans windowed space-time paths against a ReservationTable."""
+    def __init__(self, grid, window=16):
+        self.grid = grid; self.window = window; self.table = ReservationTable()
+        self.nodes_expanded = 0
+
+    def plan(self, agent, start, goal, goal_field, t0, forecast):
+        """Space-time A* from start (occupied at tick t0) towards goal for up to window ticks.
+        goal_field gives the true static distance to goal and serves as the heuristic beyond the window.
+        Reserves and returns the timed path (one cell per tick, repeated cells are waits),
+        or None if the goal cannot be reached at all. forecast[k] is the moving-obstacle bitmap k ticks after t0 + 1. If every move is blocked the plan is to wait."""
+        h0 = goal_field.cost_from(start)
+        if h0 == INF: return None
+        grid = self.grid; rows, cols = grid.rows, grid.cols; cells = grid.cells; moves = grid.moves + [WAIT]
+        table = self.table; window = self.window; dist = goal_field.dist
+        reserved = table.cells.get; edges = table.edges.get; parked = table.parked.get # Inlined is_blocked / is_swap
+        goal_index = goal[0] * cols + goal[1]; s = start[0] * cols + start[1]
+        # Heap entries: (f, -k, g, k, cell index); deeper nodes first among ties
+        heap = [(h0, 0, 0, 0, s)]; parent = {(s, 0): None}; best_g = {(s, 0): 0}; closed = set(); nodes = 0; end = None
+        while heap:
+            f, _, g, k, i = heapq.heappop(heap)
+            if (i, k) in closed: continue
+            closed.add((i, k)); nodes += 1
+            if i == goal_index and table.free_from(goal, t0 + k, agent): end = (i, k); break
+            if k == window: end = (i, k); break
+            r, c = divmod(i, cols); t = t0 + k + 1; obstacles = forecast[min(k, len(forecast) - 1)]
+            here = (r, c)
+            for dr, dc, delta, cost in moves:
+                nr = r + dr; nc = c + dc
+                if nr < 0 or nr >= rows or nc < 0 or nc >= cols: continue
+                j = i + delta
+                if cells[j] == 1 and j != i: continue
+                if (j, k + 1) in closed: continue
+                if obstacles[j]: continue
+                cell = (nr, nc)
+                owner = reserved((cell, t))
+                if owner is not None and owner != agent: continue
+                owner = parked(cell)
+                if owner is not None and owner[0] != agent and owner[1] <= t: continue
+                if j != i:
+                    owner = edges((cell, here, t))
+                    if owner is not None and owner != agent: continue
+                h = dist[j] if cells[j] != 1 else goal_field.cost_from(cell)
+                if h == INF: continue
+                key = (j, k + 1); ng = g + cost
+                if ng >= best_g.get(key, INF): continue
+                best_g[key] = ng; parent[key] = (i, k)
+                heapq.heappush(heap, (ng + h, -(k + 1), ng, k + 1, j))
+        self.nodes_expanded += nodes
+        if end is None: timed_path = [start, start]
+        else:
+            timed_path = []; key = end
+            while key is not None: timed_path.append(divmod(key[0], cols)); key = parent[key]
+            timed_path.reverse()
+            if len(timed_path) == 1: timed_path.append(start)
+        table.reserve(agent, timed_path, t0)
+        return timed_path
@@ -0,0 +1,74 @@
+from egress import FleetPublisher, location_labels
+from ingest import PRIORITY_MAP, IngestQueue, decode_tasks
+from snapshot import SnapshotWriter, Snapshotter
+
+# Headless MQTT front end for the simulation engine: tasks/new payloads come
+# in through an IngestQueue and are announced to the Simulation in one batch
+# per tick; bids, robot statuses and completions go out through a
+# FleetPublisher. The client is any transport with the paho Client surface
+# (transport.py), so the same coordinator runs against a broker or in process.
+# With a snapshot path it also writes the engine state (plus its own task id
+# bookkeeping) there periodically, so a restarted process can resume the shift.
+
+TASK_NEW_TOPIC = "tasks/new"
+SNAPSHOT_INTERVAL = 60.0 # Simulated seconds between snapshots
+
+class Coordinator:
+    def __init__(self, sim, client, encoding="json", snapshot_path=None, snapshot_interval=SNAPSHOT_INTERVAL):
+        """sim may come from snapshot.load(); the task ids it was saved with are picked up again. Payloads still in the
+        ingest queue at a snapshot are not part of it (QoS 1 redelivery covers those)."""
+        self.sim = sim; self.client = client
+        self.ingest = IngestQueue()
+        self.egress = FleetPublisher(self._publish, location_labels(sim.rows, sim.cols, sim.waypoints), sim.cols, encoding)
+        self.external = {} # engine task id -> external task id, while the task is live
+        self.seen = set() # External ids of live tasks, for dedupe; dropped once the task completes or fails
+        self.rejected = 0 # Payloads dropped as malformed, invalid, duplicate or with a blocked target
+        restored = getattr(sim, "snapshot_extra", {})
+        self.external.update(restored.get("external", ())); self.seen.update(restored.get("seen", ()))
+        self.snapshotter = Snapshotter(sim) if snapshot_path else None
+        self.snapshots = SnapshotWriter(snapshot_path) if snapshot_path else None
+        self.snapshot_ticks = max(1, round(snapshot_interval * sim.tick_rate))
+        client.on_connect = self._on_connect; client.on_message = self._on_message
+        sim.task_listeners.append(self._task_changed)
+
+    def _on_connect(self, client, userdata, flags, rc, properties=None):
+        if rc == 0: client.subscribe(TASK_NEW_TOPIC, qos=1)
+
+    def _on_message(self, client, userdata, msg): # Network thread: queue only
+        if msg.topic == TASK_NEW_TOPIC: self.ingest.offer(msg.payload)
+
+    def _publish(self, topic, payload):
+        self.client.publish(topic, payload, qos=1)
+
+    def tick(self):
+        """Drains one ingest batch into the engine, advances it one tick and flushes telemetry."""
+        decoded, rejected = decode_tasks(self.ingest.drain(), self.sim.waypoints, self.seen.__contains__)
+        self.rejected += sum(rejected.values())
+        created = self.sim.create_tasks([(destination, PRIORITY_MAP.get(priority.lower(), PRIORITY_MAP["medium"])) for _, destination, priority in decoded])
+        created_by_target = {}
+        for task in created: created_by_target.setdefault(task.target_waypoint, []).append(task)
+        for task_id, destination, _ in decoded: # create_tasks() keeps order and only skips blocked targets
+            tasks = created_by_target.get(destination)
+            if not tasks: self.rejected += 1; continue
+            task = tasks.pop(0)
+            if task_id is not None: self.seen.add(task_id)
+            self.external[task.id] = task_id if task_id is not None else f"sim_{task.id}"
+        self.sim.step()
+        self.egress.flush(self.sim.robots.values(), self.sim.now)
+        if self.snapshots and self.sim.tick % self.snapshot_ticks == 0: self.snapshot()
+
+    def snapshot(self):
+        """Freezes the state now (a few ms at most) and leaves encoding and writing to the snapshot thread."""
+        self.snapshots.submit(self.snapshotter.freeze({"external": list(self.external.items()), "seen": list(self.seen)}))
+
+    def close(self):
+        """Takes a final snapshot, if snapshots are on, and waits until it is on disk."""
+        if self.snapshots: self.snapshot(); self.snapshots.close()
+
+    def _task_changed(self, task, old, new):
+        external = self.external.get(task.id)
+        if external is None: return
+        if new == "ASSIGNED":
+            for robot_id, bid in task.bids.items(): self.egress.bid(external, robot_id, bid)
+        elif new == "COMPLETE": self.egress.task_complete(external, task.assigned_robot)
+        if new in ("COMPLETE", "FAILED"): del self.external[task.id]; self.seen.discard(external)
@@ -0,0 +1,175 @@
+import copy
+
+try:
+    import numpy as np
+except ImportError: # The crowd model is optional; plain MovingObstacles need nothing beyond the standard library
+    np = None
+
+# Batched dynamic obstacles for busy corridors: people, beds and carts. A
+# Crowd keeps every agent's cell, move timer and trajectory in NumPy arrays
+# and advances them all at once per tick. Scripted agents loop over a fixed
+# cell sequence (a MovingObstacle patrol becomes one), walkers take a random
+# step among the free neighbours. The Crowd writes straight into the per-cell
+# obstacle counts that Robot.move reads (OccupancyIndex.obstacles), and
+# forecast() gives the cooperative planner one occupancy bitmap per future tick.
+# Those are the only consumers: the single-agent planners (A*, JPS, D* Lite,
+# HPA*) search the wall grid alone and, as with MovingObstacles, leave crowd
+# agents to Robot.move's wait-and-replan.
+
+SCRIPTED = 0; WALKER = 1
+STEPS = ((0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)) # Random-walk choices: stay or one of the four neighbours
+MAX_AGENTS = 0xFFFF # The shared per-cell counts are uint16 and NumPy wraps them silently, so no cell may ever hold more
+
+def move_delay(speed, tick_rate):
+    """Ticks per move for speed cells per simulated second, rounded as MovingObstacle does."""
+    return max(1, tick_rate // speed)
+
+def patrol_script(obstacle):
+    """(cells, loop): the cells a MovingObstacle occupies after each of its moves, starting with its current cell;
+    after the last one it carries on from cells[loop]."""
+    clone = copy.copy(obstacle); cells = [clone.pos]; seen = {(clone.pos, clone.direction): 0}
+    while True:
+        clone.move_timer = clone.move_delay - 1; clone.update() # Exactly one move
+        state = (clone.pos, clone.direction)
+        if state in seen: return cells, seen[state]
+        seen[state] = len(cells); cells.append(clone.pos)
+
+class Crowd:
+    """Dynamic obstacles by slot. Scripted slots own script_length cells of script_cells from script_start and stand
+    on script_cells[script_start + script_index]; walker slots ignore the script columns."""
+    def __init__(self, rows, cols, seed=None):
+        if np is None: raise RuntimeError("the crowd model needs NumPy")
+        self.rows = rows; self.cols = cols; self.rng = np.random.default_rng(seed); self.tick = 0
+        self.cell = np.zeros(0, np.int64); self.timer = np.zeros(0, np.int64); self.delay = np.ones(0, np.int64); self.kind = np.zeros(0, np.int8)
+        self.script_start = np.zeros(0, np.int64); self.script_length = np.zeros(0, np.int64); self.script_loop = np.zeros(0, np.int64)
+        self.script_index = np.zeros(0, np.int64); self.script_cells = np.zeros(0, np.int64)
+        self.agents = [] # CrowdAgent per slot, in MovingObstacle's place
+        self._buffers = {} # Column name -> its spare-capacity buffer; the column itself is a view of the filled part
+        self.free = None; self.counts = None # Grid cells and obstacle counts, shared with the Simulation once bound
+        self._forecast = None; self._forecast_key = None
+
+    def __len__(self): return len(self.agents)
+
+    def _add(self, cell, delay, kind, timer=0, script=(), loop=0, index=0):
+        r, c = cell
+        if not (0 <= r < self.rows and 0 <= c < self.cols): raise ValueError(f"crowd agent at {cell} is off the {self.rows}x{self.cols} map")
+        if len(self.agents) >= MAX_AGENTS: raise ValueError(f"a crowd holds at most {MAX_AGENTS} agents")
+        start = len(self.script_cells); cols = self.cols
+        self._append("script_cells", [r * cols + c for r, c in script])
+        for name, value in (("cell", r * cols + c), ("timer", timer), ("delay", delay), ("kind", kind), ("script_start", start),
+                            ("script_length", len(script)), ("script_loop", loop), ("script_index", index)):
+            self._append(name, (value,))
+        if self.counts is not None: self.counts[r * cols + c] += 1
+        self.agents.append(CrowdAgent(self, len(self.agents)))
+        return len(self.agents) - 1
+
+    def _append(self, name, values):
+        """Appends values to a column in place, doubling its buffer when full, so adding n agents costs O(n) in all."""
+        column = getattr(self, name); n = len(column); end = n + len(values); buffer = self._buffers.get(name)
+        if buffer is None or column.base is not buffer or end > len(buffer):
+            buffer = self._buffers[name] = np.empty(max(16, 2 * end), column.dtype); buffer[:n] = column
+        buffer[n:end] = values; setattr(self, name, buffer[:end])
+
+    def add_script(self, cells, delay=1, loop=0, index=0, timer=0):
+        """An agent on cells[index] that moves to the next cell every delay ticks, back to cells[loop] after the last."""
+        if not cells or not 0 <= loop < len(cells): raise ValueError("a script needs cells and a loop index within them")
+        return self._add(cells[index], delay, SCRIPTED, timer, cells, loop, index)
+
+    def add_patrol(self, obstacle):
+        """A MovingObstacle as a scripted agent; it keeps its timer and covers the same cells on the same ticks."""
+        cells, loop = patrol_script(obstacle)
+        return self.add_script(cells, obstacle.move_delay, loop, timer=obstacle.move_timer)
+
+    def add_walker(self, cell, delay=1, timer=0):
+        """An agent that every delay ticks stays or steps to a random free neighbour."""
+        return self._add(cell, delay, WALKER, timer)
+
+    def scatter(self, grid, count, delay=1, avoid=()):
+        """count walkers on random free cells of grid other than avoid (e.g. waypoints), drawn from the crowd's RNG."""
+        free = np.flatnonzero(np.frombuffer(grid.cells, np.uint8) == 0)
+        free = free[~np.isin(free, [r * self.cols + c for r, c in avoid])]
+        for cell in self.rng.choice(free, size=count, replace=count > len(free)).tolist(): self.add_walker(divmod(cell, self.cols), delay, int(self.rng.integers(delay)))
+
+    def bind(self, grid, counts):
+        """Shares grid's cells (walkers only enter free ones) and counts, the uint16 obstacles per cell (an array('H'))
+        that update() keeps current; the caller adds the agents already here."""
+        self.free = np.frombuffer(grid.cells, np.uint8); self.counts = np.frombuffer(counts, np.uint16)
+
+    # --- Update ---
+    def update(self):
+        """Advances every agent by one tick. Returns (slots, cells): the agents that changed cell and their new cells."""
+        self.tick += 1; self.timer += 1
+        due = np.flatnonzero(self.timer >= self.delay)
+        if not due.size: return due, due
+        self.timer[due] = 0
+        old = self.cell[due]; new = old.copy()
+        scripted = self.kind[due] == SCRIPTED
+        if scripted.any():
+            slots = due[scripted]; index = self._advance(slots, 1); self.script_index[slots] = index
+            new[scripted] = self.script_cells[self.script_start[slots] + index]
+        walking = ~scripted
+        if walking.any():
+            here = old[walking]; step = np.array(STEPS)[self.rng.integers(len(STEPS), size=len(here))]
+            r = here // self.cols + step[:, 0]; c = here % self.cols + step[:, 1]
+            inside = (r >= 0) & (r < self.rows) & (c >= 0) & (c < self.cols); there = np.where(inside, r * self.cols + c, here)
+            if self.free is not None: there = np.where(self.free[there] == 0, there, here) # Walls stop walkers
+            new[walking] = there
+        changed = new != old; slots = due[changed]; old = old[changed]; new = new[changed]
+        self.cell[slots] = new
+        if self.counts is not None: np.subtract.at(self.counts, old, 1); np.add.at(self.counts, new, 1)
+        return slots, new
+
+    def _advance(self, slots, moves):
+        """Script indices of slots after moves more moves (an int or one per slot), wrapping to the loop cell."""
+        index = self.script_index[slots] + moves; length = self.script_length[slots]; loop = self.script_loop[slots]
+        return np.where(index < length, index, loop + (index - loop) % np.maximum(length - loop, 1))
+
+    # --- Occupancy ---
+    def forecast(self, ticks):
+        """Occupancy bitmaps for the next ticks: forecast[j] covers the cells agents may hold after j more updates
+        (forecast[0] is now). Scripted agents are exact; a walker that is due to move covers its free neighbours too,
+        so the planner keeps one step clear of it rather than guessing its path."""
+        key = (self.tick, ticks, len(self.agents))
+        if self._forecast_key == key: return self._forecast
+        n = self.rows * self.cols; cols = self.cols; occupied = np.zeros((ticks + 1, n), np.uint8)
+        scripted = np.flatnonzero(self.kind == SCRIPTED); walkers = np.flatnonzero(self.kind == WALKER)
+        reach = None
+        if walkers.size: # Cells one step from each walker (its own where the step is blocked)
+            here = self.cell[walkers]; step = np.array(STEPS)
+            r = here[:, None] // cols + step[:, 0]; c = here[:, None] % cols + step[:, 1]
+            inside = (r >= 0) & (r < self.rows) & (c >= 0) & (c < cols); reach = np.where(inside, r * cols + c, here[:, None])
+            if self.free is not None: reach = np.where(self.free[reach] == 0, reach, here[:, None])
+        for j in range(ticks + 1):
+            if scripted.size:
+                moves = (self.timer[scripted] + j) // self.delay[scripted]
+                occupied[j, self.script_cells[self.script_start[scripted] + self._advance(scripted, moves)]] = 1
+            if walkers.size:
+                occupied[j, self.cell[walkers]] = 1
+                moving = (self.timer[walkers] + j) >= self.delay[walkers]
+                occupied[j, reach[moving].ravel()] = 1
+        self._forecast = [row.tobytes() for row in occupied]; self._forecast_key = key
+        return self._forecast
+
+    # --- Snapshots ---
+    COLUMNS = ("cell", "timer", "delay", "kind", "script_start", "script_length", "script_loop", "script_index", "script_cells")
+
+    def state(self):
+        """Everything update() depends on, as JSON-serialisable values."""
+        return {"tick": self.tick, "rng": self.rng.bit_generator.state, **{name: getattr(self, name).tolist() for name in self.COLUMNS}}
+
+    @classmethod
+    def from_state(cls, rows, cols, state):
+        crowd = cls(rows, cols); crowd.tick = state["tick"]; crowd.rng.bit_generator.state = state["rng"]
+        for name in cls.COLUMNS: setattr(crowd, name, np.array(state[name], getattr(crowd, name).dtype))
+        crowd.agents = [CrowdAgent(crowd, slot) for slot in range(len(crowd.cell))]
+        return crowd
+
+class CrowdAgent:
+    """One crowd slot, read like a MovingObstacle (pos) by the viewer and the event log."""
+    __slots__ = ("crowd", "slot")
+    def __init__(self, crowd, slot):
+        self.crowd = crowd; self.slot = slot
+
+    @property
+    def pos(self):
+        return divmod(int(self.crowd.cell[self.slot]), self.crowd.cols)
@@ -0,0 +1,140 @@
+import json
+import math
+import struct
+import time
+
+# Outgoing fleet telemetry. Instead of one JSON message per robot status,
+# bid and completion, a FleetPublisher coalesces everything produced during a
+# tick into one events message and, once per status interval, one status
+# message carrying only the robots whose reported state changed (plus a full
+# keyframe now and then, so late subscribers converge). Payloads are JSON or,
+# opt-in, a compact struct-packed binary; the old per-robot JSON messages stay
+# available as the "legacy" encoding.
+
+ROBOTS_BIDS_TOPIC = "robots/bids"; ROBOTS_STATUS_TOPIC = "robots/status"; TASKS_COMPLETE_TOPIC = "tasks/complete" # Legacy, per message
+FLEET_STATUS_TOPIC = "fleet/status"; FLEET_EVENTS_TOPIC = "fleet/events" # Batched; binary payloads go to <topic>/bin
+ENCODINGS = ("json", "binary", "legacy")
+STATUS_INTERVAL = 5.0 # Seconds between status messages
+KEYFRAME_EVERY = 12 # Every n-th status message carries every robot, not just changes
+SNAP_DISTANCE = 1.5 # Cells within which a robot is reported at a waypoint rather than a grid position
+STATUS_CODES = ("idle", "bidding", "moving", "replanning", "failed") # Binary status byte; anything else is 255
+
+# --- Location Labels ---
+def location_labels(rows, cols, waypoints, snap=SNAP_DISTANCE):
+    """Per cell index (r * cols + c): the nearest waypoint's name within snap cells, else "Grid(r,c)". Computed
+    once per map, so reporting a location is a list lookup instead of a distance scan over every waypoint."""
+    labels = [f"Grid({r},{c})" for r in range(rows) for c in range(cols)]; best = {} # cell index -> distance of its label
+    reach = int(snap)
+    for name, (wr, wc) in waypoints.items(): # Only cells within snap of some waypoint need a distance
+        for r in range(max(0, wr - reach), min(rows, wr + reach + 1)):
+            for c in range(max(0, wc - reach), min(cols, wc + reach + 1)):
+                distance = math.hypot(r - wr, c - wc); i = r * cols + c
+                if distance <= snap and distance < best.get(i, math.inf): best[i] = distance; labels[i] = name # Ties: first waypoint wins
+    return labels
+
+# --- Binary Encoding ---
+# Message: magic b"FT", version, kind (0 status delta, 1 status keyframe, 2 events), float64 timestamp, a string table
+# (u32 count, then u8 length + UTF-8 each), then the records, which name strings by table index:
+#   status:  u32 count, then (u32 robot, u32 location, u8 battery, u8 status code)
+#   events:  u32 bid count, then (u32 task, u32 robot, f32 bid); u32 completion count, then (u32 task, u32 robot, f64 time)
+# Counts are 32-bit because one tick's events can hold a bid from every robot for every task of a burst.
+BINARY_HEADER = struct.Struct("<2sBBd"); BINARY_VERSION = 2
+STATUS_RECORD = struct.Struct("<IIBB"); BID_RECORD = struct.Struct("<IIf"); COMPLETE_RECORD = struct.Struct("<IId")
+KIND_DELTA, KIND_KEYFRAME, KIND_EVENTS = 0, 1, 2
+
+class _Strings:
+    def __init__(self): self.index = {}; self.strings = []
+    def __call__(self, value):
+        value = str(value)
+        if value not in self.index: self.index[value] = len(self.strings); self.strings.append(value)
+        return self.index[value]
+    def pack(self):
+        encoded = [s.encode("utf-8")[:255].decode("utf-8", "ignore").encode("utf-8") for s in self.strings] # Cut on a character boundary
+        return struct.pack("<I", len(encoded)) + b"".join(bytes((len(s),)) + s for s in encoded)
+
+def encode_status(timestamp, records, keyframe=False):
+    """records: (robot id, location, battery, status) tuples."""
+    strings = _Strings()
+    body = b"".join(STATUS_RECORD.pack(strings(rid), strings(location), max(0, min(255, battery)), _status_code(status))
+                    for rid, location, battery, status in records)
+    return BINARY_HEADER.pack(b"FT", BINARY_VERSION, KIND_KEYFRAME if keyframe else KIND_DELTA, timestamp) + strings.pack() + struct.pack("<I", len(records)) + body
+
+def encode_events(timestamp, bids, completions):
+    """bids: (task id, robot id, bid); completions: (task id, robot id, completion time)."""
+    strings = _Strings()
+    bid_body = b"".join(BID_RECORD.pack(strings(task_id), strings(rid), bid) for task_id, rid, bid in bids)
+    complete_body = b"".join(COMPLETE_RECORD.pack(strings(task_id), strings(rid), at) for task_id, rid, at in completions)
+    return (BINARY_HEADER.pack(b"FT", BINARY_VERSION, KIND_EVENTS, timestamp) + strings.pack()
+            + struct.pack("<I", len(bids)) + bid_body + struct.pack("<I", len(completions)) + complete_body)
+
+def decode_binary(payload):
+    """Inverse of encode_status() / encode_events(): a dict shaped like the JSON payloads."""
+    magic, version, kind, timestamp = BINARY_HEADER.unpack_from(payload)
+    if magic != b"FT" or version != BINARY_VERSION: raise ValueError("not a fleet telemetry message")
+    offset = BINARY_HEADER.size; (count,) = struct.unpack_from("<I", payload, offset); offset += 4; strings = []
+    for _ in range(count):
+        length = payload[offset]; strings.append(payload[offset + 1:offset + 1 + length].decode("utf-8")); offset += 1 + length
+    def records(layout):
+        nonlocal offset
+        (n,) = struct.unpack_from("<I", payload, offset); offset += 4
+        found = [layout.unpack_from(payload, offset + i * layout.size) for i in range(n)]; offset += n * layout.size; return found
+    if kind == KIND_EVENTS:
+        bids = [[strings[t], strings[r], bid] for t, r, bid in records(BID_RECORD)]
+        return {"t": timestamp, "bids": bids, "complete": [[strings[t], strings[r], at] for t, r, at in records(COMPLETE_RECORD)]}
+    robots = [[strings[r], strings[loc], battery, STATUS_CODES[code] if code < len(STATUS_CODES) else "unknown"]
+              for r, loc, battery, code in records(STATUS_RECORD)]
+    return {"t": timestamp, "keyframe": kind == KIND_KEYFRAME, "robots": robots}
+
+def _status_code(status):
+    try: return STATUS_CODES.index(status)
+    except ValueError: return 255
+
+# --- Publisher ---
+class FleetPublisher:
+    """Coalesces fleet telemetry into batched messages. publish(topic, payload) does the actual sending; robots
+    need id, pos, energy and status. Call bid() / task_complete() as events happen and flush() once per tick."""
+    def __init__(self, publish, labels, cols, encoding="json", interval=STATUS_INTERVAL, keyframe_every=KEYFRAME_EVERY):
+        if encoding not in ENCODINGS: raise ValueError(f"unknown encoding {encoding!r}, expected one of {ENCODINGS}")
+        self.publish = publish; self.labels = labels; self.cols = cols
+        self.encoding = encoding; self.interval = interval; self.keyframe_every = keyframe_every
+        self.reported = {} # robot id -> (location, battery, status) as last sent
+        self.bids = []; self.completions = [] # Events waiting for the next flush()
+        self.last_status = None; self.status_messages = 0
+        self.messages = 0; self.bytes = 0 # Totals sent, for comparing encodings
+
+    def location(self, pos):
+        return self.labels[pos[0] * self.cols + pos[1]]
+
+    def bid(self, task_id, robot_id, value, now=None):
+        now = time.time() if now is None else now
+        if self.encoding == "legacy": self._send(ROBOTS_BIDS_TOPIC, json.dumps({"task_id": task_id, "robot_id": robot_id, "bid_value": value, "timestamp": now}))
+        else: self.bids.append((task_id, robot_id, value))
+
+    def task_complete(self, task_id, robot_id, now=None):
+        now = time.time() if now is None else now
+        if self.encoding == "legacy":
+            self._send(TASKS_COMPLETE_TOPIC, json.dumps({"task_id": task_id, "robot_id": robot_id, "completed_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(now))}))
+        else: self.completions.append((task_id, robot_id, now))
+
+    def flush(self, robots, now=None):
+        """Sends this tick's events as one message and, when the status interval is up, the status changes."""
+        now = time.time() if now is None else now
+        if self.bids or self.completions:
+            if self.encoding == "binary": self._send(FLEET_EVENTS_TOPIC + "/bin", encode_events(now, self.bids, self.completions))
+            else: self._send(FLEET_EVENTS_TOPIC, json.dumps({"t": now, "bids": self.bids, "complete": self.completions}))
+            self.bids = []; self.completions = []
+        if self.last_status is not None and now - self.last_status < self.interval: return
+        self.last_status = now; keyframe = self.status_messages % self.keyframe_every == 0; self.status_messages += 1
+        changed = []
+        for robot in robots:
+            state = (self.location(robot.pos), int(robot.energy), robot.status.lower())
+            if self.encoding == "legacy":
+                self._send(ROBOTS_STATUS_TOPIC, json.dumps({"robot_id": robot.id, "location": state[0], "battery": state[1], "status": state[2], "timestamp": now}))
+            elif keyframe or self.reported.get(robot.id) != state: changed.append((robot.id,) + state)
+            self.reported[robot.id] = state
+        if self.encoding == "legacy" or not changed: return
+        if self.encoding == "binary": self._send(FLEET_STATUS_TOPIC + "/bin", encode_status(now, changed, keyframe))
+        else: self._send(FLEET_STATUS_TOPIC, json.dumps({"t": now, "keyframe": keyframe, "robots": changed}))
+
+    def _send(self, topic, payload):
+        self.messages += 1; self.bytes += len(payload); self.publish(topic, payload)
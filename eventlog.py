@@ -0,0 +1,222 @@
+import bisect
+import json
+import mmap
+import struct
+import sys
+
+# Append-only binary event log. The engine reports every state transition
+# (task creation and status changes, bids, robot status changes, moves,
+# waits, replans, obstacle moves and toggles) as one fixed-size record to its
+# event sinks; an EventLogWriter packs them into a buffer that is appended to
+# the log file in large blocks. A Replayer memory-maps the file and rebuilds
+# fleet and task state at any tick from the records alone, without running
+# the engine or any pathfinding. ConsoleView renders the chattiest events
+# (moves, waits, bids) as the old log lines, live or from a log.
+
+MAGIC = b"HSEL"; VERSION = 2
+HEADER = struct.Struct("<4sHHI") # magic, version, record size, length of the JSON preamble that follows
+RECORD = struct.Struct("<IIHBBhhf") # tick, task id, robot index, kind, code, r, c, value
+NO_ROBOT = 0xFFFF
+FLUSH_BYTES = 1 << 20 # Buffered record bytes before the writer appends them to the file
+CHECKPOINT_TICKS = 1000 # Replayer keeps a state copy this often, so seeking back does not restart from tick 0
+
+# --- Event Kinds ---
+TASK_CREATED = 1 # task; r, c target; value priority
+TASK_STATUS = 2 # task; robot assigned robot; code TASK_STATUSES index
+ROBOT_STATUS = 3 # robot; code ROBOT_STATUSES index
+BID = 4 # robot, task; value distance cost (the bid adds the energy and priority terms)
+NO_BID = 5 # robot, task: no path to the target
+MOVE = 6 # robot; r, c new cell; value energy left
+WAIT = 7 # robot; r, c cell it could not enter; code WAIT_REASONS index
+BLOCKED = 8 # robot; r, c static obstacle on its path
+REPLAN = 9 # robot, task; value new path length, 0 if none was found
+OUT_OF_ENERGY = 10 # robot; r, c where it stopped
+ARRIVED = 11 # robot, task; r, c its target
+OBSTACLE = 12 # task moving obstacle index (the u32 field: crowds outgrow the u16 robot one); r, c new cell
+TOGGLE = 13 # r, c; code new cell value
+KIND_NAMES = dict(enumerate(("?", "TASK_CREATED", "TASK_STATUS", "ROBOT_STATUS", "BID", "NO_BID", "MOVE", "WAIT", "BLOCKED", "REPLAN",
+                             "OUT_OF_ENERGY", "ARRIVED", "OBSTACLE", "TOGGLE")))
+
+ROBOT_STATUSES = ("IDLE", "BIDDING", "MOVING", "REPLANNING", "FAILED")
+TASK_STATUSES = ("ANNOUNCED", "BIDDING", "ASSIGNED", "COMPLETE", "FAILED")
+WAIT_REASONS = ("obstacle", "robot", "planned")
+ROBOT_STATUS_CODES = {status: i for i, status in enumerate(ROBOT_STATUSES)}; TASK_STATUS_CODES = {status: i for i, status in enumerate(TASK_STATUSES)}
+
+# --- Writer ---
+class EventLogWriter:
+    """Event sink appending records to path. The preamble (robot ids, waypoints, initial positions, grid) makes the
+    log self-contained for replay."""
+    def __init__(self, path, preamble, grid_cells):
+        self.file = open(path, "wb"); self.buffer = bytearray(); self.records = 0; self.pack = RECORD.pack
+        meta = json.dumps(dict(preamble, grid_bytes=len(grid_cells))).encode("utf-8")
+        self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, len(meta)) + meta + bytes(grid_cells))
+        padding = -self.file.tell() % RECORD.size; self.file.write(bytes(padding)) # Records start record-aligned
+
+    def __call__(self, tick, kind, robot, task, r, c, value, code):
+        self.buffer += self.pack(tick, task, robot, kind, code, r, c, value); self.records += 1
+        if len(self.buffer) >= FLUSH_BYTES: self.flush()
+
+    def flush(self):
+        if self.buffer: self.file.write(self.buffer); self.buffer = bytearray()
+        self.file.flush()
+
+    def close(self):
+        self.flush(); self.file.close()
+
+# --- Reader ---
+class EventLogReader:
+    """Memory-mapped view of a log: header fields, len(), record access and tick -> record index search."""
+    def __init__(self, path):
+        self.file = open(path, "rb"); self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, meta_length = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size: raise ValueError(f"{path}: not a version {VERSION} event log")
+        self.meta = json.loads(self.map[HEADER.size:HEADER.size + meta_length])
+        grid_start = HEADER.size + meta_length; self.grid = bytes(self.map[grid_start:grid_start + self.meta["grid_bytes"]])
+        end = grid_start + self.meta["grid_bytes"]; self.start = end + (-end % RECORD.size)
+        self.count = (len(self.map) - self.start) // RECORD.size
+
+    def __len__(self):
+        return self.count
+
+    def record(self, i):
+        return RECORD.unpack_from(self.map, self.start + i * RECORD.size)
+
+    def records(self, first=0, last=None):
+        last = self.count if last is None else min(last, self.count)
+        return RECORD.iter_unpack(memoryview(self.map)[self.start + first * RECORD.size:self.start + last * RECORD.size])
+
+    def index_of_tick(self, tick):
+        """Index of the first record at or after tick (records are in tick order)."""
+        return bisect.bisect_left(range(self.count), tick, key=lambda i: RECORD.unpack_from(self.map, self.start + i * RECORD.size)[0])
+
+    def close(self):
+        self.map.close(); self.file.close()
+
+# --- Replay ---
+class ReplayState:
+    """Fleet, task and map state rebuilt from records."""
+    def __init__(self, meta, grid):
+        self.tick = 0; self.robot_ids = meta["robots"]; self.cols = meta["cols"]
+        self.positions = [tuple(p) for p in meta["positions"]]; self.energy = list(meta["energy"])
+        self.statuses = list(meta["statuses"]); self.obstacles = [tuple(p) for p in meta["obstacles"]]
+        self.grid = bytearray(grid); self.waypoints = {tuple(pos): name for name, pos in meta["waypoints"].items()}
+        self.tasks = {} # task id -> [target (r, c), priority, status, robot index]
+
+    def copy(self):
+        state = ReplayState.__new__(ReplayState); state.__dict__.update(self.__dict__)
+        for name in ("positions", "energy", "statuses", "obstacles"): setattr(state, name, list(getattr(self, name)))
+        state.grid = bytearray(self.grid); state.tasks = {tid: list(entry) for tid, entry in self.tasks.items()}
+        return state
+
+    def apply(self, tick, task, robot, kind, code, r, c, value):
+        self.tick = tick
+        if kind == MOVE: self.positions[robot] = (r, c); self.energy[robot] = value
+        elif kind == ROBOT_STATUS: self.statuses[robot] = ROBOT_STATUSES[code]
+        elif kind == TASK_CREATED: self.tasks[task] = [(r, c), int(value), "ANNOUNCED", NO_ROBOT]
+        elif kind == TASK_STATUS:
+            entry = self.tasks.get(task)
+            if entry: entry[2] = TASK_STATUSES[code]; entry[3] = robot
+        elif kind == OBSTACLE: self.obstacles[task] = (r, c)
+        elif kind == TOGGLE: self.grid[r * self.cols + c] = code
+
+    def robot_at(self, cell, other_than):
+        return next((self.robot_ids[i] for i, pos in enumerate(self.positions) if pos == cell and i != other_than), "?")
+
+    def snapshot(self):
+        return {"tick": self.tick, "robots": {rid: {"pos": self.positions[i], "status": self.statuses[i], "energy": round(self.energy[i], 1)}
+                                              for i, rid in enumerate(self.robot_ids)},
+                "tasks": {tid: {"target": self.waypoints.get(entry[0], entry[0]), "priority": entry[1], "status": entry[2],
+                                "robot": None if entry[3] == NO_ROBOT else self.robot_ids[entry[3]]} for tid, entry in self.tasks.items()},
+                "obstacles": self.obstacles}
+
+class Replayer:
+    """Moves a ReplayState to any tick by applying records; keeps checkpoints so backward seeks stay cheap."""
+    def __init__(self, path):
+        self.log = EventLogReader(path); self.initial = ReplayState(self.log.meta, self.log.grid)
+        self.state = self.initial.copy(); self.position = 0 # Next record to apply
+        self.checkpoints = [(0, 0, self.initial)] # (tick, record index, state at the start of that tick)
+
+    def seek(self, tick):
+        """State after every record of ticks before tick has been applied."""
+        if tick < self.state.tick or self.position and tick <= self.log.record(self.position - 1)[0]:
+            start_tick, self.position, checkpoint = self.checkpoints[bisect.bisect_right([entry[0] for entry in self.checkpoints], tick) - 1]
+            self.state = checkpoint.copy(); self.state.tick = start_tick
+        stop = self.log.index_of_tick(tick); apply = self.state.apply
+        next_checkpoint = self.checkpoints[-1][0] + CHECKPOINT_TICKS
+        for record in self.log.records(self.position, stop):
+            if record[0] >= next_checkpoint and record[0] > self.checkpoints[-1][0]:
+                self.checkpoints.append((record[0], self.position, self.state.copy())); next_checkpoint = record[0] + CHECKPOINT_TICKS
+            apply(*record); self.position += 1
+        self.state.tick = tick
+        return self.state
+
+    def events(self, first_tick, last_tick):
+        """Records with first_tick <= tick < last_tick, as (record, state just before it)."""
+        self.seek(first_tick)
+        for record in self.log.records(self.position, self.log.index_of_tick(last_tick)):
+            yield record, self.state
+            self.state.apply(*record); self.position += 1
+        self.state.tick = last_tick
+
+# --- Text View ---
+def describe(record, robot_name, energy_of, priority_of, robot_at, waypoint_at):
+    """The old log line for a move, wait, bid or arrival record, or None for kinds that have no text view."""
+    tick, task, robot, kind, code, r, c, value = record
+    if kind == BID:
+        energy_factor = (100.0 - energy_of(robot)) / 10.0; priority_factor = priority_of(task) * 5
+        return f"{robot_name(robot)} bid Task {task}: D={value:.1f}, E={energy_factor:.1f}, P={priority_factor:.1f} => Bid={value + energy_factor + priority_factor:.1f}"
+    if kind == NO_BID: return f"!!! {robot_name(robot)} cannot calc path cost"
+    if kind == BLOCKED: return f"!!! {robot_name(robot)} STATIC obstacle at {(r, c)}!"
+    if kind == WAIT and code == 0: return f"  DYNAMIC AVOID: {robot_name(robot)} waiting for moving obstacle at {(r, c)}"
+    if kind == WAIT and code == 1: return f"  COLLISION AVOID: {robot_name(robot)} waiting for {robot_at((r, c), robot)}"
+    if kind == OUT_OF_ENERGY: return f"!!! {robot_name(robot)} out of energy!"
+    if kind == ARRIVED: return f"{robot_name(robot)} reached {waypoint_at((r, c))}."
+    return None
+
+class ConsoleView:
+    """Live event sink printing describe() lines for a running Simulation (its verbose output)."""
+    def __init__(self, sim, out=sys.stdout):
+        self.sim = sim; self.out = out; self.robots = list(sim.robots.values())
+        self.waypoints = {pos: name for name, pos in sim.waypoints.items()}
+
+    def __call__(self, tick, kind, robot, task, r, c, value, code):
+        robots = self.robots
+        text = describe((tick, task, robot, kind, code, r, c, value), lambda i: robots[i].id, lambda i: robots[i].energy,
+                        lambda tid: self.sim.tasks.get(tid).priority, lambda cell, i: getattr(self.sim.occupancy.robot_at(cell, robots[i]), "id", "?"),
+                        self.waypoints.get)
+        if text is not None: print(text, file=self.out)
+
+def replay_lines(replayer, first_tick, last_tick, all_kinds=False):
+    """Text for the records in [first_tick, last_tick); all_kinds adds a raw line for kinds without a text view."""
+    for record, state in replayer.events(first_tick, last_tick):
+        text = describe(record, state.robot_ids.__getitem__, state.energy.__getitem__, lambda tid: state.tasks[tid][1], state.robot_at,
+                        lambda cell: state.waypoints.get(cell, cell))
+        if text is None and all_kinds:
+            tick, task, robot, kind, code, r, c, value = record
+            text = f"  [{KIND_NAMES.get(kind, kind)}] task={task} robot={'-' if robot == NO_ROBOT else state.robot_ids[robot]} ({r},{c}) code={code} value={value:g}"
+        if text is not None: yield record[0], text
+
+# --- Replay Tool ---
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Inspect an event log without re-running the simulation.")
+    parser.add_argument("log")
+    parser.add_argument("--tick", type=int, help="print fleet and task state at this tick")
+    parser.add_argument("--events", metavar="FIRST:LAST", help="print the events of ticks FIRST..LAST-1 as log lines")
+    parser.add_argument("--all", action="store_true", help="with --events, also show kinds that have no log line")
+    args = parser.parse_args(argv)
+    replayer = Replayer(args.log); log = replayer.log
+    last_tick = log.record(len(log) - 1)[0] if len(log) else 0
+    print(f"{len(log)} records, ticks 0..{last_tick}, {len(log.meta['robots'])} robots")
+    if args.events:
+        first, last = (int(part) for part in args.events.split(":"))
+        for tick, text in replay_lines(replayer, first, last, args.all): print(f"{tick:>7} {text}")
+    if args.tick is not None:
+        snapshot = replayer.seek(args.tick).snapshot(); print(f"State at tick {args.tick}:")
+        for rid, robot in snapshot["robots"].items(): print(f"  {rid}: {robot['status']} at {robot['pos']}, energy {robot['energy']}")
+        live = {tid: task for tid, task in snapshot["tasks"].items() if task["status"] not in ("COMPLETE", "FAILED")}
+        for tid, task in live.items(): print(f"  Task {tid} -> {task['target']} prio {task['priority']}: {task['status']} {task['robot'] or ''}")
+        print(f"  {len(snapshot['tasks']) - len(live)} tasks finished, moving obstacles at {snapshot['obstacles']}")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+try:
+    import numpy as np
+except ImportError: # The array fleet is optional; Simulation(fleet="objects") needs nothing beyond the standard library
+    np = None
+
+import eventlog as ev
+from simulation import Robot
+
+# Struct-of-arrays fleet state for large headless runs. With
+# Simulation(fleet="arrays") every robot's cell, energy, status code, path
+# cursor and task id live in NumPy arrays (FleetArrays) and Robot objects are
+# thin views over one slot (ArrayRobot), so the viewer, the MQTT code and the
+# rest of the engine see the same attributes as before. Paths are also packed
+# into one flat cell buffer, which lets the movement phase gather every next
+# cell, apply the energy drain (with the 1.4 diagonal factor) and detect
+# arrivals as whole-fleet operations; status counts come from a bincount.
+
+STATUS_CODES = ev.ROBOT_STATUS_CODES; MOVING = STATUS_CODES["MOVING"]
+NO_CELL = -1
+
+class FleetArrays:
+    """Per-robot columns indexed by slot, plus the packed path buffer (path_start[slot] + path_index[slot] is the
+    robot's next cell in path_cells)."""
+    def __init__(self, cols, capacity=64):
+        if np is None: raise RuntimeError("the array fleet needs NumPy")
+        self.cols = cols; self.count = 0; self.robots = [] # ArrayRobot per slot
+        self.cell = np.full(capacity, NO_CELL, np.int64); self.energy = np.zeros(capacity); self.drain = np.zeros(capacity)
+        self.status = np.full(capacity, -1, np.int8); self.task = np.zeros(capacity, np.int64)
+        self.path_index = np.zeros(capacity, np.int64); self.path_length = np.zeros(capacity, np.int64); self.path_start = np.zeros(capacity, np.int64)
+        self.path_cells = np.zeros(1024, np.int64); self.path_used = 0
+
+    def add(self, robot):
+        if self.count == len(self.cell):
+            for name in ("cell", "energy", "drain", "status", "task", "path_index", "path_length", "path_start"):
+                column = getattr(self, name); grown = np.full(2 * len(column), column.dtype.type(NO_CELL if name in ("cell", "status") else 0))
+                grown[:len(column)] = column; setattr(self, name, grown)
+        self.robots.append(robot); self.count += 1
+        return self.count - 1
+
+    def set_path(self, slot, path):
+        length = len(path); self.path_length[slot] = length
+        if not length: return
+        if self.path_used + length > len(self.path_cells): self._make_room(length)
+        cols = self.cols; start = self.path_used
+        self.path_cells[start:start + length] = [r * cols + c for r, c in path]; self.path_start[slot] = start; self.path_used += length
+
+    def _make_room(self, length):
+        """Drops superseded paths from the buffer, growing it if live paths would still fill more than half."""
+        live = int(self.path_length[:self.count].sum()) + length; size = len(self.path_cells)
+        while live * 2 > size: size *= 2
+        self.path_cells = np.zeros(size, np.int64); self.path_used = 0
+        for slot, robot in enumerate(self.robots):
+            if self.path_length[slot]: self.set_path(slot, robot._path)
+
+    def status_counts(self):
+        counts = np.bincount(self.status[:self.count], minlength=len(ev.ROBOT_STATUSES))
+        return {ev.ROBOT_STATUSES[code]: int(n) for code, n in enumerate(counts) if n}
+
+    def with_status(self, status):
+        """Robots in status, in slot order."""
+        robots = self.robots
+        return [robots[slot] for slot in np.flatnonzero(self.status[:self.count] == STATUS_CODES[status]).tolist()]
+
+    def move(self, sim):
+        """Robot.move() for every MOVING robot, with the same outcome as moving them one by one in slot order.
+        Robots that step onto a cell nobody occupies and no other robot is heading for (the common case) are moved
+        as one batch; waits, blocked paths, arrivals and contested cells go through Robot.move()."""
+        n = self.count; robots = self.robots; cols = self.cols
+        moving = np.flatnonzero(self.status[:n] == MOVING)
+        if not moving.size: return
+        index = self.path_index[moving]; length = self.path_length[moving]
+        stepping = moving[index < length]; arrived = moving[(index >= length) & (length > 0)]
+        here = self.cell[stepping]; there = self.path_cells[self.path_start[stepping] + self.path_index[stepping]]
+        if sim.cooperative: # Planned waits: the path repeats the current cell
+            planned = there == here; waiting = stepping[planned]
+            if waiting.size:
+                self.path_index[waiting] += 1; sim.wait_ticks += len(waiting)
+                if sim.event_sinks:
+                    for slot, cell in zip(waiting.tolist(), here[planned].tolist()): sim.emit(ev.WAIT, robots[slot].index, robots[slot].current_task_id, *divmod(cell, cols), code=2)
+                stepping = stepping[~planned]; here = here[~planned]; there = there[~planned]
+        occupied = np.zeros(sim.rows * cols, bool); occupied[self.cell[:n]] = True
+        free = ~occupied[there] & (np.frombuffer(sim.grid.cells, np.uint8)[there] == 0) & (np.frombuffer(sim.occupancy.obstacles, np.uint16)[there] == 0)
+        simple = free & (np.bincount(there, minlength=len(occupied))[there] == 1) # Free and nobody else's next cell either
+        dr = np.abs(there // cols - here // cols); dc = np.abs(there % cols - here % cols)
+        cost = self.drain[stepping] * np.where((dr == 1) & (dc == 1), 1.4, 1.0)
+        batch = simple & (self.energy[stepping] >= cost)
+        movers = stepping[batch]; old = here[batch]; new = there[batch]
+        self.energy[movers] -= cost[batch]; self.cell[movers] = new; self.path_index[movers] += 1
+        occupancy = sim.occupancy
+        for slot, a, b in zip(movers.tolist(), old.tolist(), new.tolist()): occupancy.move_robot_cell(robots[slot], a, b)
+        if sim.event_sinks:
+            for slot, b in zip(movers.tolist(), new.tolist()): sim.emit(ev.MOVE, robots[slot].index, robots[slot].current_task_id, *divmod(b, cols), float(self.energy[slot]))
+        # Everything else one by one. A batch mover only left its cell "before" robots with a higher slot.
+        moved = np.zeros(n, bool); moved[movers] = True
+        start_occupant = np.full(len(occupied), -1, np.int64); start_occupant[old] = movers
+        for slot, cell in zip(stepping[~batch].tolist(), there[~batch].tolist()):
+            robot = robots[slot]; occupant = start_occupant[cell]
+            if occupant > slot and moved[occupant]: # In slot order it would still have been there
+                if sim.event_sinks: sim.emit(ev.WAIT, robot.index, robot.current_task_id, *divmod(cell, cols), code=1)
+                sim.wait_ticks += 1; robot.plan_broken = True
+            else: robot.move()
+        for slot in arrived.tolist(): robots[slot].move()
+
+class ArrayRobot(Robot):
+    """Robot whose state lives in a FleetArrays slot."""
+    def __init__(self, sim, robot_id, start_pos):
+        self.fleet = sim.fleet; self.slot = self.fleet.add(self); self._path = []
+        super().__init__(sim, robot_id, start_pos)
+
+    @property
+    def pos(self):
+        return divmod(int(self.fleet.cell[self.slot]), self.fleet.cols)
+
+    @pos.setter
+    def pos(self, value):
+        fleet = self.fleet; old = int(fleet.cell[self.slot]); new = value[0] * fleet.cols + value[1]
+        if old != new: fleet.cell[self.slot] = new; self.sim.occupancy.move_robot(self, None if old == NO_CELL else divmod(old, fleet.cols), value)
+
+    @property
+    def status(self):
+        return ev.ROBOT_STATUSES[self.fleet.status[self.slot]]
+
+    @status.setter
+    def status(self, value): # Counted by FleetArrays.status_counts() rather than per transition
+        code = STATUS_CODES[value]
+        if self.fleet.status[self.slot] != code:
+            self.fleet.status[self.slot] = code
+            if self.sim.event_sinks: self.sim.emit(ev.ROBOT_STATUS, self.index, code=code)
+
+    @property
+    def energy(self):
+        return float(self.fleet.energy[self.slot])
+
+    @energy.setter
+    def energy(self, value):
+        self.fleet.energy[self.slot] = value
+
+    @property
+    def energy_drain_per_step(self):
+        return float(self.fleet.drain[self.slot])
+
+    @energy_drain_per_step.setter
+    def energy_drain_per_step(self, value):
+        self.fleet.drain[self.slot] = value
+
+    @property
+    def path(self):
+        return self._path
+
+    @path.setter
+    def path(self, value): # Paths are replaced, never edited in place, so the packed copy stays valid
+        self._path = value; self.fleet.set_path(self.slot, value)
+
+    @property
+    def path_index(self):
+        return int(self.fleet.path_index[self.slot])
+
+    @path_index.setter
+    def path_index(self, value):
+        self.fleet.path_index[self.slot] = value
+
+    @property
+    def current_task_id(self):
+        return int(self.fleet.task[self.slot]) or None
+
+    @current_task_id.setter
+    def current_task_id(self, value):
+        self.fleet.task[self.slot] = value or 0
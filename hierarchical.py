@@ -0,0 +1,233 @@
+import heapq
+
+from pathfinding import INF, MOVES, octile
+
+# Hierarchical pathfinding (HPA*) over buildings with several floors. Each
+# floor is cut into square clusters; cells where a robot can cross from one
+# cluster into the next become abstract nodes, joined by precomputed
+# in-cluster costs and by elevator links between floors. A query searches
+# that small abstract graph and then refines each hop inside one cluster, so
+# its cost follows the route, not the area of the map. Paths are near-optimal
+# (the route is forced through the chosen crossing cells).
+
+# --- Building Model ---
+class Building:
+    """Floors (each a Grid) plus elevator links ((floor, r, c), (floor, r, c), cost) between them."""
+    def __init__(self, floors, elevators=()):
+        self.floors = list(floors); self.elevators = list(elevators)
+
+# --- Cluster-Bounded Search ---
+def _bounded_search(grid, bounds, start, targets=None, goal=None):
+    """Dijkstra (or A* when goal is given) from start that never leaves bounds = (r0, r1, c0, c1), inclusive.
+    Returns (dist, parent) dicts keyed by (r, c)."""
+    r0, r1, c0, c1 = bounds; cells = grid.cells; cols = grid.cols
+    dist = {start: 0}; parent = {start: None}; heap = [(0, 0, start)]; remaining = set(targets) if targets else None
+    while heap:
+        _, d, u = heapq.heappop(heap)
+        if d > dist[u]: continue
+        if u == goal: break
+        if remaining is not None:
+            remaining.discard(u)
+            if not remaining: break
+        r, c = u
+        for (dr, dc), cost in MOVES:
+            nr = r + dr; nc = c + dc
+            if nr < r0 or nr > r1 or nc < c0 or nc > c1 or cells[nr * cols + nc] == 1: continue
+            v = (nr, nc); nd = d + cost
+            if nd < dist.get(v, INF):
+                dist[v] = nd; parent[v] = u
+                heapq.heappush(heap, (nd + (octile(v, goal) if goal else 0), nd, v))
+    return dist, parent
+
+# --- Abstract Graph ---
+class HierarchicalMap:
+    """HPA* abstraction of a Building, kept up to date cell by cell via cell_changed()."""
+    def __init__(self, building, cluster_size=16):
+        self.building = building; self.k = cluster_size
+        self.inter = {} # node -> {node: cost} across cluster borders and elevators
+        self.intra = {} # node -> {node: cost} inside one cluster
+        self.cluster_nodes = {} # cluster -> set of nodes
+        self.node_refs = {} # node -> set of borders / elevators that keep it alive
+        self.borders = {} # border key -> list of (node_a, node_b, cost)
+        for f, grid in enumerate(building.floors):
+            for cr in range((grid.rows + self.k - 1) // self.k):
+                for cc in range((grid.cols + self.k - 1) // self.k):
+                    self.cluster_nodes.setdefault((f, cr, cc), set())
+        for idx, (a, b, cost) in enumerate(building.elevators):
+            self._add_node(a, ("elevator", idx)); self._add_node(b, ("elevator", idx))
+            self.inter[a][b] = cost; self.inter[b][a] = cost
+        for cluster in list(self.cluster_nodes):
+            for key in self._border_keys(cluster): self._build_border(key)
+        for cluster in self.cluster_nodes: self._build_intra(cluster)
+
+    def cluster_of(self, node):
+        f, r, c = node; return (f, r // self.k, c // self.k)
+
+    def _bounds(self, cluster):
+        f, cr, cc = cluster; grid = self.building.floors[f]
+        return (cr * self.k, min((cr + 1) * self.k, grid.rows) - 1, cc * self.k, min((cc + 1) * self.k, grid.cols) - 1)
+
+    def _border_keys(self, cluster):
+        """Borders this cluster shares with its east, south and both diagonal-below neighbours."""
+        f, cr, cc = cluster; keys = []
+        for dcr, dcc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            other = (f, cr + dcr, cc + dcc)
+            if other in self.cluster_nodes: keys.append((cluster, other))
+        return keys
+
+    def _all_border_keys(self, cluster):
+        f, cr, cc = cluster; keys = []
+        for dcr in (-1, 0, 1):
+            for dcc in (-1, 0, 1):
+                other = (f, cr + dcr, cc + dcc)
+                if (dcr or dcc) and other in self.cluster_nodes: keys.append((cluster, other) if (dcr, dcc) > (0, 0) else (other, cluster))
+        return keys
+
+    def _add_node(self, node, ref):
+        if node not in self.node_refs:
+            self.node_refs[node] = set(); self.inter[node] = {}; self.intra[node] = {}
+            self.cluster_nodes[self.cluster_of(node)].add(node)
+        self.node_refs[node].add(ref)
+
+    def _drop_ref(self, node, ref):
+        refs = self.node_refs.get(node)
+        if refs is None: return
+        refs.discard(ref)
+        if refs: return
+        del self.node_refs[node]; self.cluster_nodes[self.cluster_of(node)].discard(node)
+        for table in (self.inter, self.intra):
+            for other in table.pop(node):
+                table[other].pop(node, None)
+
+    def _crossings(self, key):
+        """Entrance transitions (node_a, node_b, cost) for one border: one per free stretch, two if it is long."""
+        a, b = key; f = a[0]; grid = self.building.floors[f]; cells = grid.cells; cols = grid.cols
+        ar0, ar1, ac0, ac1 = self._bounds(a); br0, br1, bc0, bc1 = self._bounds(b)
+        free = lambda r, c: cells[r * cols + c] != 1
+        if a[1] != b[1] and a[2] != b[2]: # Diagonal neighbours meet in a single corner
+            ra = ar1; ca = ac1 if b[2] > a[2] else ac0; rb = br0; cb = bc0 if b[2] > a[2] else bc1
+            return [((f, ra, ca), (f, rb, cb), 14)] if free(ra, ca) and free(rb, cb) else []
+        if a[1] == b[1]: # East border: i runs down the shared column pair
+            cell = lambda i, side: (i, ac1 if side == 0 else bc0); lo, hi = ar0, ar1
+        else: # South border: i runs along the shared row pair
+            cell = lambda i, side: (ar1 if side == 0 else br0, i); lo, hi = ac0, ac1
+        # Every free crossing (i, j): a-side cell i to b-side cell j, j within one step of i
+        crossings = [(i, j) for i in range(lo, hi + 1) if free(*cell(i, 0))
+                     for j in (i - 1, i, i + 1) if lo <= j <= hi and free(*cell(j, 1))]
+        # A stretch stays connected on both sides as long as consecutive crossings are adjacent on both sides
+        transitions = []; run = []
+        for i, j in crossings + [(None, None)]:
+            if run and i is not None and i - run[-1][0] <= 1 and abs(j - run[-1][1]) <= 1: run.append((i, j)); continue
+            if run:
+                picks = [run[len(run) // 2]] if len(run) < 6 else [run[0], run[-1]]
+                transitions.extend(((f,) + cell(pi, 0), (f,) + cell(pj, 1), 10 if pi == pj else 14) for pi, pj in picks)
+            run = [(i, j)]
+        return transitions
+
+    def _build_border(self, key):
+        for node_a, node_b, _ in self.borders.pop(key, []):
+            self.inter.get(node_a, {}).pop(node_b, None); self.inter.get(node_b, {}).pop(node_a, None)
+            self._drop_ref(node_a, key); self._drop_ref(node_b, key)
+        transitions = self._crossings(key); self.borders[key] = transitions
+        for node_a, node_b, cost in transitions:
+            self._add_node(node_a, key); self._add_node(node_b, key)
+            self.inter[node_a][node_b] = cost; self.inter[node_b][node_a] = cost
+
+    def _build_intra(self, cluster):
+        nodes = self.cluster_nodes[cluster]; f = cluster[0]; grid = self.building.floors[f]; bounds = self._bounds(cluster)
+        nodes = list(nodes)
+        for node in nodes: self.intra[node] = {}
+        for n, node in enumerate(nodes[:-1]): # Costs are symmetric, so each pair is searched once
+            later = nodes[n + 1:]
+            dist, _ = _bounded_search(grid, bounds, node[1:], targets=[other[1:] for other in later])
+            for other in later:
+                if other[1:] in dist: self.intra[node][other] = self.intra[other][node] = dist[other[1:]]
+
+    def cell_changed(self, floor, cell):
+        """Repairs the abstraction after (floor, cell) was toggled."""
+        self.cells_changed(floor, [cell])
+
+    def cells_changed(self, floor, cells):
+        """Repairs the abstraction after a batch of toggles: only the touched clusters and their neighbours."""
+        touched = set(); borders = set()
+        for r, c in cells:
+            cluster = self.cluster_of((floor, r, c)); r0, r1, c0, c1 = self._bounds(cluster); touched.add(cluster)
+            if r in (r0, r1) or c in (c0, c1): borders.update(self._all_border_keys(cluster))
+        for key in borders: self._build_border(key); touched.update(key)
+        for cluster in touched: self._build_intra(cluster)
+
+    # --- Queries ---
+    def _connect(self, node):
+        """Temporary edges from node to the abstract nodes of its own cluster."""
+        cluster = self.cluster_of(node); targets = self.cluster_nodes[cluster]
+        dist, _ = _bounded_search(self.building.floors[node[0]], self._bounds(cluster), node[1:], targets=[n[1:] for n in targets])
+        return {n: dist[n[1:]] for n in targets if n[1:] in dist}
+
+    def find_path(self, start, goal):
+        """Returns (path, cost) between (floor, r, c) positions, or (None, INF)."""
+        floors = self.building.floors; f, r, c = goal
+        if floors[f].cells[r * floors[f].cols + c] == 1: return None, INF
+        if start == goal: return [start], 0
+        best_direct = INF
+        if self.cluster_of(start) == self.cluster_of(goal):
+            dist, _ = _bounded_search(floors[start[0]], self._bounds(self.cluster_of(start)), start[1:], goal=goal[1:])
+            best_direct = dist.get(goal[1:], INF)
+        out_edges = self._connect(start); in_edges = self._connect(goal)
+        # A* over abstract nodes; start/goal are joined through the temporary edges
+        h = lambda n: octile(n[1:], goal[1:]) if n[0] == goal[0] else 0
+        g = {start: 0}; parent = {start: None}; heap = [(h(start), 0, start)]; found = INF
+        while heap:
+            est, d, u = heapq.heappop(heap)
+            if est >= best_direct: break # The in-cluster path cannot be beaten
+            if d > g.get(u, INF): continue
+            if u == goal: found = d; break
+            neighbours = list(self.inter.get(u, {}).items()) + list(self.intra.get(u, {}).items())
+            if u == start: neighbours += out_edges.items()
+            if u in in_edges: neighbours.append((goal, in_edges[u]))
+            for v, cost in neighbours:
+                nd = d + cost
+                if nd < g.get(v, INF): g[v] = nd; parent[v] = u; heapq.heappush(heap, (nd + h(v), nd, v))
+        if best_direct <= found:
+            if best_direct == INF: return None, INF
+            return self._refine_local(start, goal), best_direct
+        hops = []; node = goal
+        while node is not None: hops.append(node); node = parent[node]
+        hops.reverse()
+        path = [start]
+        for a, b in zip(hops, hops[1:]):
+            if self.cluster_of(a) != self.cluster_of(b): path.append(b) # Elevator or border step
+            else: path.extend(self._refine_local(a, b)[1:])
+        return path, found
+
+    def _refine_local(self, a, b):
+        """Cell path between two positions of the same cluster, never leaving it."""
+        f = a[0]; _, parent = _bounded_search(self.building.floors[f], self._bounds(self.cluster_of(a)), a[1:], goal=b[1:])
+        cells = []; node = b[1:]
+        while node is not None: cells.append((f,) + node); node = parent[node]
+        return cells[::-1]
+
+# --- Single-Floor Planner Interface ---
+class _FloorHierarchy:
+    """One-floor HierarchicalMap that notices grid edits by diffing the grid bytes."""
+    def __init__(self, grid, cluster_size):
+        self.grid = grid; self.snapshot = bytes(grid.cells); self.map = HierarchicalMap(Building([grid]), cluster_size)
+
+    def sync(self):
+        cells = self.grid.cells; cols = self.grid.cols
+        if self.snapshot == cells: return
+        changed = []
+        for r in range(self.grid.rows):
+            row = slice(r * cols, (r + 1) * cols)
+            if self.snapshot[row] != cells[row]:
+                changed.extend((r, c) for c in range(cols) if self.snapshot[r * cols + c] != cells[r * cols + c])
+        self.map.cells_changed(0, changed); self.snapshot = bytes(cells)
+
+def hpa(grid, start_pos, end_pos, max_nodes=None, cluster_size=16):
+    """astar()-compatible HPA* query on a single floor; returns (path, cost) or (None, INF). The abstract search has no
+    node budget, so max_nodes must be None rather than be silently ignored."""
+    if max_nodes is not None: raise ValueError("hpa() does not support a max_nodes budget")
+    hierarchy = getattr(grid, "hierarchy", None)
+    if hierarchy is None or hierarchy.map.k != cluster_size: hierarchy = grid.hierarchy = _FloorHierarchy(grid, cluster_size)
+    hierarchy.sync()
+    path, cost = hierarchy.map.find_path((0,) + tuple(start_pos), (0,) + tuple(end_pos))
+    return ([p[1:] for p in path], cost) if path else (None, INF)
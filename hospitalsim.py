@@ -1,63 +1,35 @@
-import heapq
 import os 
 import pygame
 import sys
-import math
 import time
 import random
 import json
 import threading
 import paho.mqtt.client as mqtt
 
+from egress import FleetPublisher, location_labels
+from ingest import PRIORITY_MAP, IngestQueue, decode_tasks
+from pathfinding import INF, Grid, astar
+from taskstore import TaskStore, TrackedTask
+
 # --- MQTT Configuration ---
-MQTT_BROKER = "mqtt.medifleet.local" # Use hostname provided
-MQTT_PORT = 1883
+MQTT_BROKER = os.environ.get("MQTT_BROKER", "mqtt.medifleet.local") # Use hostname provided
+MQTT_PORT = int(os.environ.get("MQTT_PORT", 1883))
 MQTT_KEEP_ALIVE = 60
 
 # Topics
 TASK_NEW_TOPIC = "tasks/new"
-ROBOTS_BIDS_TOPIC = "robots/bids" # For robots to publish bids
 TASKS_ASSIGNED_TOPIC = "tasks/assigned" # For server to assign (Sim listens conceptually)
-ROBOTS_STATUS_TOPIC = "robots/status"
-TASKS_COMPLETE_TOPIC = "tasks/complete"
+# Robot bids, statuses and completions go out through the FleetPublisher (egress.py): batched JSON on fleet/status and
+# fleet/events, "binary" for the compact encoding, or "legacy" for the old per-message robots/bids, robots/status, tasks/complete
+EGRESS_ENCODING = "json"
+INGEST_STATUS_TOPIC = "ingest/backpressure" # Retained flag: producers should slow down while it is true
 
 # Global MQTT Client
 mqtt_client = None
 mqtt_connected = False
-
-# --- A* Pathfinding Code (Unchanged) ---
-class Node:
-    """A node class for A* Pathfinding."""
-    def __init__(self, parent=None, position=None):
-        self.parent = parent
-        self.position = position; self.g = 0; self.h = 0; self.f = 0
-    def __eq__(self, other): return self.position == other.position
-    def __lt__(self, other): return self.f < other.f
-    def __hash__(self): return hash(self.position)
-
-def astar(grid, start_pos, end_pos):
-    rows, cols = len(grid), len(grid[0])
-    start_node = Node(None, start_pos); end_node = Node(None, end_pos)
-    open_list = []; closed_set = set(); heapq.heappush(open_list, start_node)
-    while open_list:
-        current_node = heapq.heappop(open_list)
-        if current_node.position in closed_set: continue
-        closed_set.add(current_node.position)
-        if current_node == end_node:
-            path = []; current = current_node
-            while current is not None: path.append(current.position); current = current.parent
-            return path[::-1] # Return reversed path
-        for move_pos, move_cost in [((0,-1),10),((0,1),10),((-1,0),10),((1,0),10),((-1,-1),14),((-1,1),14),((1,-1),14),((1,1),14)]:
-            node_position = (current_node.position[0] + move_pos[0], current_node.position[1] + move_pos[1])
-            if not (0 <= node_position[0] < rows and 0 <= node_position[1] < cols): continue
-            if grid[node_position[0]][node_position[1]] != 0: continue
-            if node_position in closed_set: continue
-            new_node = Node(current_node, node_position); new_node.g = current_node.g + move_cost
-            dx=abs(new_node.position[0]-end_node.position[0]); dy=abs(new_node.position[1]-end_node.position[1])
-            new_node.h = 10*(dx+dy)+(14-2*10)*min(dx,dy); new_node.f = new_node.g + new_node.h
-            if any(open_node == new_node and new_node.g >= open_node.g for open_node in open_list): continue
-            heapq.heappush(open_list, new_node)
-    return None
+backpressure_published = False # Last value sent on INGEST_STATUS_TOPIC
+ingest_rejected = {"malformed": 0, "invalid": 0, "duplicate": 0} # Payloads decode_tasks() turned away, by reason
 
 # --- Pygame Simulation Code ---
 GRID_ROWS = 15; GRID_COLS = 15; CELL_SIZE = 50
@@ -68,17 +40,21 @@ CYAN=(0,255,255); MAGENTA=(255,0,255); ORANGE=(255,165,0); PATH_COLOR=(50,200,50
 WAYPOINTS = {"ENT":(1,3),"PHA":(4,3),"ICU":(4,1),"R101":(4,5),"EMR":(7,3),"STO":(10,3)}
 WAYPOINT_COLORS = {"ENT":WHITE,"PHA":BLUE,"ICU":RED,"R101":GREEN,"EMR":YELLOW,"STO":PURPLE}
 ROBOT_COLORS = {"R1":CYAN,"R2":MAGENTA,"R3":ORANGE}; ROBOT_IDS = ["R1","R2","R3"]
-PRIORITY_MAP = {"high": 1, "medium": 5, "low": 10} # Map MQTT priority strings
-grid = [[0 for _ in range(GRID_COLS)] for _ in range(GRID_ROWS)]
-tasks_lock = threading.Lock() # Lock for accessing tasks list from MQTT thread
+grid = Grid(GRID_ROWS, GRID_COLS)
+def mqtt_publish(topic, payload):
+    if mqtt_connected: mqtt_client.publish(topic, payload, qos=1)
+
+egress = FleetPublisher(mqtt_publish, location_labels(GRID_ROWS, GRID_COLS, WAYPOINTS), GRID_COLS, EGRESS_ENCODING)
+ingest_queue = IngestQueue() # Raw tasks/new payloads from the MQTT thread, drained by the sim thread once per tick
+tasks_lock = threading.Lock() # Lock for accessing the task store
 robots_lock = threading.Lock() # Lock for accessing robots dict
 
-class Task:
+class Task(TrackedTask):
     def __init__(self, task_id, target_waypoint, priority_str):
         self.id = task_id
         self.target_waypoint = target_waypoint.upper() # Ensure uppercase
         self.target_pos = WAYPOINTS.get(self.target_waypoint) # Use .get for safety
-        self.priority = PRIORITY_MAP.get(priority_str.lower(), PRIORITY_MEDIUM) # Map priority string
+        self.priority = PRIORITY_MAP.get(priority_str.lower(), PRIORITY_MAP["medium"]) # Map priority string
         self.status = "ANNOUNCED" # ANNOUNCED, BIDDING, ASSIGNED, COMPLETE
         self.assigned_robot = None
         self.bids = {} # {robot_id: bid_value}
@@ -90,13 +66,12 @@ class Robot:
         self.offset_x = random.randint(-CELL_SIZE//6, CELL_SIZE//6); self.offset_y = random.randint(-CELL_SIZE//6, CELL_SIZE//6)
         self.path = []; self.path_index = 0; self.status = "IDLE"; self.target_waypoint = None; self.current_task_id = None
         self.energy = 100.0; self.low_energy_threshold = 20.0; self.energy_drain_per_step = 0.5
-        self.last_status_publish_time = 0
 
     def assign_task(self, task):
         if not task.target_pos:
             print(f"!!! {self.id} cannot find waypoint {task.target_waypoint} for Task {task.id}.")
             self.status = "IDLE"; return False
-        path = astar(grid, self.pos, task.target_pos)
+        path, _ = astar(grid, self.pos, task.target_pos)
         if path and len(path) > 1:
             self.path = path; self.path_index = 1; self.status = "MOVING"; self.target_waypoint = task.target_waypoint
             self.current_task_id = task.id; task.status = "ASSIGNED"; task.assigned_robot = self.id
@@ -106,7 +81,7 @@ class Robot:
             self.status = "IDLE"; return False
 
     def move(self):
-        global tasks # Need access to global tasks list to mark completion
+        global tasks # Need access to the global task store to mark completion
         if self.status == "MOVING":
             if self.path_index < len(self.path):
                 next_pos = self.path[self.path_index]; r1,c1=self.pos; r2,c2=next_pos
@@ -124,41 +99,20 @@ class Robot:
                 self.path = []; self.path_index = 0; self.current_task_id = None
                 # Mark task as complete in the main list
                 with tasks_lock:
-                    for task in tasks:
-                        if task.id == completed_task_id:
-                            task.status = "COMPLETE"
-                            print(f"--- Task {task.id} ({task.target_waypoint}) marked COMPLETE ---")
-                            break
+                    task = tasks.get(completed_task_id)
+                    if task:
+                        task.status = "COMPLETE" # Moves it to the store's archive
+                        print(f"--- Task {task.id} ({task.target_waypoint}) marked COMPLETE ---")
 
 
     def calculate_bid(self, task):
         if self.status != "IDLE" or self.energy < self.low_energy_threshold: return None
         if not task.target_pos: return None # Cannot bid if waypoint unknown
 
-        path = astar(grid, self.pos, task.target_pos)
-        distance_cost = float('inf')
-        if path and len(path) > 1:
-             # Re-calculate path g-cost properly for bidding
-             end_node_sim = Node(None, task.target_pos); open_list_sim = []; closed_set_sim = set()
-             start_node_sim = Node(None, self.pos); heapq.heappush(open_list_sim, start_node_sim)
-             path_g_cost = float('inf')
-             while open_list_sim:
-                 current_node_sim = heapq.heappop(open_list_sim);
-                 if current_node_sim.position in closed_set_sim: continue; closed_set_sim.add(current_node_sim.position)
-                 if current_node_sim == end_node_sim: path_g_cost = current_node_sim.g; break
-                 for move_pos, move_cost in [((0,-1),10),((0,1),10),((-1,0),10),((1,0),10),((-1,-1),14),((-1,1),14),((1,-1),14),((1,1),14)]:
-                     node_pos_sim=(current_node_sim.position[0]+move_pos[0], current_node_sim.position[1]+move_pos[1])
-                     if not(0<=node_pos_sim[0]<GRID_ROWS and 0<=node_pos_sim[1]<GRID_COLS): continue
-                     if grid[node_pos_sim[0]][node_pos_sim[1]]!=0: continue;
-                     if node_pos_sim in closed_set_sim: continue
-                     new_node_sim=Node(current_node_sim, node_pos_sim); new_node_sim.g = current_node_sim.g + move_cost
-                     if any(on==new_node_sim and new_node_sim.g>=on.g for on in open_list_sim): continue
-                     heapq.heappush(open_list_sim, new_node_sim)
-             distance_cost = path_g_cost
-        elif self.pos == task.target_pos:
-            distance_cost = 0 # Already there
-
-        if distance_cost == float('inf'):
+        # One search gives both the path and its g-cost
+        path, distance_cost = astar(grid, self.pos, task.target_pos)
+
+        if distance_cost == INF:
             print(f"!!! {self.id} cannot calculate path for bid on Task {task.id}.")
             return None # Cannot bid if no path found
 
@@ -168,60 +122,14 @@ class Robot:
 
         print(f"{self.id} calculated bid for Task {task.id} ({task.target_waypoint}): Dist={distance_cost:.1f}, EnergyF={energy_factor:.1f}, PrioF={-priority_factor:.1f} => Bid={bid:.1f}")
 
-        # --- Publish Bid via MQTT ---
-        if mqtt_connected:
-            bid_payload = {
-                "task_id": task.id,
-                "robot_id": self.id,
-                "bid_value": bid, # Send the calculated cost
-                "timestamp": time.time()
-            }
-            mqtt_client.publish(ROBOTS_BIDS_TOPIC, json.dumps(bid_payload), qos=1)
-            # print(f"Published bid for Task {task.id} to {ROBOTS_BIDS_TOPIC}") # Optional log
+        egress.bid(task.id, self.id, bid) # Goes out with this tick's other events
 
         return bid
 
-    def publish_status(self):
-        """Publishes robot status to MQTT."""
-        global mqtt_connected, mqtt_client
-        current_time = time.time()
-        # Publish status approx every 5 seconds or if status changes
-        if mqtt_connected and (current_time - self.last_status_publish_time > 5):
-            # Find current location name
-            current_location_name = "MOVING"
-            min_dist = float('inf')
-            for name, pos in WAYPOINTS.items():
-                dist = math.sqrt((self.pos[0]-pos[0])**2 + (self.pos[1]-pos[1])**2)
-                if dist < min_dist:
-                    min_dist = dist
-                    current_location_name = name
-            # If still far from any waypoint, report approximate grid pos
-            if min_dist > 1.5: # Threshold distance to snap to waypoint name
-                 current_location_name = f"Grid({self.pos[0]},{self.pos[1]})"
-
-
-            status_payload = {
-                "robot_id": self.id,
-                "location": current_location_name, # Report nearest waypoint or grid pos
-                "battery": int(self.energy),
-                "status": self.status.lower(), # idle, bidding, moving
-                "timestamp": current_time
-            }
-            mqtt_client.publish(ROBOTS_STATUS_TOPIC, json.dumps(status_payload), qos=1)
-            self.last_status_publish_time = current_time
-            # print(f"Published status for {self.id}") # Optional log
-
     def publish_task_complete(self, task_id):
-        """Publishes task completion to MQTT."""
-        global mqtt_connected, mqtt_client
-        if mqtt_connected:
-            complete_payload = {
-                "task_id": task_id,
-                "robot_id": self.id,
-                "completed_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
-            }
-            mqtt_client.publish(TASKS_COMPLETE_TOPIC, json.dumps(complete_payload), qos=1)
-            print(f">>> {self.id} Published completion for Task {task_id}")
+        """Queues the completion for this tick's events message."""
+        egress.task_complete(task_id, self.id)
+        print(f">>> {self.id} Published completion for Task {task_id}")
 
 
     def draw(self, screen, font):
@@ -288,51 +196,43 @@ def on_disconnect(client, userdata, rc, properties=None):
      # Implement reconnection logic if desired
 
 def on_message(client, userdata, msg):
-    global tasks, task_counter, robots # Access global lists/dicts
-    print(f"Received message on topic {msg.topic}") # Basic log
-    if msg.topic == TASK_NEW_TOPIC:
-        try:
-            payload = json.loads(msg.payload.decode('utf-8'))
-            print(f"Payload: {payload}")
-
-            task_id = payload.get("task_id", f"mqtt_{task_counter+1}") # Use provided ID or generate one
-            destination = payload.get("destination")
-            priority = payload.get("priority", "medium") # Default to medium
-
-            if not destination or destination.upper() not in WAYPOINTS:
-                 print(f"Invalid or missing destination in task payload: {destination}")
-                 return
-            if destination.upper() == "ENT":
-                 print("Cannot assign task to ENT")
-                 return
-
-            # Check if task ID already exists
-            with tasks_lock:
-                 if any(t.id == task_id for t in tasks):
-                      print(f"Task ID {task_id} already exists. Ignoring.")
-                      return
-
-                 task_counter += 1 # Increment counter even if using provided ID for uniqueness fallback
-                 new_task = Task(task_id, destination, priority)
-                 tasks.append(new_task)
-                 print(f"--- MQTT Task {new_task.id} ({new_task.target_waypoint}) received with priority {new_task.priority} ---")
-
-                 # Trigger bidding phase for this new task
-                 with robots_lock:
-                     for robot in robots.values():
-                          if robot.status == "IDLE" and robot.energy >= robot.low_energy_threshold:
-                              robot.status = "BIDDING" # Visually indicate bidding
-
-        except json.JSONDecodeError:
-            print(f"Error decoding JSON payload on {msg.topic}")
-        except Exception as e:
-            print(f"Error processing message on {msg.topic}: {e}")
+    # Runs on the paho network thread: no parsing and no locks, just hand the raw payload to the sim thread
+    if msg.topic == TASK_NEW_TOPIC: ingest_queue.offer(msg.payload)
+
+# --- Task Ingest (sim thread) ---
+def drain_ingest():
+    """Turns one batch of queued tasks/new payloads into tasks and opens a single auction round for all of them."""
+    global task_counter, backpressure_published
+    batch = ingest_queue.drain()
+    if ingest_queue.saturated != backpressure_published and mqtt_connected:
+        mqtt_client.publish(INGEST_STATUS_TOPIC, json.dumps({"saturated": ingest_queue.saturated, **ingest_queue.stats()}), qos=1, retain=True)
+        backpressure_published = ingest_queue.saturated
+    if not batch: return 0
+    with tasks_lock:
+        decoded, rejected = decode_tasks(batch, WAYPOINTS, tasks.__contains__)
+        explicit = {task_id for task_id, _, _ in decoded if task_id is not None} # Generated ids must not take these either
+        for task_id, destination, priority in decoded:
+            task_counter += 1 # Counts every task, so generated ids stay unique
+            if task_id is None:
+                task_id = f"mqtt_{task_counter}"
+                while task_id in tasks or task_id in explicit: task_counter += 1; task_id = f"mqtt_{task_counter}"
+            tasks.add(Task(task_id, destination, priority))
+    for reason, count in rejected.items(): ingest_rejected[reason] += count
+    if decoded:
+        with robots_lock: # One auction round for the whole batch
+            for robot in robots.values():
+                if robot.status == "IDLE" and robot.energy >= robot.low_energy_threshold: robot.status = "BIDDING" # Visually indicate bidding
+    print(f"--- Ingested {len(decoded)} of {len(batch)} task messages ({', '.join(f'{k}: {v}' for k, v in rejected.items() if v) or 'none rejected'};"
+          f" {len(ingest_queue)} queued, {ingest_queue.dropped} dropped) ---")
+    return len(decoded)
 
 # --- MQTT Setup Function ---
-def setup_mqtt():
+def setup_mqtt(client=None):
+    """Connects and starts the network loop. client is any transport with the paho Client surface (see transport.py),
+    e.g. an InProcessClient for offline runs; by default a paho client for MQTT_BROKER."""
     global mqtt_client
     client_id = f"pygame_sim_{random.randint(0, 1000)}"
-    mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id)
+    mqtt_client = client if client is not None else mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id)
     mqtt_client.on_connect = on_connect
     mqtt_client.on_disconnect = on_disconnect
     mqtt_client.on_message = on_message
@@ -351,10 +251,10 @@ def setup_mqtt():
 
 # --- Main Simulation Loop ---
 # --- Main Simulation Loop ---
-def main():
+def main(client=None):
     global tasks, task_counter, robots # Allow modification by MQTT callback
 
-    setup_mqtt() # Initialize and connect MQTT
+    setup_mqtt(client) # Initialize and connect MQTT
 
     # --- Initialize Pygame and Font FIRST ---
     pygame.init()
@@ -403,7 +303,7 @@ def main():
                   robots[robot_id] = Robot(robot_id, start_pos_ent, ROBOT_COLORS[robot_id]) # Fallback
     # --- END Robot Initialization ---
 
-    tasks = [] # Task list managed globally
+    tasks = TaskStore() # Task store managed globally
     task_counter = 0
 
     running = True
@@ -411,11 +311,15 @@ def main():
         # --- Pygame Event Handling ---
         # ... (rest of the event handling loop) ...
 
+        # --- Task Ingest: one drained batch per tick ---
+        drain_ingest()
+
         # --- Contract Net Protocol (CNP) Logic ---
         # ... (rest of CNP logic) ...
 
         # --- Robot Movement & Status Publishing ---
         # ... (rest of movement logic) ...
+        with robots_lock: egress.flush(robots.values()) # One events message per tick, status deltas every STATUS_INTERVAL
 
         # --- Drawing ---
         screen.fill(BLACK)
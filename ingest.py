@@ -0,0 +1,63 @@
+import json
+from collections import deque
+
+# Ingest path for externally submitted tasks. The network thread only appends
+# raw payloads to a bounded queue (a deque, whose append/popleft are atomic, so
+# neither side takes a lock); the simulation thread drains it once per tick,
+# decodes, validates and dedupes the whole batch and opens one auction round
+# for everything that survived.
+
+INGEST_CAPACITY = 20000 # Payloads held before new ones are dropped
+INGEST_BATCH = 4096 # Payloads drained per tick at most; the rest wait for the next tick
+HIGH_WATER = 0.8; LOW_WATER = 0.5 # Fill ratios where backpressure turns on / off again
+PRIORITY_MAP = {"high": 1, "medium": 5, "low": 10} # MQTT priority strings -> task priorities, shared by every entry point
+
+class IngestQueue:
+    """Bounded single-producer / single-consumer payload queue with drop and backpressure counters."""
+    def __init__(self, capacity=INGEST_CAPACITY):
+        self.capacity = capacity; self.items = deque()
+        self.received = 0; self.dropped = 0; self.drained = 0; self.peak = 0
+        self.saturated = False # Backpressure flag, with hysteresis between LOW_WATER and HIGH_WATER
+
+    def __len__(self):
+        return len(self.items)
+
+    def offer(self, payload):
+        """Producer side: queues payload, or drops it and returns False when the queue is full."""
+        self.received += 1; size = len(self.items)
+        if size >= self.capacity: self.dropped += 1; self.saturated = True; return False
+        self.items.append(payload)
+        if size + 1 > self.peak: self.peak = size + 1
+        if size + 1 >= self.capacity * HIGH_WATER: self.saturated = True
+        return True
+
+    def drain(self, limit=INGEST_BATCH):
+        """Consumer side: up to limit payloads, oldest first."""
+        items = self.items; batch = []
+        for _ in range(min(limit, len(items))): batch.append(items.popleft())
+        self.drained += len(batch)
+        if self.saturated and len(items) <= self.capacity * LOW_WATER: self.saturated = False
+        return batch
+
+    def stats(self):
+        return {"queued": len(self.items), "received": self.received, "dropped": self.dropped, "drained": self.drained,
+                "peak": self.peak, "saturated": self.saturated}
+
+def decode_tasks(payloads, waypoints, known, default_priority="medium"):
+    """Decodes a drained batch of JSON task payloads ({"task_id", "destination", "priority"}). Returns
+    (tasks, rejected): tasks as (task id or None, destination, priority) in arrival order, with ids already in
+    known(id) or repeated within the batch dropped; rejected counts malformed, invalid and duplicate payloads."""
+    tasks = []; seen = set(); rejected = {"malformed": 0, "invalid": 0, "duplicate": 0}
+    for payload in payloads:
+        try:
+            message = json.loads(payload)
+            task_id = message.get("task_id"); destination = message.get("destination"); priority = message.get("priority", default_priority)
+        except (ValueError, AttributeError): rejected["malformed"] += 1; continue # Not JSON, or not an object
+        if not isinstance(destination, str) or destination.upper() not in waypoints or destination.upper() == "ENT" or not isinstance(priority, str) \
+                or not isinstance(task_id, (str, int, type(None))):
+            rejected["invalid"] += 1; continue
+        if task_id is not None:
+            if task_id in seen or known(task_id): rejected["duplicate"] += 1; continue
+            seen.add(task_id)
+        tasks.append((task_id, destination.upper(), priority))
+    return tasks, rejected
@@ -0,0 +1,144 @@
+import json
+import random
+import sys
+import threading
+import time
+
+from coordinator import TASK_NEW_TOPIC, Coordinator
+from egress import ENCODINGS, FLEET_EVENTS_TOPIC, TASKS_COMPLETE_TOPIC, decode_binary
+from metrics import QUANTILES, LatencyStats
+from simulation import TICK_RATE, Simulation
+from transport import InProcessBroker, InProcessClient
+
+# Offline load test of the MQTT path. A LoadGenerator publishes tasks/new at a
+# configured rate (synthetic Poisson arrivals, or a recorded stream replayed
+# at some speed) and listens for completions on every egress encoding's topic,
+# timing each task from publish to completion. With the in-process broker the
+# whole loop (generator, coordinator, engine) runs in one process with no
+# network.
+
+COMPLETION_TOPICS = (TASKS_COMPLETE_TOPIC, FLEET_EVENTS_TOPIC, FLEET_EVENTS_TOPIC + "/bin")
+
+# --- Task Streams ---
+def poisson_stream(rate, destinations, duration, seed=0, priorities=("high", "medium", "low")):
+    """(offset s, destination, priority) arrivals at rate tasks per second for duration seconds."""
+    rng = random.Random(seed); t = 0.0
+    while True:
+        t += rng.expovariate(rate)
+        if t >= duration: return
+        yield t, rng.choice(destinations), rng.choice(priorities)
+
+def replay_stream(path, speed=1.0):
+    """Recorded arrivals from a JSON-lines file of {"t": offset s, "destination", "priority"}, played speed times as fast."""
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line); yield record["t"] / speed, record["destination"], record.get("priority", "medium")
+
+# --- Generator ---
+class LoadGenerator:
+    def __init__(self, client, prefix="load"):
+        self.client = client; self.prefix = prefix
+        self.sent = {} # task id -> perf_counter() at publish, until completed
+        self.latency = LatencyStats(); self.published = 0; self.lock = threading.Lock()
+        client.on_connect = self._on_connect; client.on_message = self._on_message
+
+    def _on_connect(self, client, userdata, flags, rc, properties=None):
+        for topic in COMPLETION_TOPICS: client.subscribe(topic, qos=1)
+
+    def _on_message(self, client, userdata, msg):
+        now = time.perf_counter()
+        if msg.topic == TASKS_COMPLETE_TOPIC: completed = [json.loads(msg.payload)["task_id"]]
+        elif msg.topic == FLEET_EVENTS_TOPIC: completed = [entry[0] for entry in json.loads(msg.payload)["complete"]]
+        else: completed = [entry[0] for entry in decode_binary(msg.payload)["complete"]]
+        with self.lock:
+            for task_id in completed:
+                started = self.sent.pop(task_id, None)
+                if started is not None: self.latency.add(now - started)
+
+    def run(self, stream):
+        """Publishes the stream in real time on the calling thread."""
+        start = time.perf_counter()
+        for n, (offset, destination, priority) in enumerate(stream):
+            delay = start + offset - time.perf_counter()
+            if delay > 0: time.sleep(delay)
+            task_id = f"{self.prefix}-{n}"
+            with self.lock: self.sent[task_id] = time.perf_counter()
+            self.client.publish(TASK_NEW_TOPIC, json.dumps({"task_id": task_id, "destination": destination, "priority": priority}), qos=1)
+            self.published += 1
+
+    def report(self):
+        with self.lock: stats = self.latency.snapshot(); open_tasks = len(self.sent)
+        return dict(published=self.published, completed=stats["count"], unfinished=open_tasks, latency=stats)
+
+# --- Offline Run ---
+def run_offline(stream, duration, sim, encoding="json", speedup=1.0, drain=10.0, snapshot_path=None):
+    """Generator, coordinator and engine over an in-process broker. The engine ticks at speedup x its tick rate;
+    after the stream ends it keeps running up to drain wall seconds for stragglers. Returns the report dict. A sim
+    resumed from a snapshot gets task ids prefixed with its starting tick, so they cannot collide with the ids the
+    restored coordinator has already seen."""
+    broker = InProcessBroker()
+    coordinator_client = InProcessClient(broker, "coordinator"); coordinator = Coordinator(sim, coordinator_client, encoding, snapshot_path)
+    generator_client = InProcessClient(broker, "loadgen"); generator = LoadGenerator(generator_client, f"load@{sim.tick}" if sim.tick else "load")
+    for client in (coordinator_client, generator_client): client.connect(); client.loop_start()
+    feeder = threading.Thread(target=generator.run, args=(stream,), daemon=True)
+    tick_seconds = 1.0 / (sim.tick_rate * speedup); wall_start = time.perf_counter(); next_tick = wall_start; stream_end = None
+    feeder.start()
+    while True:
+        coordinator.tick(); next_tick += tick_seconds
+        now = time.perf_counter()
+        if stream_end is None and not feeder.is_alive() and now - wall_start >= duration: stream_end = now
+        if stream_end is not None and (not generator.sent or now - stream_end >= drain): break
+        if next_tick > now: time.sleep(next_tick - now)
+        else: next_tick = now # Behind: run flat out rather than bank ticks
+    wall = time.perf_counter() - wall_start
+    for client in (coordinator_client, generator_client): client.loop_stop()
+    coordinator.close()
+    report = generator.report()
+    report.update(wall_s=wall, ticks=sim.tick, simulated_s=sim.now, rejected=coordinator.rejected, ingest=coordinator.ingest.stats(),
+                  egress_messages=coordinator.egress.messages, egress_bytes=coordinator.egress.bytes,
+                  broker_published=broker.published, broker_delivered=broker.delivered)
+    return report
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Load-test the MQTT task path against an in-process broker.")
+    parser.add_argument("--rate", type=float, default=5.0, help="synthetic tasks/new per wall second")
+    parser.add_argument("--duration", type=float, default=20.0, help="wall seconds of synthetic load")
+    parser.add_argument("--replay", metavar="JSONL", help="replay a recorded task stream instead of synthetic load")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed factor")
+    parser.add_argument("--robots", type=int, default=None)
+    parser.add_argument("--map", help="JSON map file (see scenarios.load_map)")
+    parser.add_argument("--speedup", type=float, default=1.0, help="simulated seconds per wall second")
+    parser.add_argument("--encoding", choices=ENCODINGS, default="json")
+    parser.add_argument("--cooperative", action="store_true", help="space-time planning; reactive robots can deadlock head-on under load")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--snapshot", metavar="PATH", help="snapshot the coordinator state here every simulated minute and at the end")
+    parser.add_argument("--resume", action="store_true", help="start from the --snapshot file instead of a fresh simulation")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+    options = {}
+    if args.map:
+        from pathfinding import Grid
+        from scenarios import load_map
+        floor = load_map(args.map)
+        options = dict(grid=Grid(floor["rows"], floor["cols"], floor["cells"]), waypoints=floor["waypoints"], priorities=floor["priorities"], moving_obstacles=[])
+    if args.resume:
+        if not args.snapshot: parser.error("--resume needs --snapshot")
+        from snapshot import load
+        sim = load(args.snapshot)
+    else: sim = Simulation(seed=args.seed, tick_rate=TICK_RATE, robot_count=args.robots, cooperative=args.cooperative, **options)
+    if args.replay:
+        stream = list(replay_stream(args.replay, args.speed)); duration = stream[-1][0] if stream else 0.0
+    else: stream = poisson_stream(args.rate, sim.task_waypoints, args.duration, args.seed); duration = args.duration
+    report = run_offline(stream, duration, sim, args.encoding, args.speedup, snapshot_path=args.snapshot)
+    if args.json: print(json.dumps(report, indent=1)); return
+    latency = report["latency"]; fmt = lambda v: "n/a" if v is None else f"{v * 1000:.0f}ms"
+    print(f"{report['published']} published, {report['completed']} completed, {report['unfinished']} unfinished, {report['rejected']} rejected, "
+          f"{report['ingest']['dropped']} dropped at ingest; {report['wall_s']:.1f}s wall, {report['simulated_s']:.0f}s simulated")
+    print("tasks/new -> complete: mean " + fmt(latency["mean"]) + " " + " ".join(f"p{round(q * 100)} {fmt(latency[f'p{round(q * 100)}'])}" for q in QUANTILES))
+    print(f"egress: {report['egress_messages']} messages, {report['egress_bytes']} bytes; broker: {report['broker_published']} published, "
+          f"{report['broker_delivered']} delivered")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+from collections import Counter
+
+# Fleet and task metrics maintained on state transitions. Robots and the
+# TaskStore report every status change here, so counts are plain counters
+# and latency percentiles come from streaming estimators; nothing rescans the
+# robots or tasks to draw the dashboard or export numbers.
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# --- Streaming Quantiles ---
+class P2Quantile:
+    """Jain & Chlamtac's P-square estimate of one quantile: five markers, O(1) time and memory per sample."""
+    def __init__(self, q):
+        self.q = q; self.heights = []
+        self.positions = [1, 2, 3, 4, 5]; self.desired = [1, 1 + 2*q, 1 + 4*q, 3 + 2*q, 5]; self.increments = [0, q/2, q, (1 + q)/2, 1]
+
+    def add(self, x):
+        h = self.heights; n = self.positions
+        if len(h) < 5:
+            h.append(x); h.sort(); return
+        if x < h[0]: h[0] = x; k = 0
+        elif x >= h[4]: h[4] = x; k = 3
+        else: k = next(i for i in range(4) if h[i] <= x < h[i+1])
+        for i in range(k + 1, 5): n[i] += 1
+        for i in range(5): self.desired[i] += self.increments[i]
+        for i in (1, 2, 3): # Nudge the middle markers towards their desired positions
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i+1] - n[i] > 1) or (d <= -1 and n[i-1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                parabolic = h[i] + d / (n[i+1] - n[i-1]) * ((n[i] - n[i-1] + d) * (h[i+1] - h[i]) / (n[i+1] - n[i])
+                                                          + (n[i+1] - n[i] - d) * (h[i] - h[i-1]) / (n[i] - n[i-1]))
+                h[i] = parabolic if h[i-1] < parabolic < h[i+1] else h[i] + d * (h[i+d] - h[i]) / (n[i+d] - n[i])
+                n[i] += d
+
+    def value(self):
+        h = self.heights
+        if len(h) < 5: return h[min(len(h) - 1, int(self.q * len(h)))] if h else None # Exact while tiny
+        return h[2]
+
+class LatencyStats:
+    """Count, mean, min, max and p50/p95/p99 of a stream of durations (simulated seconds)."""
+    def __init__(self):
+        self.count = 0; self.total = 0.0; self.min = None; self.max = None
+        self.quantiles = {q: P2Quantile(q) for q in QUANTILES}
+
+    def add(self, x):
+        self.count += 1; self.total += x
+        if self.min is None or x < self.min: self.min = x
+        if self.max is None or x > self.max: self.max = x
+        for estimator in self.quantiles.values(): estimator.add(x)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def percentile(self, q):
+        return self.quantiles[q].value()
+
+    def snapshot(self):
+        stats = {"count": self.count, "mean": self.mean, "min": self.min, "max": self.max}
+        stats.update({f"p{round(q * 100)}": estimator.value() for q, estimator in self.quantiles.items()})
+        return stats
+
+# --- Fleet / Task Metrics ---
+class Metrics:
+    """Counters and latency distributions, fed by robot and task status transitions. clock() gives the current
+    simulated time; robot_counts(), if set, replaces the per-transition robot counter with a count on demand."""
+    def __init__(self, clock, robot_counts=None):
+        self.clock = clock; self.robot_counts = robot_counts
+        self.robot_status = Counter() # status -> robots in it now
+        self.task_status = Counter() # status -> tasks in it now
+        self.tasks_created = 0
+        self.completion = LatencyStats() # created -> COMPLETE
+        self.assignment = LatencyStats() # created -> ASSIGNED
+        self.by_priority = {} # priority -> (completion, assignment)
+        self.by_waypoint = {} # waypoint name -> (completion, assignment)
+
+    @property
+    def robot_status(self):
+        return Counter(self.robot_counts()) if self.robot_counts else self._robot_status
+
+    @robot_status.setter
+    def robot_status(self, value):
+        self._robot_status = value
+
+    def robot_status_changed(self, old, new):
+        if old is not None: self._robot_status[old] -= 1
+        self._robot_status[new] += 1
+
+    def task_status_changed(self, task, old, new):
+        if old is None: self.tasks_created += 1
+        else: self.task_status[old] -= 1
+        self.task_status[new] += 1
+        if new == "ASSIGNED": self._record(task, 1, self.clock() - task.created_at)
+        elif new == "COMPLETE" and task.completion_time is not None: self._record(task, 0, task.completion_time)
+
+    def _record(self, task, which, value):
+        (self.completion, self.assignment)[which].add(value)
+        for breakdown, key in ((self.by_priority, task.priority), (self.by_waypoint, task.target_waypoint)):
+            if key not in breakdown: breakdown[key] = (LatencyStats(), LatencyStats())
+            breakdown[key][which].add(value)
+
+    def pending_tasks(self):
+        return self.task_status["ANNOUNCED"] + self.task_status["BIDDING"]
+
+    def snapshot(self):
+        """Plain-dict view for exporters (JSON-serialisable)."""
+        breakdown = lambda table: {str(key): {"completion": c.snapshot(), "assignment": a.snapshot()} for key, (c, a) in sorted(table.items())}
+        return {"time": self.clock(), "robots": dict(self.robot_status), "tasks": dict(self.task_status), "tasks_created": self.tasks_created,
+                "completion": self.completion.snapshot(), "assignment": self.assignment.snapshot(),
+                "by_priority": breakdown(self.by_priority), "by_waypoint": breakdown(self.by_waypoint)}
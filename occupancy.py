@@ -0,0 +1,57 @@
+from array import array
+
+# Occupancy index: which robot and how many moving obstacles are on each grid
+# cell, kept in step with every move. Collision checks, "target blocked by a
+# moving obstacle" checks and click validation look up one cell instead of
+# scanning the fleet or the obstacle list, so their cost does not grow with
+# fleet size.
+
+class OccupancyIndex:
+    """Per-cell robot and moving-obstacle occupancy over a rows x cols grid (flat index r * cols + c). A cell holds
+    None, one robot, or a list of robots in the rare case that several share it (fallback start positions)."""
+    def __init__(self, rows, cols):
+        self.cols = cols
+        self.robots = [None] * (rows * cols)
+        self.obstacles = array('H', bytes(2 * rows * cols)) # Moving obstacles per cell (uint16); they may pass through and pile up on each other
+
+    def robot_at(self, cell, other_than=None):
+        """A robot on cell other than other_than, or None."""
+        occupant = self.robots[cell[0] * self.cols + cell[1]]
+        if occupant is None or occupant is other_than: return None
+        if type(occupant) is not list: return occupant
+        return next((robot for robot in occupant if robot is not other_than), None)
+
+    def add_robot(self, robot, cell):
+        self.add_robot_cell(robot, cell[0] * self.cols + cell[1])
+
+    def remove_robot(self, robot, cell):
+        self.remove_robot_cell(robot, cell[0] * self.cols + cell[1])
+
+    def move_robot(self, robot, old, new):
+        if old is not None: self.remove_robot(robot, old)
+        self.add_robot(robot, new)
+
+    def add_robot_cell(self, robot, i): # Flat cell index variants, for callers that already have them
+        occupant = self.robots[i]
+        if occupant is None: self.robots[i] = robot
+        elif type(occupant) is list: occupant.append(robot)
+        else: self.robots[i] = [occupant, robot]
+
+    def remove_robot_cell(self, robot, i):
+        occupant = self.robots[i]
+        if occupant is robot: self.robots[i] = None
+        elif type(occupant) is list:
+            occupant.remove(robot)
+            if len(occupant) == 1: self.robots[i] = occupant[0]
+
+    def move_robot_cell(self, robot, old, new):
+        self.remove_robot_cell(robot, old); self.add_robot_cell(robot, new)
+
+    def obstacle_at(self, cell):
+        return self.obstacles[cell[0] * self.cols + cell[1]] > 0
+
+    def add_obstacle(self, cell):
+        self.obstacles[cell[0] * self.cols + cell[1]] += 1
+
+    def move_obstacle(self, old, new):
+        self.obstacles[old[0] * self.cols + old[1]] -= 1; self.obstacles[new[0] * self.cols + new[1]] += 1
@@ -0,0 +1,447 @@
+import heapq
+from array import array
+
+# Shared pathfinding engine for the simulation: a flat occupancy grid, one
+# array-backed A* used by every caller, and per-waypoint distance fields.
+
+INF = float('inf')
+MOVES = [((0,-1),10),((0,1),10),((-1,0),10),((1,0),10),((-1,-1),14),((-1,1),14),((1,-1),14),((1,1),14)]
+
+# --- Flat Occupancy Grid ---
+class Grid:
+    """Static obstacle grid stored as one flat bytearray (1 = blocked), cell index = r * cols + c.
+
+    grid[r][c] still works for reads and writes: rows are memoryview slices of the same buffer.
+    """
+    def __init__(self, rows, cols, cells=None):
+        self.rows = rows; self.cols = cols
+        self.cells = bytearray(rows * cols) if cells is None else bytearray(cells)
+        view = memoryview(self.cells); self._row_views = [view[r*cols:(r+1)*cols] for r in range(rows)]
+        # (dr, dc, index delta, cost) for the 8 moves, shared by every search on this grid
+        self.moves = [(dr, dc, dr*cols+dc, cost) for (dr, dc), cost in MOVES]
+        self.searcher = None; self.jump_searcher = None # Lazily built per-grid search engines
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Builds a Grid from a list of lists of 0/1."""
+        return cls(len(rows), len(rows[0]), bytes(1 if v else 0 for row in rows for v in row))
+
+    def __len__(self): return self.rows
+    def __getitem__(self, r): return self._row_views[r]
+    def __iter__(self): return iter(self._row_views)
+
+    def index(self, pos): return pos[0] * self.cols + pos[1]
+    def pos(self, index): return divmod(index, self.cols)
+
+# --- A* Pathfinding Code (array-backed, shared) ---
+class AStar:
+    """Reusable A* over one Grid. g-scores, parents and open/closed marks live in arrays
+    allocated once; a per-search stamp replaces clearing them between searches."""
+    def __init__(self, grid):
+        n = grid.rows * grid.cols
+        self.grid = grid; self.stamp = 0; self.nodes_expanded = 0
+        self.g = array('l', [0]) * n; self.parent = array('l', [-1]) * n
+        self.seen = array('L', [0]) * n; self.closed = array('L', [0]) * n
+
+    def search(self, start_pos, end_pos, max_nodes=None):
+        """Returns (path, cost) from start_pos to end_pos, or (None, INF) if there is none or max_nodes expansions
+        did not find it."""
+        grid = self.grid; cells = grid.cells; rows, cols = grid.rows, grid.cols; moves = grid.moves
+        g = self.g; parent = self.parent; seen = self.seen; closed = self.closed
+        self.stamp += 1; stamp = self.stamp
+        s = start_pos[0] * cols + start_pos[1]; t = end_pos[0] * cols + end_pos[1]; er, ec = end_pos
+        g[s] = 0; parent[s] = -1; seen[s] = stamp
+        heap = [(0, s)]; heappush = heapq.heappush; heappop = heapq.heappop
+        nodes_processed = 0
+        while heap:
+            f, i = heappop(heap)
+            if closed[i] == stamp: continue
+            closed[i] = stamp; nodes_processed += 1
+            if i == t:
+                self.nodes_expanded = nodes_processed
+                path = []
+                while i != -1: path.append(divmod(i, cols)); i = parent[i]
+                return path[::-1], g[t]
+            if nodes_processed == max_nodes: self.nodes_expanded = nodes_processed; return None, INF
+            r, c = divmod(i, cols); gi = g[i]
+            for dr, dc, delta, cost in moves:
+                nr = r + dr; nc = c + dc
+                if nr < 0 or nr >= rows or nc < 0 or nc >= cols: continue
+                j = i + delta
+                if cells[j] == 1 or closed[j] == stamp: continue
+                ng = gi + cost
+                if seen[j] == stamp and ng >= g[j]: continue
+                seen[j] = stamp; g[j] = ng; parent[j] = i
+                dx = abs(nr - er); dy = abs(nc - ec)
+                heappush(heap, (ng + 10*(dx+dy) + (14-2*10)*min(dx,dy), j))
+        self.nodes_expanded = nodes_processed
+        return None, INF
+
+def astar(grid, start_pos, end_pos, max_nodes=None):
+    """Shortest 8-connected path on grid; returns (path, cost) or (None, INF). max_nodes caps the expansions."""
+    if grid.searcher is None: grid.searcher = AStar(grid)
+    return grid.searcher.search(start_pos, end_pos, max_nodes)
+
+# --- Jump Point Search ---
+class JumpPointSearch:
+    """A* over jump points for the same uniform-cost 8-connected grid (diagonals may cut corners,
+    as in AStar). Straight runs through open space are skipped instead of expanded, and the returned
+    path is filled back in cell by cell, so its cost always equals AStar's."""
+    def __init__(self, grid):
+        n = grid.rows * grid.cols
+        self.grid = grid; self.stamp = 0; self.nodes_expanded = 0
+        self.g = array('l', [0]) * n; self.parent = array('l', [-1]) * n
+        self.seen = array('L', [0]) * n; self.closed = array('L', [0]) * n
+        self._snapshot = None; self._columns = None # Column-major copy of the grid for vertical scans
+
+    def _free(self, r, c):
+        return 0 <= r < self.grid.rows and 0 <= c < self.grid.cols and self.grid.cells[r * self.grid.cols + c] != 1
+
+    def _sync_columns(self):
+        cells = self.grid.cells; cols = self.grid.cols
+        if self._snapshot != cells:
+            self._snapshot = bytes(cells); self._columns = b"".join(cells[c::cols] for c in range(cols))
+
+    @staticmethod
+    def _scan(buf, base, n, pos, d, sides, goal_pos):
+        """Straight jump along one line of buf (cells base..base+n) from pos in direction d.
+        sides are the offsets of the two neighbouring lines that can create forced neighbours.
+        Returns the line position of the first jump point (or the goal), or -1."""
+        if d > 0:
+            wall = buf.find(1, base + pos + 1, base + n); stop = wall - base if wall >= 0 else n
+            hit = goal_pos if pos < goal_pos < stop else n
+            for side in sides:
+                forced = buf.find(b"\x01\x00", side + pos + 1, side + n) # blocked beside us, free one step ahead
+                if forced >= 0 and forced - side < min(stop, hit): hit = forced - side
+            return hit if hit < n else -1
+        wall = buf.rfind(1, base, base + pos); stop = wall - base if wall >= 0 else -1
+        hit = goal_pos if stop < goal_pos < pos else -1
+        for side in sides:
+            forced = buf.rfind(b"\x00\x01", side, side + pos)
+            if forced >= 0 and forced - side + 1 > max(stop, hit): hit = forced - side + 1
+        return hit
+
+    def _jump_straight(self, r, c, dr, dc, goal):
+        rows, cols = self.grid.rows, self.grid.cols; gr, gc = goal
+        if dr == 0:
+            sides = [rr * cols for rr in (r - 1, r + 1) if 0 <= rr < rows]
+            hit = self._scan(self.grid.cells, r * cols, cols, c, dc, sides, gc if gr == r else -2)
+            return (r, hit) if hit >= 0 else None
+        sides = [cc * rows for cc in (c - 1, c + 1) if 0 <= cc < cols]
+        hit = self._scan(self._columns, c * rows, rows, r, dr, sides, gr if gc == c else -2)
+        return (hit, c) if hit >= 0 else None
+
+    def _jump(self, r, c, dr, dc, goal):
+        """Walks from (r, c) in direction (dr, dc) and returns the first jump point, or None."""
+        if not (dr and dc): return self._jump_straight(r, c, dr, dc, goal)
+        free = self._free
+        while True:
+            r += dr; c += dc
+            if not free(r, c): return None
+            if (r, c) == goal: return (r, c)
+            if (free(r+dr, c-dc) and not free(r, c-dc)) or (free(r-dr, c+dc) and not free(r-dr, c)): return (r, c)
+            if self._jump_straight(r, c, 0, dc, goal) or self._jump_straight(r, c, dr, 0, goal): return (r, c)
+
+    def _directions(self, r, c, p):
+        """Pruned set of directions to search from (r, c) when reached from parent index p."""
+        if p == -1: return [(dr, dc) for (dr, dc), _ in MOVES]
+        pr, pc = divmod(p, self.grid.cols)
+        dr = (r > pr) - (r < pr); dc = (c > pc) - (c < pc); free = self._free
+        dirs = []
+        if dr and dc:
+            if free(r+dr, c): dirs.append((dr, 0))
+            if free(r, c+dc): dirs.append((0, dc))
+            if free(r+dr, c+dc): dirs.append((dr, dc))
+            if not free(r, c-dc): dirs.append((dr, -dc))
+            if not free(r-dr, c): dirs.append((-dr, dc))
+        elif dc:
+            if free(r, c+dc): dirs.append((0, dc))
+            if not free(r+1, c): dirs.append((1, dc))
+            if not free(r-1, c): dirs.append((-1, dc))
+        else:
+            if free(r+dr, c): dirs.append((dr, 0))
+            if not free(r, c+1): dirs.append((dr, 1))
+            if not free(r, c-1): dirs.append((dr, -1))
+        return dirs
+
+    def search(self, start_pos, end_pos, max_nodes=None):
+        """Returns (path, cost) from start_pos to end_pos, or (None, INF) if there is none or max_nodes expansions
+        did not find it."""
+        self._sync_columns()
+        cols = self.grid.cols; g = self.g; parent = self.parent; seen = self.seen; closed = self.closed
+        self.stamp += 1; stamp = self.stamp
+        s = start_pos[0] * cols + start_pos[1]; t = end_pos[0] * cols + end_pos[1]; er, ec = end_pos
+        g[s] = 0; parent[s] = -1; seen[s] = stamp
+        heap = [(0, s)]; heappush = heapq.heappush; heappop = heapq.heappop
+        nodes_processed = 0
+        while heap:
+            f, i = heappop(heap)
+            if closed[i] == stamp: continue
+            closed[i] = stamp; nodes_processed += 1
+            if i == t:
+                self.nodes_expanded = nodes_processed
+                return self._unpack(s, t), g[t]
+            if nodes_processed == max_nodes: self.nodes_expanded = nodes_processed; return None, INF
+            r, c = divmod(i, cols); gi = g[i]
+            for dr, dc in self._directions(r, c, parent[i]):
+                jp = self._jump(r, c, dr, dc, end_pos)
+                if jp is None: continue
+                jr, jc = jp; j = jr * cols + jc
+                if closed[j] == stamp: continue
+                dx = abs(jr - r); dy = abs(jc - c)
+                ng = gi + 10*(dx+dy) + (14-2*10)*min(dx,dy)
+                if seen[j] == stamp and ng >= g[j]: continue
+                seen[j] = stamp; g[j] = ng; parent[j] = i
+                dx = abs(jr - er); dy = abs(jc - ec)
+                heappush(heap, (ng + 10*(dx+dy) + (14-2*10)*min(dx,dy), j))
+        self.nodes_expanded = nodes_processed
+        return None, INF
+
+    def _unpack(self, s, t):
+        """Expands the jump-point chain ending at t into a cell-by-cell path."""
+        cols = self.grid.cols; parent = self.parent
+        jump_points = []; i = t
+        while i != -1: jump_points.append(divmod(i, cols)); i = parent[i]
+        jump_points.reverse()
+        path = [jump_points[0]]
+        for (r, c), (nr, nc) in zip(jump_points, jump_points[1:]):
+            dr = (nr > r) - (nr < r); dc = (nc > c) - (nc < c)
+            while (r, c) != (nr, nc): r += dr; c += dc; path.append((r, c))
+        return path
+
+def jps(grid, start_pos, end_pos, max_nodes=None):
+    """Drop-in replacement for astar() using Jump Point Search; returns (path, cost) or (None, INF)."""
+    if grid.jump_searcher is None: grid.jump_searcher = JumpPointSearch(grid)
+    return grid.jump_searcher.search(start_pos, end_pos, max_nodes)
+
+# --- Resumable A* ---
+class PathSearch:
+    """One A* query that can be suspended between ticks. run(budget) expands at most budget more nodes and returns
+    True once the search is over, with path and cost set ((None, INF) if there is no path). Nodes are expanded in
+    AStar's order, so the result is astar()'s however the work is sliced; state lives in dicts, not the shared arrays."""
+    def __init__(self, grid, start_pos, end_pos):
+        self.grid = grid; self.start = start_pos; self.goal = end_pos; self.reset()
+
+    def reset(self):
+        """Starts over, e.g. after the grid changed under a suspended search."""
+        s = self.start[0] * self.grid.cols + self.start[1]
+        self.heap = [(0, s)]; self.g = {s: 0}; self.parent = {s: -1}; self.closed = set()
+        self.done = False; self.path = None; self.cost = INF; self.nodes_expanded = 0
+
+    def run(self, budget=None):
+        if self.done: return True
+        grid = self.grid; cells = grid.cells; rows, cols = grid.rows, grid.cols; moves = grid.moves
+        g = self.g; parent = self.parent; closed = self.closed; heap = self.heap; heappush = heapq.heappush; heappop = heapq.heappop
+        t = self.goal[0] * cols + self.goal[1]; er, ec = self.goal; nodes = 0
+        while heap and nodes != budget:
+            f, i = heappop(heap)
+            if i in closed: continue
+            closed.add(i); nodes += 1
+            if i == t:
+                path = []; self.cost = g[t]
+                while i != -1: path.append(divmod(i, cols)); i = parent[i]
+                self.path = path[::-1]; self.done = True; break
+            r, c = divmod(i, cols); gi = g[i]
+            for dr, dc, delta, cost in moves:
+                nr = r + dr; nc = c + dc
+                if nr < 0 or nr >= rows or nc < 0 or nc >= cols: continue
+                j = i + delta
+                if cells[j] == 1 or j in closed: continue
+                ng = gi + cost
+                if ng >= g.get(j, INF): continue
+                g[j] = ng; parent[j] = i
+                dx = abs(nr - er); dy = abs(nc - ec)
+                heappush(heap, (ng + 10*(dx+dy) + (14-2*10)*min(dx,dy), j))
+        if not heap: self.done = True
+        self.nodes_expanded += nodes
+        return self.done
+
+# --- Incremental Replanning (D* Lite) ---
+def octile(a, b):
+    dx = abs(a[0] - b[0]); dy = abs(a[1] - b[1])
+    return 10*(dx+dy) + (14-2*10)*min(dx,dy)
+
+class DStarLite:
+    """D* Lite search rooted at a fixed goal for one moving robot. The search state survives between
+    calls, so after grid edits replan() repairs only the part of the search the edits touched."""
+    def __init__(self, grid, start_pos, goal_pos):
+        self.grid = grid; self.goal = goal_pos; self.start = start_pos; self.last_start = start_pos
+        self.km = 0; self.g = {}; self.rhs = {goal_pos: 0}
+        self.heap = [((octile(start_pos, goal_pos), 0), goal_pos)]; self.open = {goal_pos: self.heap[0][0]}
+        self.changed_cells = []; self.nodes_expanded = 0
+
+    def _neighbours(self, u):
+        r, c = u; rows, cols = self.grid.rows, self.grid.cols
+        for (dr, dc), cost in MOVES:
+            nr = r + dr; nc = c + dc
+            if 0 <= nr < rows and 0 <= nc < cols: yield (nr, nc), cost
+
+    def _key(self, s):
+        m = min(self.g.get(s, INF), self.rhs.get(s, INF))
+        return (m + octile(self.start, s) + self.km, m)
+
+    def _update_vertex(self, u):
+        g = self.g; cells = self.grid.cells; cols = self.grid.cols
+        if u != self.goal:
+            best = INF
+            for v, cost in self._neighbours(u):
+                if cells[v[0] * cols + v[1]] != 1:
+                    gv = g.get(v, INF)
+                    if gv + cost < best: best = gv + cost
+            self.rhs[u] = best
+        self.open.pop(u, None)
+        if g.get(u, INF) != self.rhs.get(u, INF):
+            key = self._key(u); self.open[u] = key; heapq.heappush(self.heap, (key, u))
+
+    def _top_key(self):
+        heap = self.heap; open_ = self.open
+        while heap and open_.get(heap[0][1]) != heap[0][0]: heapq.heappop(heap) # Drop stale entries
+        return heap[0][0] if heap else (INF, INF)
+
+    def _compute_shortest_path(self):
+        g = self.g; rhs = self.rhs; start = self.start; nodes = 0
+        while self._top_key() < self._key(start) or rhs.get(start, INF) != g.get(start, INF):
+            k_old, u = heapq.heappop(self.heap); del self.open[u]; nodes += 1
+            k_new = self._key(u)
+            if k_old < k_new:
+                self.open[u] = k_new; heapq.heappush(self.heap, (k_new, u))
+            elif g.get(u, INF) > rhs.get(u, INF):
+                g[u] = rhs[u]
+                for s, _ in self._neighbours(u): self._update_vertex(s)
+            else:
+                g[u] = INF
+                self._update_vertex(u)
+                for s, _ in self._neighbours(u): self._update_vertex(s)
+        self.nodes_expanded += nodes
+
+    def cell_changed(self, cell):
+        """Records a toggled cell; it is folded into the search on the next replan()."""
+        self.changed_cells.append(cell)
+
+    def replan(self, start_pos):
+        """Returns (path, cost) from start_pos to the goal, or (None, INF)."""
+        self.start = start_pos
+        if self.changed_cells:
+            self.km += octile(self.last_start, start_pos); self.last_start = start_pos
+            for cell in self.changed_cells:
+                for s, _ in self._neighbours(cell): self._update_vertex(s)
+            self.changed_cells = []
+        self._compute_shortest_path()
+        cost = self.g.get(start_pos, INF)
+        if cost == INF: return None, INF
+        g = self.g; cells = self.grid.cells; cols = self.grid.cols
+        path = [start_pos]; u = start_pos
+        while u != self.goal:
+            best = None; best_cost = INF
+            for v, c in self._neighbours(u):
+                if cells[v[0] * cols + v[1]] != 1 and c + g.get(v, INF) < best_cost: best = v; best_cost = c + g.get(v, INF)
+            if best is None or len(path) > len(cells): return None, INF
+            path.append(best); u = best
+        return path, cost
+
+PLANNERS = {"astar": astar, "jps": jps} # Selectable single-query planners
+
+# --- Distance Fields (reverse Dijkstra per waypoint) ---
+class DistanceField:
+    """Octile path cost (10/14 weights) from every cell of the grid to one source cell."""
+    def __init__(self, grid, source):
+        self.grid = grid; self.source = source
+        self.rows, self.cols = grid.rows, grid.cols
+        self.rebuild()
+
+    def rebuild(self):
+        n = self.rows * self.cols
+        self.dist = [INF] * n; self.parent = [-1] * n # parent = next cell on the way to the source
+        s = self.grid.index(self.source)
+        if self.grid.cells[s] == 1: return
+        self.dist[s] = 0
+        self._propagate([(0, s)])
+
+    def _propagate(self, heap):
+        cells = self.grid.cells; moves = self.grid.moves; rows, cols = self.rows, self.cols; dist = self.dist; parent = self.parent
+        heapq.heapify(heap)
+        while heap:
+            d, i = heapq.heappop(heap)
+            if d > dist[i]: continue
+            r, c = divmod(i, cols)
+            for dr, dc, delta, cost in moves:
+                nr = r + dr; nc = c + dc
+                if nr < 0 or nr >= rows or nc < 0 or nc >= cols: continue
+                j = i + delta
+                if cells[j] == 1: continue
+                nd = d + cost
+                if nd < dist[j]: dist[j] = nd; parent[j] = i; heapq.heappush(heap, (nd, j))
+
+    def cell_changed(self, cell):
+        """Repairs the field after cell was toggled, touching only the cells whose cost can change."""
+        r, c = cell; rows, cols = self.rows, self.cols
+        if cell == self.source: self.rebuild(); return
+        grid = self.grid; dist = self.dist; parent = self.parent; x = r * cols + c
+        if grid[r][c] == 1:
+            # Newly blocked: everything routed through x loses its cost and is re-seeded from its border
+            if dist[x] == INF: return
+            affected = [x]; stack = [x]
+            while stack:
+                i = stack.pop(); ir, ic = divmod(i, cols)
+                for (dr, dc), _ in MOVES:
+                    nr = ir + dr; nc = ic + dc
+                    if 0 <= nr < rows and 0 <= nc < cols:
+                        j = nr * cols + nc
+                        if parent[j] == i: parent[j] = -1; dist[j] = INF; affected.append(j); stack.append(j)
+            dist[x] = INF; parent[x] = -1
+            heap = []
+            for i in affected[1:]:
+                ir, ic = divmod(i, cols)
+                for (dr, dc), cost in MOVES:
+                    nr = ir + dr; nc = ic + dc
+                    if 0 <= nr < rows and 0 <= nc < cols and grid[nr][nc] != 1:
+                        j = nr * cols + nc
+                        if dist[j] + cost < dist[i]: dist[i] = dist[j] + cost; parent[i] = j
+                if dist[i] < INF: heap.append((dist[i], i))
+            self._propagate(heap)
+        else:
+            # Newly free: x takes its best neighbour and any improvement flows outwards
+            for (dr, dc), cost in MOVES:
+                nr = r + dr; nc = c + dc
+                if 0 <= nr < rows and 0 <= nc < cols and grid[nr][nc] != 1:
+                    j = nr * cols + nc
+                    if dist[j] + cost < dist[x]: dist[x] = dist[j] + cost; parent[x] = j
+            if dist[x] < INF: self._propagate([(dist[x], x)])
+
+    def cost_from(self, pos):
+        """Path cost from pos to the source, INF if unreachable."""
+        r, c = pos
+        if self.grid[r][c] != 1: return self.dist[r * self.cols + c]
+        # A robot standing on a freshly placed obstacle can still step off it
+        best = INF
+        for (dr, dc), cost in MOVES:
+            nr = r + dr; nc = c + dc
+            if 0 <= nr < self.rows and 0 <= nc < self.cols and self.grid[nr][nc] != 1:
+                best = min(best, self.dist[nr * self.cols + nc] + cost)
+        return best
+
+class DistanceFieldCache:
+    """Lazily built distance fields for a fixed set of named targets, keyed on a grid version counter."""
+    def __init__(self, grid, targets):
+        self.grid = grid; self.targets = dict(targets)
+        self.version = 0 # Bumped on every cell toggle
+        self.changes = []; self.changes_base = 0 # changes[i] produced version changes_base + i + 1
+        self.fields = {} # name -> (DistanceField, version it reflects)
+
+    def cell_toggled(self, cell):
+        self.changes.append(cell); self.version += 1
+
+    def field(self, name):
+        entry = self.fields.get(name)
+        if entry is None or entry[1] < self.changes_base:
+            field = DistanceField(self.grid, self.targets[name])
+        else:
+            field, field_version = entry
+            for cell in self.changes[field_version - self.changes_base:]: field.cell_changed(cell)
+        self.fields[name] = (field, self.version)
+        if len(self.changes) > 64 and all(v == self.version for _, v in self.fields.values()):
+            self.changes = []; self.changes_base = self.version
+        return field
+
+    def cost(self, name, pos):
+        return self.field(name).cost_from(pos)
@@ -0,0 +1,51 @@
+from pathfinding import PathSearch
+
+# Time-sliced path planning. Instead of running every search to the end on the
+# tick it is asked for, the engine hands PathSearches to a PlanScheduler that
+# spends a fixed number of node expansions per tick across all outstanding
+# requests. Urgent tasks get the larger shares and the budget left over by
+# searches that finish early goes to the next in line, so a long search never
+# holds up a tick and is never abandoned either. Budgets count nodes, not
+# seconds, so runs do not depend on how busy the machine is.
+
+class PlanScheduler:
+    """Outstanding searches by key (robot id), each with its task priority (lower is more urgent)."""
+    def __init__(self, budget, min_slice=64):
+        self.budget = budget; self.min_slice = min_slice # Nodes per tick in all; smallest share worth handing out
+        self.requests = {} # key -> (priority, submission order, PathSearch)
+        self.submitted = 0; self.nodes = 0; self.completed = 0
+
+    def __contains__(self, key): return key in self.requests
+
+    def submit(self, key, grid, start_pos, end_pos, priority):
+        """Queues a search from start_pos to end_pos, replacing any search still outstanding for key."""
+        search = PathSearch(grid, start_pos, end_pos); self.requests[key] = (priority, self.submitted, search); self.submitted += 1
+        return search
+
+    def reset(self):
+        """Restarts every outstanding search, for when the grid changed under them."""
+        for _, _, search in self.requests.values(): search.reset()
+
+    def pending(self):
+        """(key, search) pairs, most urgent first (then in submission order)."""
+        return [(key, search) for key, (_, _, search) in sorted(self.requests.items(), key=lambda item: item[1][:2])]
+
+    def run(self):
+        """Spends one tick's budget. Each search gets a share weighted by 1 / priority (at least min_slice, while the
+        budget lasts), then whatever is left goes to unfinished searches in order. Returns the finished (key, search)
+        pairs, most urgent first."""
+        order = sorted(self.requests.items(), key=lambda item: item[1][:2])
+        if not order: return []
+        weights = [1 / max(priority, 1) for _, (priority, _, _) in order]; total = sum(weights); left = self.budget
+        for (_, (_, _, search)), weight in zip(order, weights):
+            if left <= 0: break
+            share = min(left, max(self.min_slice, int(self.budget * weight / total)))
+            before = search.nodes_expanded; search.run(share); left -= search.nodes_expanded - before
+        for _, (_, _, search) in order:
+            if left <= 0: break
+            if not search.done: before = search.nodes_expanded; search.run(left); left -= search.nodes_expanded - before
+        self.nodes += self.budget - left
+        finished = [(key, search) for key, (_, _, search) in order if search.done]
+        for key, _ in finished: del self.requests[key]
+        self.completed += len(finished)
+        return finished
@@ -0,0 +1,109 @@
+import json
+import time
+from array import array
+
+# Hot-loop profiler. A Profiler attached as Simulation.profiler (and used by
+# the viewer for its own frame phases) times every phase of a tick and every
+# path search, with the nodes each search expanded. Each phase keeps a rolling
+# window of durations for percentiles and a log2 histogram, and a capture can
+# record every span of a chosen tick range as a Chrome trace-event file (open
+# it in chrome://tracing or Perfetto). Profiling is switched by setting or
+# clearing Simulation.profiler at any time; while it is None every call site
+# costs one attribute test.
+
+WINDOW = 1024 # Samples per phase behind the rolling percentiles and histograms
+BUCKETS = 24 # Histogram buckets: [0, 1us), [1, 2us), [2, 4us) ... the last one open-ended
+
+class PhaseStats:
+    """Rolling window of one phase's durations in seconds (and nodes expanded, for searches), plus lifetime totals."""
+    def __init__(self, window=WINDOW):
+        self.samples = array('d', [0.0]) * window; self.nodes = array('q', [0]) * window; self.next = 0
+        self.count = 0; self.total = 0.0; self.total_nodes = 0
+
+    def add(self, seconds, nodes=0):
+        i = self.next; self.samples[i] = seconds; self.nodes[i] = nodes; self.next = (i + 1) % len(self.samples)
+        self.count += 1; self.total += seconds; self.total_nodes += nodes
+
+    def window(self):
+        """The durations in the window (oldest first once it has wrapped)."""
+        if self.count < len(self.samples): return self.samples[:self.count]
+        return self.samples[self.next:] + self.samples[:self.next]
+
+    def percentile(self, q):
+        values = sorted(self.window())
+        return values[min(len(values) - 1, int(q * len(values)))] if values else None
+
+    def histogram(self):
+        """Counts of the window's durations per bucket: bucket k holds [2**(k-1), 2**k) microseconds (k = 0: under 1us)."""
+        counts = [0] * BUCKETS
+        for seconds in self.window(): counts[min(BUCKETS - 1, int(seconds * 1e6).bit_length())] += 1
+        return counts
+
+class Profiler:
+    """Phase and search timings keyed by name ("tick/movement", "search/astar", "frame/draw" ...). Call sites take
+    t = clock() before a phase and hand it to lap() or search() after it."""
+    def __init__(self, window=WINDOW, clock=time.perf_counter):
+        self.window = window; self.clock = clock; self.origin = clock()
+        self.stats = {} # name -> PhaseStats
+        self.tick = 0 # Set by the engine; spans are filed under the tick they ran in
+        self.capture_ticks = None; self.capture_path = None; self.events = [] # Trace capture window and its spans
+
+    def lap(self, name, start, nodes=0):
+        """Records the span from start to now under name; returns now, the start of the next phase."""
+        now = self.clock(); stats = self.stats.get(name)
+        if stats is None: stats = self.stats[name] = PhaseStats(self.window)
+        stats.add(now - start, nodes)
+        if self.capture_ticks and self.capture_ticks[0] <= self.tick <= self.capture_ticks[1]:
+            self.events.append((name, start, now, self.tick, nodes))
+        return now
+
+    def search(self, kind, start, nodes):
+        """A path search of kind that began at start and expanded nodes."""
+        return self.lap("search/" + kind, start, nodes)
+
+    # --- Chrome Trace ---
+    def capture(self, first_tick, last_tick, path=None):
+        """Keeps every span of ticks first_tick..last_tick; with path, end_tick() writes the trace there once the
+        window has passed."""
+        self.capture_ticks = (first_tick, last_tick); self.capture_path = path; self.events = []
+
+    def end_tick(self, tick):
+        """Called by the engine after each tick; finishes a capture whose window is over."""
+        self.tick = tick
+        if self.capture_ticks and tick > self.capture_ticks[1]:
+            if self.capture_path: self.write_trace(self.capture_path)
+            self.capture_ticks = None
+
+    def trace(self):
+        """The captured spans as a Chrome trace-event document (complete events, microseconds)."""
+        origin = self.origin
+        events = [{"name": "thread_name", "ph": "M", "pid": 0, "tid": 0, "args": {"name": "simulation"}}]
+        for name, start, end, tick, nodes in self.events:
+            category, _, label = name.rpartition("/"); args = {"tick": tick}
+            if nodes: args["nodes"] = nodes
+            events.append({"name": label, "cat": category or "phase", "ph": "X", "pid": 0, "tid": 0,
+                           "ts": round((start - origin) * 1e6, 3), "dur": round((end - start) * 1e6, 3), "args": args})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_trace(self, path):
+        with open(path, "w") as f: json.dump(self.trace(), f)
+
+    # --- Reports ---
+    def summary(self):
+        """{name: {"count", "mean_s", "p50_s", "p95_s", "p99_s", "max_s", "nodes_per_call", "histogram"}}, with the
+        percentiles, max and histogram over the rolling window."""
+        report = {}
+        for name, stats in sorted(self.stats.items()):
+            window = stats.window()
+            report[name] = {"count": stats.count, "mean_s": stats.total / stats.count, "p50_s": stats.percentile(0.5),
+                            "p95_s": stats.percentile(0.95), "p99_s": stats.percentile(0.99), "max_s": max(window),
+                            "nodes_per_call": stats.total_nodes / stats.count, "histogram": stats.histogram()}
+        return report
+
+    def report_lines(self):
+        lines = [f"{'phase':<24} {'count':>8} {'mean us':>9} {'p50 us':>8} {'p95 us':>8} {'p99 us':>8} {'max us':>9} {'nodes':>8}"]
+        for name, row in self.summary().items():
+            us = lambda key: row[key] * 1e6
+            lines.append(f"{name:<24} {row['count']:>8} {us('mean_s'):>9.1f} {us('p50_s'):>8.1f} {us('p95_s'):>8.1f} {us('p99_s'):>8.1f} "
+                         f"{us('max_s'):>9.1f} {row['nodes_per_call']:>8.0f}")
+        return lines
@@ -0,0 +1,152 @@
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from pathfinding import Grid
+from simulation import GRID_COLS, GRID_ROWS, TICK_RATE, WAYPOINTS, MovingObstacle, Simulation
+
+try:
+    import numpy as np
+except ImportError: # Optional: only needed for .npz result files
+    np = None
+
+# Monte Carlo fleet sizing. A sweep definition names the values to try on each
+# axis (robot count, map file, moving obstacle layout, crowd, per-waypoint task
+# arrival rates, waypoint priorities, seed); every combination runs headless
+# in a process pool and one row of aggregate throughput and latency per run
+# lands in a columnar result file. A run depends only on its own parameters and
+# seed, so results do not change with the worker count or scheduling order.
+
+AXES = ("robots", "map", "obstacles", "crowd", "task_rates", "priorities", "seed") # Sweep axes, outermost first
+SETTINGS = {"ticks": 8 * 3600 * TICK_RATE, "tick_rate": TICK_RATE, "task_rate": 0.05, "planner": "astar",
+            "assignment": "optimal", "cooperative": False, "incremental_replanning": True, "plan_budget": None} # Shared by every run unless overridden
+
+# --- Maps ---
+_maps = {} # path -> parsed map, per worker process
+
+def load_map(path):
+    """Reads a JSON map file: {"grid": ["..#..", ...], "waypoints": {name: [r, c]}, optional "priorities" and
+    "moving_obstacles" (a layout, see build_obstacles()) and "crowd" (see build_crowd()). '#' cells are walls; waypoints
+    must include "ENT"."""
+    if path not in _maps:
+        with open(path) as f: spec = json.load(f)
+        rows = spec["grid"]
+        if any(len(row) != len(rows[0]) for row in rows): raise ValueError(f"{path}: grid rows differ in length")
+        waypoints = {name: tuple(pos) for name, pos in spec["waypoints"].items()}
+        if "ENT" not in waypoints: raise ValueError(f"{path}: no ENT waypoint for the robots to start at")
+        _maps[path] = {"cells": bytes(1 if ch == "#" else 0 for row in rows for ch in row), "rows": len(rows), "cols": len(rows[0]),
+                       "waypoints": waypoints, "priorities": spec.get("priorities"), "moving_obstacles": spec.get("moving_obstacles"),
+                       "crowd": spec.get("crowd")}
+    return _maps[path]
+
+def build_obstacles(layout, tick_rate, bounds):
+    """MovingObstacles from a layout: a list of [start [r, c], end [r, c], speed, axis "x" or "y"]."""
+    return [MovingObstacle(tuple(start), tuple(end), speed, axis, tick_rate, bounds) for start, end, speed, axis in layout]
+
+def build_crowd(spec, tick_rate, grid, waypoints, seed):
+    """A crowd.Crowd from a spec: {"walkers": count, "walker_speed": cells per second, "scripts": [[speed, [[r, c], ...]], ...]}.
+    Walkers start on random free non-waypoint cells; scripted agents loop over their cells."""
+    from crowd import Crowd, move_delay
+    crowd = Crowd(grid.rows, grid.cols, seed)
+    for speed, cells in spec.get("scripts", ()): crowd.add_script([tuple(cell) for cell in cells], move_delay(speed, tick_rate))
+    if spec.get("walkers"): crowd.scatter(grid, spec["walkers"], move_delay(spec.get("walker_speed", 1), tick_rate), avoid=waypoints.values())
+    return crowd
+
+# --- Sweep Expansion ---
+def _axis(values):
+    """Axis values as (label, value) pairs; a dict names its values, a list is labelled by the values themselves
+    (None, the built-in default, as "default")."""
+    if isinstance(values, dict): return list(values.items())
+    if not isinstance(values, list): values = [values]
+    label = lambda value: "default" if value is None else value if isinstance(value, (int, str)) else json.dumps(value, sort_keys=True)
+    return [(label(value), value) for value in values]
+
+def expand_sweep(spec):
+    """Every combination of the sweep's axes as scenario dicts, in a fixed order; missing axes take the defaults."""
+    defaults = {"robots": [None], "map": [None], "obstacles": [None], "crowd": [None], "task_rates": [None], "priorities": [None], "seed": [0]}
+    axes = [_axis(spec.get(axis + "s" if axis in ("map", "seed") else axis, defaults[axis])) for axis in AXES]
+    settings = dict(SETTINGS, **spec.get("settings", {}))
+    scenarios = []
+    for index, combination in enumerate(itertools.product(*axes)):
+        scenario = dict(settings, index=index)
+        for axis, (label, value) in zip(AXES, combination): scenario[axis] = value; scenario[axis + "_label"] = label
+        scenarios.append(scenario)
+    return scenarios
+
+# --- Runs ---
+def run_scenario(scenario):
+    """Runs one scenario headless and returns its result row."""
+    tick_rate = scenario["tick_rate"]; grid = waypoints = obstacles = crowd = None; priorities = scenario["priorities"]; crowd_spec = scenario["crowd"]
+    if scenario["map"] is not None:
+        floor = load_map(scenario["map"]); grid = Grid(floor["rows"], floor["cols"], floor["cells"]); waypoints = floor["waypoints"]
+        priorities = priorities or floor["priorities"]; layout = scenario["obstacles"] if scenario["obstacles"] is not None else floor["moving_obstacles"] or []
+        obstacles = build_obstacles(layout, tick_rate, (floor["rows"], floor["cols"])); crowd_spec = crowd_spec or floor["crowd"]
+    elif scenario["obstacles"] is not None: obstacles = build_obstacles(scenario["obstacles"], tick_rate, (GRID_ROWS, GRID_COLS))
+    if crowd_spec:
+        grid = grid or Grid(GRID_ROWS, GRID_COLS); crowd = build_crowd(crowd_spec, tick_rate, grid, waypoints or WAYPOINTS, scenario["seed"])
+    sim = Simulation(seed=scenario["seed"], tick_rate=tick_rate, task_rate=scenario["task_rate"], planner=scenario["planner"],
+                     incremental_replanning=scenario["incremental_replanning"], cooperative=scenario["cooperative"],
+                     robot_count=scenario["robots"], assignment=scenario["assignment"], grid=grid, waypoints=waypoints,
+                     priorities=priorities, moving_obstacles=obstacles, task_rates=scenario["task_rates"], crowd=crowd, plan_budget=scenario["plan_budget"])
+    wall_start = time.perf_counter(); sim.run(scenario["ticks"]); wall = time.perf_counter() - wall_start
+    metrics = sim.metrics; completion = metrics.completion.snapshot(); assignment = metrics.assignment.snapshot()
+    row = {"index": scenario["index"], **{axis: scenario[axis + "_label"] for axis in AXES}}
+    row["robots"] = len(sim.robots)
+    row.update(simulated_s=sim.now, wall_s=wall, tasks_created=metrics.tasks_created, tasks_complete=completion["count"],
+               tasks_failed=metrics.task_status["FAILED"], tasks_open=metrics.tasks_created - completion["count"] - metrics.task_status["FAILED"],
+               throughput_per_hour=completion["count"] * 3600 / sim.now if sim.now else 0.0, wait_ticks=sim.wait_ticks)
+    row.update({f"completion_{key}": completion[key] for key in ("mean", "p50", "p95", "p99", "max")})
+    row.update({f"assignment_{key}": assignment[key] for key in ("mean", "p50", "p95", "p99")})
+    return row
+
+def run_sweep(spec, workers=None, progress=None):
+    """Runs every scenario of spec in a process pool (workers=1: in this process). Returns result rows in
+    scenario order; progress(done, total) is called as runs finish."""
+    scenarios = expand_sweep(spec); rows = [None] * len(scenarios)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1: results = map(run_scenario, scenarios)
+    else: pool = ProcessPoolExecutor(workers); results = pool.map(run_scenario, scenarios) # One run per task: runs are long, pickling is tiny
+    try:
+        for done, row in enumerate(results, 1):
+            rows[row["index"]] = row
+            if progress: progress(done, len(scenarios))
+    finally:
+        if workers != 1: pool.shutdown(cancel_futures=True)
+    return rows
+
+# --- Columnar Output ---
+def to_columns(rows):
+    return {name: [row[name] for row in rows] for name in rows[0]} if rows else {}
+
+def write_columns(path, rows):
+    """Writes rows column by column: .json is {column: [values]}, .npz one array per column (needs NumPy)."""
+    columns = to_columns(rows)
+    if path.endswith(".npz"):
+        if np is None: raise RuntimeError("writing .npz results needs NumPy")
+        np.savez_compressed(path, **{name: np.array([np.nan if v is None else v for v in values]) for name, values in columns.items()})
+    else:
+        with open(path, "w") as f: json.dump(columns, f)
+
+# --- Entry Point ---
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Run a fleet-sizing sweep of headless simulations across CPU cores.")
+    parser.add_argument("sweep", help="JSON sweep definition: axes robots, maps, obstacles, crowd, task_rates, priorities, seeds and shared settings")
+    parser.add_argument("-o", "--output", default="results.json", help="columnar result file (.json or .npz)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    args = parser.parse_args(argv)
+    with open(args.sweep) as f: spec = json.load(f)
+    base = os.path.dirname(os.path.abspath(args.sweep)) # Map paths are relative to the sweep file
+    maps = spec.get("maps")
+    if isinstance(maps, dict): spec["maps"] = {label: path and os.path.join(base, path) for label, path in maps.items()}
+    elif isinstance(maps, list): spec["maps"] = {path: path and os.path.join(base, path) for path in maps}
+    wall_start = time.perf_counter()
+    rows = run_sweep(spec, args.workers, lambda done, total: print(f"\r{done}/{total} runs", end="", file=sys.stderr, flush=True))
+    print(file=sys.stderr); write_columns(args.output, rows)
+    print(f"{len(rows)} runs in {time.perf_counter() - wall_start:.1f}s wall -> {args.output}")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,605 @@
+import random
+import sys
+import time
+
+from assignment import NO_BID, PRIORITY_WEIGHT, Assigner
+from cooperative import CooperativePlanner, forecast_obstacles
+import eventlog as ev
+from metrics import QUANTILES, Metrics
+from occupancy import OccupancyIndex
+from hierarchical import hpa
+from pathfinding import INF, PLANNERS, DistanceFieldCache, DStarLite, Grid
+from planning import PlanScheduler
+from taskstore import TaskStore, TrackedTask
+
+# Headless hospital swarm engine. Nothing in here imports pygame: the viewer in
+# final_code.py (or any other front end) only reads the state of a Simulation
+# and feeds user input back through toggle_obstacle() / create_task(). Every
+# state transition is also reported to Simulation.event_sinks as an eventlog
+# record: the binary event log and the verbose console view both listen there.
+
+# --- Simulation Constants ---
+GRID_ROWS=12; GRID_COLS=7
+TICK_RATE=5 # Simulated ticks per simulated second (the old FPS)
+WAYPOINTS = {"ENT":(1,3),"PHA":(4,3),"ICU":(4,1),"R101":(4,5),"EMR":(7,3),"STO":(10,3)}
+WAYPOINT_PRIORITIES = {"ICU": 1, "PHA": 2, "R101": 3, "EMR": 4, "STO": 5, "ENT": 99}
+TASK_WAYPOINTS = [name for name in WAYPOINTS if name != "ENT"] # Valid task destinations
+ROBOT_IDS = ["R1","R2","R3"]
+SIM_PLANNERS = dict(PLANNERS, hpa=hpa) # Flat planners plus hierarchical HPA*
+
+# --- Moving Obstacle Class (Handles vertical too) ---
+class MovingObstacle:
+    def __init__(self, start_pos, end_pos, speed=1, axis='x', tick_rate=TICK_RATE, bounds=(GRID_ROWS, GRID_COLS)): # axis is 'x' or 'y'
+        self.pos = start_pos; self.start_pos = start_pos; self.end_pos = end_pos
+        self.direction = 1; self.speed = speed; self.move_timer = 0
+        self.move_delay = max(1, tick_rate // speed); self.axis = axis; self.bounds = bounds # (rows, cols) of the map
+
+    def update(self):
+        self.move_timer += 1
+        if self.move_timer >= self.move_delay:
+            self.move_timer = 0
+            current_r, current_c = self.pos
+            target_pos = self.end_pos if self.direction == 1 else self.start_pos
+            target_r, target_c = target_pos
+
+            if self.axis == 'x': # Horizontal movement
+                if current_c != target_c:
+                    new_c = current_c + self.direction
+                    if 0 <= new_c < self.bounds[1]: self.pos = (current_r, new_c)
+                    else: self.direction *= -1 # Hit boundary
+                    if self.pos == target_pos: self.direction *= -1 # Hit target
+                else: self.direction *= -1 # Already at target
+            elif self.axis == 'y': # Vertical movement
+                 if current_r != target_r:
+                      new_r = current_r + self.direction
+                      if 0 <= new_r < self.bounds[0]: self.pos = (new_r, current_c)
+                      else: self.direction *= -1 # Hit boundary
+                      if self.pos == target_pos: self.direction *= -1 # Hit target
+                 else: self.direction *= -1 # Already at target
+
+def default_moving_obstacles(tick_rate=TICK_RATE):
+    return [
+        MovingObstacle(start_pos=(6, 1), end_pos=(6, 5), speed=1, axis='x', tick_rate=tick_rate), # Horizontal row 6
+        MovingObstacle(start_pos=(3, 1), end_pos=(3, 5), speed=2, axis='x', tick_rate=tick_rate), # Horizontal row 3 (faster)
+        MovingObstacle(start_pos=(5, 4), end_pos=(9, 4), speed=1, axis='y', tick_rate=tick_rate)  # Vertical col 4
+    ]
+
+class Task(TrackedTask):
+    def __init__(self, task_id, target_waypoint, created_at, priority=None, target_pos=None):
+        self.id = task_id; self.target_waypoint = target_waypoint.upper()
+        self.target_pos = target_pos if target_pos is not None else WAYPOINTS.get(self.target_waypoint)
+        self.priority = priority if priority is not None else WAYPOINT_PRIORITIES.get(self.target_waypoint, 5)
+        self.status = "ANNOUNCED"; self.assigned_robot = None
+        self.created_at = created_at; self.bids = {}; self.potential_bidders = set()
+        self.completed_at = None; self.completion_time = None
+
+class Robot:
+    def __init__(self, sim, robot_id, start_pos):
+        self.sim = sim; self.id = robot_id; self.pos = start_pos; self.index = len(sim.robots) # index: robot number in event records
+        self.path = []; self.path_index = 0; self.status = "IDLE"
+        self.target_waypoint = None; self.current_task_id = None
+        self.energy = 100.0; self.low_energy_threshold = 20.0; self.energy_drain_per_step = 0.5
+        self.pending_bid_task = None; self.assigned_tick = None # Tick of the last won auction (viewer highlight)
+        self.replanner = None # D* Lite state for the current task when incremental replanning is on
+        self.plan_tick = None; self.plan_broken = False # Cooperative mode: when the timed path was made / if it was not followed
+
+    @property
+    def pos(self):
+        return self._pos
+
+    @pos.setter
+    def pos(self, value): # Every move lands in the occupancy index
+        old = self.__dict__.get("_pos"); self._pos = value
+        if old != value: self.sim.occupancy.move_robot(self, old, value)
+
+    @property
+    def status(self):
+        return self._status
+
+    @status.setter
+    def status(self, value): # Every transition lands in the fleet counters
+        old = self.__dict__.get("_status"); self._status = value
+        if old != value:
+            self.sim.metrics.robot_status_changed(old, value)
+            if self.sim.event_sinks: self.sim.emit(ev.ROBOT_STATUS, self.index, code=ev.ROBOT_STATUS_CODES[value])
+
+    def assign_task(self, task):
+        sim = self.sim; grid = sim.grid
+        if not task.target_pos: sim.log(f"!!! {self.id} no waypoint {task.target_waypoint}."); self.status = "IDLE"; return False
+        if grid[self.pos[0]][self.pos[1]] == 1: sim.log(f"!!! {self.id} inside obstacle."); self.status = "FAILED"; return False
+        if grid[task.target_pos[0]][task.target_pos[1]] == 1: sim.log(f"!!! Target {task.target_waypoint} blocked."); self.status = "IDLE"; return False
+        if sim.occupancy.obstacle_at(task.target_pos):
+            sim.log(f"!!! Target {task.target_waypoint} blocked by MOVING obstacle!"); self.status = "IDLE"; return False
+        if self.pos == task.target_pos: # Already there: delivered on the spot instead of failing for want of a path
+            task.status = "ASSIGNED"; task.assigned_robot = self.id; self.assigned_tick = sim.tick; self.status = "IDLE"
+            sim.log(f"{self.id} assigned Task {task.id}, already at {task.target_waypoint}."); sim.complete_task(task.id); return True
+        if sim.planning: # Searched over the next ticks; REPLANNING until the scheduler has the path
+            self.path = []; self.path_index = 0; self.status = "REPLANNING"; self.target_waypoint = task.target_waypoint
+            self.current_task_id = task.id; task.status = "ASSIGNED"; task.assigned_robot = self.id; self.assigned_tick = sim.tick
+            sim.planning.submit(self.id, grid, self.pos, task.target_pos, task.priority)
+            sim.log(f"{self.id} assigned Task {task.id}, planning."); return True
+        if sim.cooperative:
+            path = sim.plan_cooperative(self, task)
+        elif sim.incremental_replanning and not sim.hierarchical:
+            prof = sim.profiler; t = prof and prof.clock()
+            self.replanner = DStarLite(grid, self.pos, task.target_pos); path, _ = self.replanner.replan(self.pos)
+            if prof: prof.search("dstar", t, self.replanner.nodes_expanded)
+        else: path, _ = sim.timed_find_path(self.pos, task.target_pos)
+        if path and len(path) > 1:
+            self.path = path; self.path_index = 1; self.status = "MOVING"; self.target_waypoint = task.target_waypoint
+            self.current_task_id = task.id; task.status = "ASSIGNED"; task.assigned_robot = self.id
+            self.assigned_tick = sim.tick
+            sim.log(f"{self.id} assigned Task {task.id}. Path: {len(self.path)-1} steps."); return True
+        else: sim.log(f"!!! {self.id} no path in assign_task. Path: {path}"); self.status = "IDLE"; self.replanner = None; return False
+
+    def move(self):
+        sim = self.sim
+        if self.status == "MOVING":
+            if self.path_index < len(self.path):
+                next_pos = self.path[self.path_index]; next_r, next_c = next_pos
+                if sim.cooperative and next_pos == self.pos: # Planned wait
+                    sim.wait_ticks += 1; self.path_index += 1
+                    if sim.event_sinks: sim.emit(ev.WAIT, self.index, self.current_task_id, next_r, next_c, code=2)
+                    return
+
+                if sim.grid[next_r][next_c] == 1:
+                    if sim.event_sinks: sim.emit(ev.BLOCKED, self.index, self.current_task_id, next_r, next_c)
+                    self.status = "REPLANNING"; self.path = []; return
+
+                occupancy = sim.occupancy; i = next_r * occupancy.cols + next_c
+                if occupancy.obstacles[i]: # Moving obstacle there
+                    if sim.event_sinks: sim.emit(ev.WAIT, self.index, self.current_task_id, next_r, next_c, code=0)
+                    sim.wait_ticks += 1; self.plan_broken = True; return
+
+                if occupancy.robots[i] is not None and occupancy.robot_at(next_pos, self) is not None: # Another robot there
+                    if sim.event_sinks: sim.emit(ev.WAIT, self.index, self.current_task_id, next_r, next_c, code=1)
+                    sim.wait_ticks += 1; self.plan_broken = True; return
+
+                r1,c1=self.pos; r2,c2=next_pos
+                move_cost_factor=1.4 if abs(r1-r2)==1 and abs(c1-c2)==1 else 1.0; energy_cost=self.energy_drain_per_step*move_cost_factor
+                if self.energy >= energy_cost:
+                    self.energy-=energy_cost; self.pos=next_pos; self.path_index+=1
+                    if sim.event_sinks: sim.emit(ev.MOVE, self.index, self.current_task_id, next_r, next_c, self.energy)
+                else:
+                    if sim.event_sinks: sim.emit(ev.OUT_OF_ENERGY, self.index, self.current_task_id, r1, c1, self.energy)
+                    self.status="IDLE"; self.path = []; self.replanner = None
+            elif self.path_index >= len(self.path) and len(self.path) > 0 :
+                 if sim.event_sinks: sim.emit(ev.ARRIVED, self.index, self.current_task_id, self.pos[0], self.pos[1])
+                 self.status="IDLE"; completed_task_id=self.current_task_id; self.path=[]; self.path_index=0; self.current_task_id=None; self.replanner=None
+                 sim.complete_task(completed_task_id)
+
+    def calculate_bid(self, task):
+        """This robot's bid on task alone; step() bids for whole fleets through Simulation.place_bids()."""
+        return self.sim.place_bids(task, [self]).get(self.id)
+
+# --- Simulation Engine ---
+class Simulation:
+    """Headless simulation state advanced one tick at a time by step()."""
+    def __init__(self, seed=None, tick_rate=TICK_RATE, task_rate=0.0, verbose=False, planner="astar", incremental_replanning=True,
+                 cooperative=False, window=16, robot_count=None, assignment="optimal", grid=None, waypoints=None, priorities=None,
+                 moving_obstacles=None, task_rates=None, event_log=None, fleet="objects", crowd=None, plan_budget=None):
+        """grid, waypoints ({name: (r, c)}, with an "ENT" start), priorities and moving_obstacles default to the built-in
+        ward; task_rates ({waypoint: tasks per simulated second}) replaces the uniform task_rate when given. event_log
+        is a path to write the binary event log to (close() it at the end); verbose prints moves and bids too.
+        fleet="arrays" keeps robot state in NumPy arrays (fleet.py) for large headless fleets. crowd is a crowd.Crowd of
+        dynamic obstacles updated in batch; the moving_obstacles then join it as scripted agents. plan_budget (A* node
+        expansions per tick) time-slices path searches through a planning.PlanScheduler instead of finishing each on the spot."""
+        self.rng = random.Random(seed) # All engine randomness goes through this
+        self.planner = planner; self.find_path = SIM_PLANNERS[planner] # "astar"/"jps" are exact, "hpa" near-optimal
+        self.hierarchical = planner == "hpa" # HPA* also serves replanning, in place of per-robot D* Lite
+        if plan_budget and (self.hierarchical or cooperative): raise ValueError("plan_budget needs a flat planner without cooperative planning")
+        self.planning = PlanScheduler(plan_budget) if plan_budget else None # Resumable A* for every assignment and replan
+        self.assigner = Assigner() if assignment == "optimal" else None # None: the old greedy pass, most urgent task first
+        self.incremental_replanning = incremental_replanning # D* Lite per moving robot; otherwise one from-scratch replan per tick
+        self.tick_rate = tick_rate; self.task_rate = task_rate # task_rate: random tasks per simulated second
+        self.task_rates = sorted(task_rates.items()) if task_rates else None # Fixed order keeps runs reproducible per seed
+        self.verbose = verbose; self.tick = 0
+        self.grid = grid if grid is not None else Grid(GRID_ROWS, GRID_COLS); self.rows, self.cols = self.grid.rows, self.grid.cols
+        self.waypoints = dict(waypoints or WAYPOINTS); self.priorities = dict(priorities or WAYPOINT_PRIORITIES)
+        self.task_waypoints = [name for name in self.waypoints if name != "ENT"]
+        self.distance_fields = DistanceFieldCache(self.grid, self.waypoints) # Bid costs, repaired on every toggle
+        self.moving_obstacles = moving_obstacles if moving_obstacles is not None else default_moving_obstacles(tick_rate)
+        self.occupancy = OccupancyIndex(self.rows, self.cols) # Robots and moving obstacles by cell, kept current by every move
+        self.crowd = crowd # Batched dynamic obstacles writing into occupancy.obstacles (read by Robot.move; WHCA* reads its forecast); moving_obstacles lists its agents
+        if crowd is not None:
+            for obs in self.moving_obstacles: crowd.add_patrol(obs)
+            crowd.bind(self.grid, self.occupancy.obstacles); self.moving_obstacles = crowd.agents
+        for obs in self.moving_obstacles: self.occupancy.add_obstacle(obs.pos)
+        self.waypoint_cells = set(self.waypoints.values())
+        self.metrics = Metrics(lambda: self.now) # Counters and latency percentiles, updated on transitions
+        self.fleet = None; self.robot_class = Robot # Array fleet: FleetArrays plus ArrayRobot views over it
+        if fleet == "arrays":
+            from fleet import ArrayRobot, FleetArrays
+            self.fleet = FleetArrays(self.cols); self.robot_class = ArrayRobot; self.metrics.robot_counts = self.fleet.status_counts
+        elif fleet != "objects": raise ValueError(f"unknown fleet {fleet!r}, expected 'objects' or 'arrays'")
+        self.task_listeners = [] # Extra listener(task, old status, new status) callbacks, e.g. network front ends
+        self.event_sinks = [] # sink(tick, kind, robot, task, r, c, value, code) per eventlog record; empty costs one test per site
+        self.robots = {}
+        self.tasks = TaskStore(self._task_status_changed); self.task_counter = 0
+        self.wait_ticks = 0; self.deliveries = 0 # Ticks a MOVING robot stood still / tasks completed
+        # Windowed cooperative A* over a space-time reservation table instead of reactive waiting
+        self.cooperative = CooperativePlanner(self.grid, window) if cooperative else None
+        self._forecast_tick = None; self._forecast = None
+        start_pos_ent = self.waypoints["ENT"]; start_positions = {"R1":(start_pos_ent[0], start_pos_ent[1]-1), "R2":start_pos_ent, "R3":(start_pos_ent[0], start_pos_ent[1]+1)}
+        robot_ids = ROBOT_IDS if robot_count is None else [f"R{i+1}" for i in range(robot_count)]
+        start_positions.update(zip(robot_ids[len(ROBOT_IDS):], self._spare_start_cells(start_pos_ent, set(start_positions.values()))))
+        for robot_id in robot_ids:
+             if robot_id not in start_positions: # More robots than free cells: the rest queue at ENT
+                 self.log(f"Warn: No free start cell for {robot_id}."); self.robots[robot_id]=self.robot_class(self, robot_id, start_pos_ent); continue
+             r,c=start_positions[robot_id]
+             if 0<=r<self.rows and 0<=c<self.cols and self.grid[r][c]==0: self.robots[robot_id]=self.robot_class(self, robot_id, start_positions[robot_id])
+             else: self.log(f"Warn: Invalid start pos {robot_id}."); self.robots[robot_id]=self.robot_class(self, robot_id, start_pos_ent)
+        if self.cooperative:
+            for robot in self.robots.values(): self.cooperative.table.park(robot.id, robot.pos, -1)
+        self.event_log = None; self.attach_event_sinks(event_log, verbose)
+        self.profiler = None # A profiler.Profiler while profiling; attach or drop it between any two ticks
+
+    def robots_with_status(self, status):
+        """Robots in status, in fleet order."""
+        if self.fleet: return self.fleet.with_status(status)
+        return [robot for robot in self.robots.values() if robot.status == status]
+
+    def attach_event_sinks(self, event_log=None, verbose=False):
+        """Starts the binary event log at event_log and/or the verbose console view from the current state."""
+        if event_log: self.event_log = ev.EventLogWriter(event_log, self._log_preamble(), self.grid.cells); self.event_sinks.append(self.event_log)
+        if verbose: self.event_sinks.append(ev.ConsoleView(self))
+
+    def _spare_start_cells(self, origin, taken):
+        """Free non-waypoint cells in breadth-first order around origin, for fleets beyond ROBOT_IDS."""
+        seen = {origin}; queue = [origin]
+        for r, c in queue:
+            if (r, c) not in taken and (r, c) not in self.waypoint_cells: yield (r, c)
+            for dr, dc in ((0,1),(1,0),(0,-1),(-1,0)):
+                n = (r + dr, c + dc)
+                if 0 <= n[0] < self.rows and 0 <= n[1] < self.cols and n not in seen and self.grid[n[0]][n[1]] == 0: seen.add(n); queue.append(n)
+
+    def _log_preamble(self):
+        robots = list(self.robots.values())
+        return {"rows": self.rows, "cols": self.cols, "tick_rate": self.tick_rate, "robots": [r.id for r in robots],
+                "positions": [r.pos for r in robots], "energy": [r.energy for r in robots], "statuses": [r.status for r in robots],
+                "waypoints": self.waypoints, "obstacles": [obs.pos for obs in self.moving_obstacles]}
+
+    def emit(self, kind, robot=ev.NO_ROBOT, task=0, r=0, c=0, value=0.0, code=0):
+        """Hands one event record to every sink; call sites check event_sinks first so a bare run skips the call."""
+        for sink in self.event_sinks: sink(self.tick, kind, robot, task or 0, r, c, value, code)
+
+    def close(self):
+        """Flushes and closes the event log, if any."""
+        if self.event_log: self.event_sinks.remove(self.event_log); self.event_log.close(); self.event_log = None
+
+    @property
+    def now(self):
+        """Virtual clock in simulated seconds."""
+        return self.tick / self.tick_rate
+
+    @property
+    def grid_version(self):
+        return self.distance_fields.version
+
+    def _task_status_changed(self, task, old, new):
+        self.metrics.task_status_changed(task, old, new)
+        if self.event_sinks:
+            if old is None: self.emit(ev.TASK_CREATED, task=task.id, r=task.target_pos[0], c=task.target_pos[1], value=task.priority)
+            robot = self.robots.get(task.assigned_robot)
+            self.emit(ev.TASK_STATUS, robot.index if robot else ev.NO_ROBOT, task.id, code=ev.TASK_STATUS_CODES[new])
+        for listener in self.task_listeners: listener(task, old, new)
+
+    def log(self, message):
+        if self.verbose: print(message)
+
+    def toggle_obstacle(self, cell):
+        """Toggles a static obstacle; waypoints and moving obstacles cannot be covered."""
+        r, c = cell
+        if cell in self.waypoint_cells or self.occupancy.obstacle_at(cell): return False
+        self.grid[r][c] = 1 - self.grid[r][c]; self.distance_fields.cell_toggled(cell); self.log(f"Toggled obstacle at {cell} to {self.grid[r][c]}")
+        if self.event_sinks: self.emit(ev.TOGGLE, r=r, c=c, code=self.grid[r][c])
+        if self.planning: self.planning.reset()
+        for robot in self.robots.values():
+            if robot.replanner: robot.replanner.cell_changed(cell)
+        return True
+
+    def create_task(self, target_waypoint_name, priority=None):
+        """Announces a task to target_waypoint_name and opens bidding; returns the Task or None."""
+        new_task = self._announce(target_waypoint_name, priority)
+        if new_task is None: return None
+        bidders_set = False; new_task.potential_bidders = set()
+        for robot in self.robots_with_status("IDLE"):
+             if robot.energy >= robot.low_energy_threshold:
+                 robot.pending_bid_task = new_task; robot.status = "BIDDING"; bidders_set = True
+                 new_task.potential_bidders.add(robot.id)
+        if not bidders_set: self.log("  DEBUG: No eligible robots.")
+        return new_task
+
+    def create_tasks(self, requests):
+        """Announces a batch of tasks ((waypoint name, priority or None) pairs) with one auction round for all of them:
+        every eligible idle robot bids on every new task now, so none of them fails for want of a free bidder.
+        Returns the created Tasks (invalid or blocked targets are skipped)."""
+        created = [task for task in (self._announce(name, priority) for name, priority in requests) if task is not None]
+        eligible = [r for r in self.robots_with_status("IDLE") if r.energy >= r.low_energy_threshold]
+        for task in created:
+            task.potential_bidders = {robot.id for robot in eligible}
+            for robot in eligible: robot.status = "BIDDING"
+            self.place_bids(task, eligible) # Leaves them IDLE again for the next task
+        if created and not eligible: self.log("  DEBUG: No eligible robots.")
+        return created
+
+    def _announce(self, target_waypoint_name, priority=None):
+        if target_waypoint_name not in self.waypoints or target_waypoint_name == "ENT": return None
+        target_r, target_c = self.waypoints[target_waypoint_name]; target_pos = (target_r, target_c)
+        if self.grid[target_r][target_c] == 1: self.log(f"!!! Target {target_waypoint_name} blocked!"); return None
+        if self.occupancy.obstacle_at(target_pos): self.log(f"!!! Target {target_waypoint_name} blocked by MOVING obstacle!"); return None
+        if priority is None: priority = self.priorities.get(target_waypoint_name, 5)
+        self.task_counter += 1; new_task = Task(self.task_counter, target_waypoint_name, self.now, priority, target_pos)
+        self.tasks.add(new_task); self.log(f"--- Task {new_task.id} ({new_task.target_waypoint}) created Prio:{new_task.priority} ---")
+        return new_task
+
+    def complete_task(self, task_id):
+        task = self.tasks.get(task_id)
+        if task is None: return
+        task.completed_at = self.now; task.completion_time = task.completed_at - task.created_at
+        task.status = "COMPLETE"; self.deliveries += 1 # Archives the task, so the timings go first
+        self.log(f"--- Task {task.id} COMPLETE (Took {task.completion_time:.1f}s) ---")
+
+    def step(self):
+        """Advances the simulation by exactly one tick."""
+        robots = self.robots; tasks = self.tasks
+        computation_done_this_frame = False
+        prof = self.profiler # Phase timings; None costs one test per phase
+        if prof: prof.tick = self.tick; t = t0 = prof.clock()
+
+        # --- Random task arrivals (headless runs) ---
+        if self.task_rates:
+            for name, rate in self.task_rates:
+                if self.rng.random() < rate / self.tick_rate: self.create_task(name)
+        elif self.task_rate > 0 and self.rng.random() < self.task_rate / self.tick_rate:
+            self.create_task(self.rng.choice(self.task_waypoints))
+        if prof: t = prof.lap("tick/arrivals", t)
+
+        # --- Update ALL Moving Obstacles ---
+        if self.crowd:
+            slots, cells = self.crowd.update() # Keeps occupancy.obstacles current itself
+            if self.event_sinks:
+                for i, cell in zip(slots.tolist(), cells.tolist()): self.emit(ev.OBSTACLE, task=i, r=cell // self.cols, c=cell % self.cols)
+        else:
+            for i, obs in enumerate(self.moving_obstacles):
+                before = obs.pos; obs.update()
+                if obs.pos != before:
+                    self.occupancy.move_obstacle(before, obs.pos)
+                    if self.event_sinks: self.emit(ev.OBSTACLE, task=i, r=obs.pos[0], c=obs.pos[1])
+        if prof: t = prof.lap("tick/obstacles", t)
+
+        # --- Replanning: every blocked robot repairs its own D* Lite search this tick ---
+        if self.incremental_replanning and not self.cooperative and not self.planning:
+            for robot in self.robots_with_status("REPLANNING"):
+                if robot.current_task_id: self._replan(robot)
+
+        # --- Process ONE Computation (Replan OR Bid Calculation) ---
+        robot_to_replan = None if self.incremental_replanning or self.cooperative or self.planning else next((r for r in self.robots_with_status("REPLANNING") if r.current_task_id), None)
+        if robot_to_replan and not computation_done_this_frame:
+             current_task = tasks.get(robot_to_replan.current_task_id)
+             if current_task:
+                  new_path, _ = self.timed_find_path(robot_to_replan.pos, current_task.target_pos); computation_done_this_frame = True
+                  if self.event_sinks: self.emit(ev.REPLAN, robot_to_replan.index, current_task.id, value=len(new_path) if new_path else 0)
+                  if new_path and len(new_path) > 1: self.log(f"  Replan OK!"); robot_to_replan.path=new_path; robot_to_replan.path_index=1; robot_to_replan.status="MOVING"
+                  else: self.log(f"!!! Replan FAIL!"); robot_to_replan.status="FAILED"; current_task.status="FAILED"; robot_to_replan.current_task_id=None
+             else: self.log(f"!!! {robot_to_replan.id} REPLAN Task not found"); robot_to_replan.status="FAILED"
+        if prof: t = prof.lap("tick/replan", t)
+
+        # --- Batched Bidding: every pending bidder bids this tick, one distance field per task ---
+        bidders_by_task = {}
+        for robot in self.robots_with_status("BIDDING"):
+            if robot.pending_bid_task:
+                bidders_by_task.setdefault(robot.pending_bid_task.id, (robot.pending_bid_task, []))[1].append(robot)
+        for task, bidders in bidders_by_task.values(): self.place_bids(task, bidders)
+        if prof: t = prof.lap("tick/bidding", t)
+
+        # --- Task Assignment ---
+        tasks_ready_for_assignment = []
+        for task in tasks.pending(): # Most urgent first
+             if task.status in ["ANNOUNCED", "BIDDING"]:
+                  bidders_finished = True
+                  if task.potential_bidders:
+                       for bidder_id in task.potential_bidders:
+                            if bidder_id in robots and robots[bidder_id].status not in ["IDLE", "FAILED"]: bidders_finished = False; break
+                  if bidders_finished and task.bids: task.status = "BIDDING"; tasks_ready_for_assignment.append(task)
+                  elif bidders_finished and not task.bids and task.status == "ANNOUNCED": task.status = "FAILED"; self.log(f"!!! Task {task.id} failed - no bids."); task.potential_bidders = set()
+        assigned_robots_this_cycle = set()
+        if not computation_done_this_frame and self.assigner: self._assign_optimal(tasks_ready_for_assignment)
+        elif not computation_done_this_frame:
+            for task in tasks_ready_for_assignment:
+                 if task.status == "BIDDING" and task.bids:
+                     eligible_bidders = {rid: bid for rid, bid in task.bids.items() if rid in robots and robots[rid].status == "IDLE"}
+                     if not eligible_bidders: continue
+                     lowest_bidder_id = min(eligible_bidders, key=eligible_bidders.get)
+                     if lowest_bidder_id not in assigned_robots_this_cycle:
+                         winner_robot = robots[lowest_bidder_id]
+                         if winner_robot.assign_task(task): assigned_robots_this_cycle.add(lowest_bidder_id)
+                         else: self.log(f"!!! Assign FAIL..."); winner_robot.status = "IDLE"; task.status = "ANNOUNCED"; task.bids = {}; task.potential_bidders = set()
+                 elif task.status == "BIDDING" and not task.bids: task.status = "ANNOUNCED"; task.potential_bidders = set()
+
+        if prof: t = prof.lap("tick/assignment", t)
+
+        # --- Time-sliced Planning: this tick's node budget across every outstanding search ---
+        if self.planning:
+            self._plan()
+            if prof: t = prof.lap("tick/planning", t)
+
+        # --- Cooperative Planning (refresh timed paths, park everyone else) ---
+        if self.cooperative:
+            self._coordinate()
+            if prof: t = prof.lap("tick/cooperative", t)
+
+        # --- Robot Movement ---
+        if not computation_done_this_frame:
+            if self.fleet: self.fleet.move(self) # Same outcome, batched
+            else:
+                for robot in robots.values():
+                    if robot.status == "MOVING": robot.move()
+        if prof: prof.lap("tick/movement", t)
+
+        self.tick += 1
+        if prof: prof.lap("tick/step", t0); prof.end_tick(self.tick)
+
+    def place_bids(self, task, bidders):
+        """Bids of all bidders on task from a single multi-target lookup: the reverse distance field rooted at
+        task.target_pos already holds every robot's path cost. Returns {robot id: bid}; bidders end up IDLE."""
+        for robot in bidders: robot.pending_bid_task = None
+        eligible = [r for r in bidders if r.status == "BIDDING" and r.energy >= r.low_energy_threshold]
+        for robot in bidders: robot.status = "IDLE"
+        target = task.target_pos
+        if not eligible or not target or self.grid[target[0]][target[1]] == 1: return {}
+        if self.occupancy.obstacle_at(target):
+            self.log(f"  DEBUG: {', '.join(r.id for r in eligible)} cannot bid, target {task.target_waypoint} blocked by MOVING obstacle."); return {}
+        prof = self.profiler; t = prof and prof.clock()
+        field = self.distance_fields.field(task.target_waypoint); priority_factor = task.priority * 5; bids = {}
+        if prof: prof.search("field", t, 0) # Built or repaired here only when the grid changed
+        for robot in eligible:
+            distance_cost = field.cost_from(robot.pos)
+            if distance_cost == INF:
+                if self.event_sinks: self.emit(ev.NO_BID, robot.index, task.id)
+                continue
+            bids[robot.id] = distance_cost + (100.0 - robot.energy) / 10.0 + priority_factor
+            if self.event_sinks: self.emit(ev.BID, robot.index, task.id, value=distance_cost)
+        task.bids.update(bids)
+        return bids
+
+    def _assign_optimal(self, ready_tasks):
+        """Matches all ready tasks against all idle bidders at once (min total bid, priority-weighted) and
+        assigns the winners most urgent task first; the solver keeps its prices for next tick's warm start."""
+        robots = self.robots
+        for task in ready_tasks:
+            if task.status == "BIDDING" and not task.bids: task.status = "ANNOUNCED"; task.potential_bidders = set()
+        ready = [t for t in ready_tasks if t.status == "BIDDING"]
+        bidder_ids = sorted({rid for t in ready for rid in t.bids if rid in robots and robots[rid].status == "IDLE"})
+        if not ready or not bidder_ids: return
+        costs = [[round((task.bids[rid] + task.priority * PRIORITY_WEIGHT) * 100) if rid in task.bids else NO_BID for rid in bidder_ids]
+                 for task in ready] # Integer costs keep the solver's comparisons exact
+        matches = self.assigner.solve([t.id for t in ready], bidder_ids, costs)
+        for task in ready:
+            if task.id not in matches: continue
+            winner_robot = robots[matches[task.id]]
+            if not winner_robot.assign_task(task):
+                self.log(f"!!! Assign FAIL..."); winner_robot.status = "IDLE"; task.status = "ANNOUNCED"; task.bids = {}; task.potential_bidders = set()
+
+    def plan_cooperative(self, robot, task):
+        """Plans and reserves robot's next window towards task; the returned path has one cell per tick."""
+        if self._forecast_tick != self.tick:
+            window = self.cooperative.window; self._forecast_tick = self.tick
+            self._forecast = self.crowd.forecast(window) if self.crowd else forecast_obstacles(self.moving_obstacles, window, self.cols, self.rows * self.cols)
+        goal_field = self.distance_fields.field(task.target_waypoint)
+        prof = self.profiler; t = prof and prof.clock(); nodes = self.cooperative.nodes_expanded
+        path = self.cooperative.plan(robot.id, robot.pos, task.target_pos, goal_field, self.tick - 1, self._forecast)
+        if prof: prof.search("whca", t, self.cooperative.nodes_expanded - nodes)
+        robot.plan_tick = self.tick; robot.plan_broken = False
+        return path
+
+    def _coordinate(self):
+        table = self.cooperative.table; refresh = max(1, self.cooperative.window // 2)
+        tasks_by_id = self.tasks.with_status("ASSIGNED")
+        active = [r for r in self.robots.values() if r.status in ("MOVING", "REPLANNING") and r.current_task_id in tasks_by_id]
+        active.sort(key=lambda r: (tasks_by_id[r.current_task_id].priority, r.id))
+        for robot in active:
+            task = tasks_by_id[robot.current_task_id]
+            exhausted = robot.path_index >= len(robot.path) and robot.pos != task.target_pos
+            if robot.status == "REPLANNING" or robot.plan_broken or exhausted or self.tick - robot.plan_tick >= refresh:
+                path = self.plan_cooperative(robot, task)
+                if self.event_sinks: self.emit(ev.REPLAN, robot.index, task.id, value=len(path) if path else 0)
+                if path is None: self.log(f"!!! Replan FAIL!"); robot.status="FAILED"; task.status="FAILED"; robot.current_task_id=None; robot.path=[]
+                else: robot.path = path; robot.path_index = 1; robot.status = "MOVING"
+        for robot in self.robots.values():
+            if robot.status != "MOVING" and table.parked_cell(robot.id) != robot.pos: table.park(robot.id, robot.pos, self.tick - 1)
+
+    def timed_find_path(self, start_pos, end_pos):
+        """find_path() on the engine's grid, reported to the profiler when one is attached."""
+        prof = self.profiler
+        if not prof: return self.find_path(self.grid, start_pos, end_pos)
+        t = prof.clock(); result = self.find_path(self.grid, start_pos, end_pos)
+        searcher = self.grid.searcher if self.planner == "astar" else self.grid.jump_searcher if self.planner == "jps" else None
+        prof.search(self.planner, t, searcher.nodes_expanded if searcher else 0)
+        return result
+
+    def _plan(self):
+        planning = self.planning; tasks = self.tasks
+        for robot in self.robots_with_status("REPLANNING"): # Blocked on the way, or restored mid-search
+            if robot.id not in planning:
+                task = tasks.get(robot.current_task_id)
+                if task: planning.submit(robot.id, self.grid, robot.pos, task.target_pos, task.priority)
+                elif robot.current_task_id: self.log(f"!!! {robot.id} REPLAN Task not found"); robot.status="FAILED"
+        prof = self.profiler; t = prof and prof.clock(); nodes = planning.nodes; finished = planning.run()
+        if prof: prof.search("slices", t, planning.nodes - nodes)
+        for robot_id, search in finished:
+            robot = self.robots[robot_id]; task = tasks.get(robot.current_task_id)
+            if robot.status != "REPLANNING" or task is None: continue # Overtaken while searching
+            if self.event_sinks: self.emit(ev.REPLAN, robot.index, task.id, value=len(search.path) if search.path else 0)
+            if search.path and len(search.path) > 1: self.log(f"  Replan OK!"); robot.path=search.path; robot.path_index=1; robot.status="MOVING"
+            else: self.log(f"!!! Replan FAIL!"); robot.status="FAILED"; task.status="FAILED"; robot.current_task_id=None
+
+    def _replan(self, robot):
+        current_task = self.tasks.get(robot.current_task_id)
+        if not current_task: self.log(f"!!! {robot.id} REPLAN Task not found"); robot.status="FAILED"; return
+        if robot.replanner is None and not self.hierarchical: robot.replanner = DStarLite(self.grid, robot.pos, current_task.target_pos) # e.g. after a restore
+        if self.hierarchical: new_path, _ = self.timed_find_path(robot.pos, current_task.target_pos)
+        else:
+            prof = self.profiler; t = prof and prof.clock(); nodes = robot.replanner.nodes_expanded
+            new_path, _ = robot.replanner.replan(robot.pos)
+            if prof: prof.search("dstar", t, robot.replanner.nodes_expanded - nodes)
+        if self.event_sinks: self.emit(ev.REPLAN, robot.index, current_task.id, value=len(new_path) if new_path else 0)
+        if new_path and len(new_path) > 1: self.log(f"  Replan OK!"); robot.path=new_path; robot.path_index=1; robot.status="MOVING"
+        else: self.log(f"!!! Replan FAIL!"); robot.status="FAILED"; current_task.status="FAILED"; robot.current_task_id=None; robot.replanner=None
+
+    def run(self, ticks):
+        for _ in range(ticks): self.step()
+
+# --- Headless Entry Point ---
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the hospital swarm simulation without a display.")
+    parser.add_argument("--ticks", type=int, default=8 * 3600 * TICK_RATE, help="ticks to simulate (default: one 8h shift)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--task-rate", type=float, default=0.05, help="random tasks per simulated second")
+    parser.add_argument("--planner", choices=sorted(SIM_PLANNERS), default="astar")
+    parser.add_argument("--full-replan", action="store_true", help="replan from scratch, one robot per tick (pre-D* Lite behaviour)")
+    parser.add_argument("--cooperative", action="store_true", help="plan in space-time around other robots and moving obstacles")
+    parser.add_argument("--robots", type=int, default=None, help="fleet size (default: the three ROBOT_IDS)")
+    parser.add_argument("--assignment", choices=["optimal", "greedy"], default="optimal", help="global task/robot matching or the greedy pass")
+    parser.add_argument("--plan-budget", type=int, default=None, metavar="NODES", help="time-slice path searches: A* node expansions per tick")
+    parser.add_argument("--fleet", choices=["objects", "arrays"], default="objects", help="robot state as Python objects or NumPy arrays")
+    parser.add_argument("--crowd", type=int, default=0, metavar="N", help="add N random-walking people (one step per second) to the ward")
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--event-log", metavar="PATH", help="write the binary event log here (inspect with eventlog.py)")
+    parser.add_argument("--restore", metavar="PATH", help="continue from this snapshot (the map and fleet options are ignored)")
+    parser.add_argument("--snapshot", metavar="PATH", help="save a snapshot of the final state here")
+    parser.add_argument("--profile", action="store_true", help="time every tick phase and path search and print the table")
+    parser.add_argument("--trace", metavar="PATH", help="write a Chrome trace-event file of the --trace-ticks window here")
+    parser.add_argument("--trace-ticks", metavar="FIRST:LAST", default="0:100", help="ticks to trace, counted from the start of the run")
+    args = parser.parse_args(argv)
+    if args.restore:
+        import snapshot
+        sim = snapshot.load(args.restore, args.verbose, args.event_log)
+    else:
+        grid = Grid(GRID_ROWS, GRID_COLS); crowd = None
+        if args.crowd:
+            from crowd import Crowd, move_delay
+            crowd = Crowd(grid.rows, grid.cols, args.seed); crowd.scatter(grid, args.crowd, move_delay(1, TICK_RATE), avoid=WAYPOINTS.values())
+        sim = Simulation(seed=args.seed, task_rate=args.task_rate, verbose=args.verbose, planner=args.planner, incremental_replanning=not args.full_replan,
+                         cooperative=args.cooperative, robot_count=args.robots, assignment=args.assignment, event_log=args.event_log, fleet=args.fleet,
+                         grid=grid, crowd=crowd, plan_budget=args.plan_budget)
+    if args.profile or args.trace:
+        from profiler import Profiler
+        sim.profiler = Profiler()
+        if args.trace: first, last = (int(x) for x in args.trace_ticks.split(":")); sim.profiler.capture(sim.tick + first, sim.tick + last, args.trace)
+    start_tick = sim.tick; wall_start = time.perf_counter(); sim.run(args.ticks); sim.close(); wall = time.perf_counter() - wall_start
+    if args.trace and sim.profiler.capture_ticks: sim.profiler.write_trace(args.trace) # The run ended inside the window
+    if args.snapshot:
+        import snapshot
+        snapshot.save(sim, args.snapshot)
+    completion = sim.metrics.completion; assignment = sim.metrics.assignment
+    percentiles = lambda stats: " ".join(f"p{round(q * 100)}={stats.percentile(q) or 0:.1f}s" for q in QUANTILES)
+    print(f"{sim.tick} ticks ({sim.now:.0f}s simulated) in {wall:.2f}s wall = {(sim.tick - start_tick) / wall:.0f} ticks/s")
+    print(f"Tasks: {sim.metrics.tasks_created} created, {completion.count} complete, avg completion {completion.mean or float('nan'):.1f}s")
+    print(f"Completion: {percentiles(completion)}; time to assignment: {percentiles(assignment)}")
+    print(f"Waits: {sim.wait_ticks} wait-ticks, {sim.wait_ticks / max(1, sim.deliveries):.1f} per delivery")
+    if args.profile: print("\n".join(sim.profiler.report_lines()))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,342 @@
+import json
+import math
+import os
+import struct
+import sys
+import threading
+from array import array
+from collections import Counter
+from collections.abc import MutableMapping
+from itertools import islice
+
+import eventlog as ev
+from metrics import LatencyStats
+from pathfinding import Grid
+from simulation import MovingObstacle, Simulation, Task
+from taskstore import ArchivedTask
+
+# Snapshot / restore of a whole Simulation: config, RNG, grid, moving
+# obstacles, robots with their paths, live tasks with their bids, the task
+# archive and the metrics. Bulk state is stored as typed columns (array
+# module) after a small JSON preamble, so encoding and decoding are a handful
+# of C-level copies rather than per-object pickling. The task archive is
+# append-only, so a Snapshotter encodes each archived task once and later
+# captures only copy the columns; writing to disk happens on a background
+# thread (SnapshotWriter). Derived state is rebuilt on restore: distance
+# fields from the grid, D* Lite searches when a robot next replans, and the
+# cooperative reservation table by replanning every moving robot on the first
+# tick. A restored task archive stays in column form (ColumnArchive) and
+# builds ArchivedTask records only when one is looked up.
+
+MAGIC = b"HSSN"; VERSION = 1
+HEADER = struct.Struct("<4sHI") # magic, version, length of the JSON preamble that follows
+NONE_TICK = -1 # assigned_tick / plan_tick of None
+NO_WAYPOINT = 0xFFFF # Robot without a target waypoint
+
+# --- Column Layout ---
+ROBOT_COLUMNS = (("pos_r", "h"), ("pos_c", "h"), ("path_index", "I"), ("energy", "d"), ("status", "B"), ("task", "I"), ("target", "H"),
+                 ("assigned_tick", "q"), ("pending_task", "I"), ("plan_tick", "q"), ("plan_broken", "B"), ("path_length", "I"), ("path", "h"))
+TASK_COLUMNS = (("id", "I"), ("target", "H"), ("priority", "i"), ("status", "B"), ("robot", "H"), ("created_at", "d"),
+                ("bid_count", "I"), ("bid_robot", "H"), ("bid_value", "d"), ("bidder_count", "I"), ("bidder", "H"))
+ARCHIVE_COLUMNS = (("id", "I"), ("target", "H"), ("priority", "i"), ("status", "B"), ("robot", "H"), ("created_at", "d"),
+                   ("completed_at", "d"), ("completion_time", "d")) # NaN for a missing time
+
+def _columns(layout):
+    return {name: array(typecode) for name, typecode in layout}
+
+def _time(value):
+    return math.nan if value is None else value
+
+def _untime(value):
+    return None if value != value else value
+
+# --- Capture ---
+class Snapshotter:
+    """Captures one Simulation repeatedly; keeps the encoded task archive between captures. freeze() is the only
+    part that has to run on the simulation thread; encode() of its result can happen anywhere (SnapshotWriter)."""
+    def __init__(self, sim):
+        self.sim = sim; self.archive = _columns(ARCHIVE_COLUMNS); self.archived = 0 # Archive entries already encoded
+
+    def capture(self, extra=None):
+        """The whole simulation state as bytes; extra is any JSON-serialisable dict stored alongside (front end state)."""
+        return encode(self.freeze(extra))
+
+    def freeze(self, extra=None):
+        """Copies of everything that can change, cheap enough to take between two ticks: tuples per robot and live
+        task, the grid bytes, the archive columns (only tasks archived since the last call are encoded here)."""
+        sim = self.sim; robots = list(sim.robots.values())
+        robot_index = {robot.id: i for i, robot in enumerate(robots)}; waypoint_index = {name: i for i, name in enumerate(sim.waypoints)}
+        self._encode_archive(robot_index, waypoint_index)
+        robot_rows = [(robot.pos, robot.path_index, robot.energy, robot.status, robot.current_task_id, robot.target_waypoint, robot.assigned_tick,
+                       robot.pending_bid_task.id if robot.pending_bid_task else 0, robot.plan_tick, robot.plan_broken, robot.path) # Paths are replaced, never edited
+                      for robot in robots]
+        task_rows = [(task.id, task.target_waypoint, task.priority, task.status, task.assigned_robot, task.created_at, dict(task.bids), list(task.potential_bidders))
+                     for task in sim.tasks]
+        meta = {"config": _config(sim), "robots": list(robot_index), "rng": sim.rng.getstate(),
+                "counters": [sim.tick, sim.task_counter, sim.wait_ticks, sim.deliveries],
+                "obstacles": [[obs.pos, obs.start_pos, obs.end_pos, obs.direction, obs.speed, obs.move_timer, obs.move_delay, obs.axis, obs.bounds]
+                              for obs in ([] if sim.crowd else sim.moving_obstacles)], "crowd": sim.crowd.state() if sim.crowd else None,
+                "planning": [[robot_index[key], search.nodes_expanded] for key, search in sim.planning.pending()] if sim.planning else None,
+                "assigner": [list(sim.assigner.prices.items()), list(sim.assigner.matches.items()), sim.assigner.transposed] if sim.assigner else None,
+                "metrics": _metrics_state(sim.metrics), "extra": dict(extra or {}), "byteorder": sys.byteorder}
+        archive = [(name, column.typecode, column.tobytes()) for name, column in self.archive.items()]
+        return meta, bytes(sim.grid.cells), robot_rows, task_rows, archive, robot_index, waypoint_index
+
+    def _encode_archive(self, robot_index, waypoint_index):
+        archive = self.sim.tasks.archive; columns = self.archive
+        if len(archive) < self.archived: self.archive = columns = _columns(ARCHIVE_COLUMNS); self.archived = 0 # A different store
+        records = archive.values(); skip = self.archived
+        if isinstance(archive, ColumnArchive): # Restored: its columns are already encoded
+            if self.archived < archive.base_count:
+                self.archive = columns = {name: array(column.typecode, column) for name, column in archive.columns.items()}; self.archived = archive.base_count
+            records = archive.added.values(); skip = self.archived - archive.base_count
+        for record in islice(records, skip, None): # Archived tasks never change, so each is encoded once
+            columns["id"].append(record.id); columns["target"].append(waypoint_index[record.target_waypoint]); columns["priority"].append(record.priority)
+            columns["status"].append(ev.TASK_STATUS_CODES[record.status]); columns["robot"].append(robot_index.get(record.assigned_robot, ev.NO_ROBOT))
+            columns["created_at"].append(record.created_at); columns["completed_at"].append(_time(record.completed_at))
+            columns["completion_time"].append(_time(record.completion_time))
+        self.archived = len(archive)
+
+def encode(frozen):
+    """Snapshot bytes from Snapshotter.freeze() output."""
+    meta, grid, robot_rows, task_rows, archive, robot_index, waypoint_index = frozen
+    robots = _columns(ROBOT_COLUMNS)
+    for pos, path_index, energy, status, task_id, target, assigned_tick, pending, plan_tick, plan_broken, path in robot_rows:
+        robots["pos_r"].append(pos[0]); robots["pos_c"].append(pos[1]); robots["path_index"].append(path_index)
+        robots["energy"].append(energy); robots["status"].append(ev.ROBOT_STATUS_CODES[status])
+        robots["task"].append(task_id or 0); robots["target"].append(waypoint_index.get(target, NO_WAYPOINT))
+        robots["assigned_tick"].append(NONE_TICK if assigned_tick is None else assigned_tick); robots["pending_task"].append(pending)
+        robots["plan_tick"].append(NONE_TICK if plan_tick is None else plan_tick); robots["plan_broken"].append(plan_broken)
+        robots["path_length"].append(len(path)); robots["path"].fromlist([x for cell in path for x in cell])
+    tasks = _columns(TASK_COLUMNS)
+    for task_id, target, priority, status, robot, created_at, bids, bidders in task_rows:
+        tasks["id"].append(task_id); tasks["target"].append(waypoint_index[target]); tasks["priority"].append(priority)
+        tasks["status"].append(ev.TASK_STATUS_CODES[status]); tasks["robot"].append(robot_index.get(robot, ev.NO_ROBOT)); tasks["created_at"].append(created_at)
+        tasks["bid_count"].append(len(bids)); tasks["bid_robot"].fromlist([robot_index[rid] for rid in bids]); tasks["bid_value"].fromlist(list(bids.values()))
+        tasks["bidder_count"].append(len(bidders)); tasks["bidder"].fromlist([robot_index[rid] for rid in bidders])
+    blobs = [(section, name, column.typecode, column.tobytes()) for section, table in (("robots", robots), ("tasks", tasks)) for name, column in table.items()]
+    blobs += [("archive", name, typecode, blob) for name, typecode, blob in archive]
+    meta = dict(meta, sections=[[section, name, len(blob) // array(typecode).itemsize] for section, name, typecode, blob in blobs])
+    preamble = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+    return b"".join([HEADER.pack(MAGIC, VERSION, len(preamble)), preamble, grid] + [blob for _, _, _, blob in blobs])
+
+def _config(sim):
+    return {"tick_rate": sim.tick_rate, "task_rate": sim.task_rate, "task_rates": sim.task_rates, "planner": sim.planner,
+            "incremental_replanning": sim.incremental_replanning, "window": sim.cooperative.window if sim.cooperative else None,
+            "assignment": "optimal" if sim.assigner else "greedy", "fleet": "arrays" if sim.fleet else "objects",
+            "plan_budget": sim.planning.budget if sim.planning else None, "rows": sim.rows, "cols": sim.cols,
+            "waypoints": sim.waypoints, "priorities": sim.priorities}
+
+def _stats_state(stats):
+    return [stats.count, stats.total, stats.min, stats.max, [[list(e.heights), list(e.positions), list(e.desired)] for e in stats.quantiles.values()]]
+
+def _metrics_state(metrics):
+    return {"robot_status": dict(metrics.robot_status), "task_status": dict(metrics.task_status), "tasks_created": metrics.tasks_created,
+            "completion": _stats_state(metrics.completion), "assignment": _stats_state(metrics.assignment),
+            "by_priority": [[key, [_stats_state(s) for s in pair]] for key, pair in metrics.by_priority.items()],
+            "by_waypoint": [[key, [_stats_state(s) for s in pair]] for key, pair in metrics.by_waypoint.items()]}
+
+def capture(sim, extra=None):
+    """One-off capture; use a Snapshotter for periodic ones."""
+    return Snapshotter(sim).capture(extra)
+
+# --- Restore ---
+def read(data):
+    """(meta, grid bytes, {section: {column: array}}) from snapshot bytes."""
+    magic, version, preamble_length = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION: raise ValueError(f"not a version {VERSION} simulation snapshot")
+    offset = HEADER.size + preamble_length; meta = json.loads(bytes(data[HEADER.size:offset]))
+    config = meta["config"]; view = memoryview(data)
+    grid = view[offset:offset + config["rows"] * config["cols"]]; offset += len(grid)
+    layouts = {"robots": dict(ROBOT_COLUMNS), "tasks": dict(TASK_COLUMNS), "archive": dict(ARCHIVE_COLUMNS)}; sections = {}
+    for section, name, count in meta["sections"]:
+        column = array(layouts[section][name]); size = count * column.itemsize
+        column.frombytes(view[offset:offset + size]); offset += size
+        if meta["byteorder"] != sys.byteorder: column.byteswap()
+        sections.setdefault(section, {})[name] = column
+    return meta, grid, sections
+
+def restore(data, verbose=False, event_log=None):
+    """A Simulation in the captured state, optionally logging events from there on. The dict given as extra at capture
+    time is left in sim.snapshot_extra."""
+    meta, grid_bytes, sections = read(data); config = meta["config"]
+    waypoint_names = list(config["waypoints"]); robot_ids = meta["robots"]
+    obstacles = []
+    for pos, start, end, direction, speed, timer, delay, axis, bounds in meta["obstacles"]:
+        obs = MovingObstacle(tuple(start), tuple(end), speed, axis, config["tick_rate"], tuple(bounds))
+        obs.pos = tuple(pos); obs.direction = direction; obs.move_timer = timer; obs.move_delay = delay; obstacles.append(obs)
+    crowd = None
+    if meta.get("crowd"):
+        from crowd import Crowd
+        crowd = Crowd.from_state(config["rows"], config["cols"], meta["crowd"])
+    sim = Simulation(tick_rate=config["tick_rate"], task_rate=config["task_rate"], planner=config["planner"],
+                     incremental_replanning=config["incremental_replanning"], cooperative=config["window"] is not None,
+                     window=config["window"] or 16, robot_count=0, assignment=config["assignment"],
+                     grid=Grid(config["rows"], config["cols"], grid_bytes), waypoints={k: tuple(v) for k, v in config["waypoints"].items()},
+                     priorities=config["priorities"], moving_obstacles=obstacles, task_rates=dict(config["task_rates"] or ()), fleet=config["fleet"], crowd=crowd, plan_budget=config["plan_budget"])
+    version, internal, gauss = meta["rng"]; sim.rng.setstate((version, tuple(internal), gauss))
+    sim.tick, sim.task_counter, sim.wait_ticks, sim.deliveries = meta["counters"]
+    if sim.assigner and meta["assigner"]:
+        prices, matches, sim.assigner.transposed = meta["assigner"] # Padding rows / columns have ("dummy", i) ids
+        key = lambda value: tuple(value) if isinstance(value, list) else value
+        sim.assigner.prices = {key(k): v for k, v in prices}; sim.assigner.matches = {key(k): key(v) for k, v in matches}
+    tasks = _restore_tasks(sim, sections, waypoint_names, robot_ids)
+    _restore_robots(sim, sections["robots"], robot_ids, waypoint_names, tasks)
+    _restore_metrics(sim.metrics, meta["metrics"])
+    for index, nodes in meta["planning"] or (): # Searches are deterministic: redoing the same expansions resumes them
+        robot = sim.robots[robot_ids[index]]; task = sim.tasks.get(robot.current_task_id)
+        sim.planning.submit(robot.id, sim.grid, robot.pos, task.target_pos, task.priority).run(nodes)
+    if sim.cooperative: # Reservations are not stored: park everyone and let moving robots replan on the first tick
+        for robot in sim.robots.values():
+            sim.cooperative.table.park(robot.id, robot.pos, sim.tick - 1); robot.plan_broken = True
+    sim.verbose = verbose; sim.attach_event_sinks(event_log, verbose)
+    sim.snapshot_extra = meta["extra"]
+    return sim
+
+def _restore_tasks(sim, sections, waypoint_names, robot_ids):
+    statuses = sections["archive"]["status"].tobytes()
+    counts = {status: n for code, status in enumerate(ev.TASK_STATUSES) if (n := statuses.count(code))}
+    columns = sections["tasks"]; bid = bidder = 0; tasks = []
+    for i, task_id in enumerate(columns["id"]):
+        name = waypoint_names[columns["target"][i]]
+        task = Task(task_id, name, columns["created_at"][i], columns["priority"][i], sim.waypoints[name])
+        task.status = ev.TASK_STATUSES[columns["status"][i]]; robot = columns["robot"][i]
+        task.assigned_robot = None if robot == ev.NO_ROBOT else robot_ids[robot]
+        count = columns["bid_count"][i]
+        task.bids = dict(zip(map(robot_ids.__getitem__, columns["bid_robot"][bid:bid + count]), columns["bid_value"][bid:bid + count])); bid += count
+        count = columns["bidder_count"][i]; task.potential_bidders = set(map(robot_ids.__getitem__, columns["bidder"][bidder:bidder + count])); bidder += count
+        tasks.append(task)
+    sim.tasks.load(tasks, ColumnArchive(sections["archive"], waypoint_names, robot_ids), counts)
+    return {task.id: task for task in tasks}
+
+class ColumnArchive(MutableMapping):
+    """TaskStore.archive over restored archive columns: records are built on lookup, tasks archived after the restore
+    go into a plain dict (added). Restoring a long shift's history costs a few array copies instead of one object per
+    task."""
+    def __init__(self, columns, waypoint_names, robot_ids):
+        self.columns = columns; self.waypoint_names = waypoint_names; self.robot_ids = robot_ids
+        self.base_count = len(columns["id"]); self.added = {}; self._rows = None # task id -> row, built on first lookup
+
+    @property
+    def rows(self):
+        if self._rows is None: self._rows = dict(zip(self.columns["id"], range(self.base_count)))
+        return self._rows
+
+    def __getitem__(self, task_id):
+        if task_id in self.added: return self.added[task_id]
+        i = self.rows[task_id]; columns = self.columns; robot = columns["robot"][i]
+        return ArchivedTask(task_id, self.waypoint_names[columns["target"][i]], columns["priority"][i], ev.TASK_STATUSES[columns["status"][i]],
+                            columns["created_at"][i], _untime(columns["completed_at"][i]), _untime(columns["completion_time"][i]),
+                            None if robot == ev.NO_ROBOT else self.robot_ids[robot])
+
+    def __contains__(self, task_id):
+        return task_id in self.added or task_id in self.rows
+
+    def __setitem__(self, task_id, record):
+        if task_id in self.rows: raise KeyError(f"task {task_id} is already archived")
+        self.added[task_id] = record
+
+    def __delitem__(self, task_id):
+        raise TypeError("archived tasks are never removed")
+
+    def __iter__(self):
+        yield from self.columns["id"]
+        yield from self.added
+
+    def __len__(self):
+        return self.base_count + len(self.added)
+
+def _restore_robots(sim, columns, robot_ids, waypoint_names, tasks):
+    sim.robots = {}; offset = 0
+    for i, robot_id in enumerate(robot_ids):
+        robot = sim.robots[robot_id] = sim.robot_class(sim, robot_id, (columns["pos_r"][i], columns["pos_c"][i]))
+        length = columns["path_length"][i]; cells = columns["path"][offset:offset + 2 * length]; offset += 2 * length
+        robot.path = list(zip(cells[::2], cells[1::2])); robot.path_index = columns["path_index"][i]
+        robot.energy = columns["energy"][i]; robot.status = ev.ROBOT_STATUSES[columns["status"][i]]
+        robot.current_task_id = columns["task"][i] or None
+        target = columns["target"][i]; robot.target_waypoint = None if target == NO_WAYPOINT else waypoint_names[target]
+        robot.assigned_tick = None if columns["assigned_tick"][i] == NONE_TICK else columns["assigned_tick"][i]
+        robot.pending_bid_task = tasks.get(columns["pending_task"][i])
+        robot.plan_tick = None if columns["plan_tick"][i] == NONE_TICK else columns["plan_tick"][i]; robot.plan_broken = bool(columns["plan_broken"][i])
+
+def _load_stats(stats, state):
+    stats.count, stats.total, stats.min, stats.max, estimators = state
+    for estimator, (heights, positions, desired) in zip(stats.quantiles.values(), estimators):
+        estimator.heights = heights; estimator.positions = positions; estimator.desired = desired
+    return stats
+
+def _restore_metrics(metrics, state):
+    metrics.robot_status = Counter(state["robot_status"]); metrics.task_status = Counter(state["task_status"])
+    metrics.tasks_created = state["tasks_created"]
+    _load_stats(metrics.completion, state["completion"]); _load_stats(metrics.assignment, state["assignment"])
+    for table, pairs in ((metrics.by_priority, state["by_priority"]), (metrics.by_waypoint, state["by_waypoint"])):
+        table.clear(); table.update((key, tuple(_load_stats(LatencyStats(), s) for s in pair)) for key, pair in pairs)
+
+# --- Files ---
+def write_file(path, data):
+    """Atomic replace: a crash mid-write leaves the previous snapshot intact."""
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f: f.write(data); f.flush(); os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+def save(sim, path, extra=None):
+    write_file(path, capture(sim, extra))
+
+def load(path, verbose=False, event_log=None):
+    with open(path, "rb") as f: return restore(f.read(), verbose, event_log)
+
+class SnapshotWriter:
+    """Encodes and writes snapshots on a background thread. submit() takes snapshot bytes or Snapshotter.freeze()
+    output; if one is still being written, only the newest waiting one is kept."""
+    def __init__(self, path):
+        self.path = path; self.pending = None; self.written = 0; self.error = None
+        self.condition = threading.Condition(); self.closed = False
+        self.thread = threading.Thread(target=self._run, daemon=True); self.thread.start()
+
+    def submit(self, data):
+        with self.condition: self.pending = data; self.condition.notify()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed: self.condition.wait()
+                data = self.pending; self.pending = None
+                if data is None: return
+            try: write_file(self.path, data if isinstance(data, bytes) else encode(data)); self.written += 1
+            except OSError as error: self.error = error
+
+    def close(self):
+        """Waits for the last submitted snapshot to be written."""
+        with self.condition: self.closed = True; self.condition.notify()
+        self.thread.join()
+
+# --- Timing Tool ---
+def main(argv=None):
+    import argparse
+    import time
+    parser = argparse.ArgumentParser(description="Time snapshot capture and restore, or describe a snapshot file.")
+    parser.add_argument("path", nargs="?", help="snapshot file to describe (default: build a synthetic state and time it)")
+    parser.add_argument("--robots", type=int, default=1000)
+    parser.add_argument("--tasks", type=int, default=50000, help="archived tasks in the synthetic state")
+    parser.add_argument("--ticks", type=int, default=200, help="ticks to run the synthetic fleet before timing")
+    args = parser.parse_args(argv)
+    if args.path:
+        meta, _, sections = read(open(args.path, "rb").read()); tick, task_counter = meta["counters"][:2]
+        print(f"tick {tick}: {len(meta['robots'])} robots, {len(sections['tasks']['id'])} live tasks, "
+              f"{len(sections['archive']['id'])} archived, {task_counter} created")
+        return
+    side = max(32, int(math.sqrt(args.robots * 8)))
+    waypoints = {"ENT": (1, 1), "A": (side - 2, side - 2), "B": (1, side - 2), "C": (side - 2, 1)}
+    sim = Simulation(seed=0, robot_count=args.robots, grid=Grid(side, side), waypoints=waypoints, moving_obstacles=[], task_rate=args.robots / 10)
+    for name, i in zip(["A", "B", "C"] * args.tasks, range(args.tasks)): # Finished history straight into the archive
+        sim.task_counter += 1; task = Task(sim.task_counter, name, 0.0, 3, waypoints[name]); sim.tasks.add(task)
+        task.completed_at = task.completion_time = 1.0; task.assigned_robot = "R1"; task.status = "COMPLETE"
+    sim.run(args.ticks); snapshotter = Snapshotter(sim)
+    for label in ("first", "next"):
+        start = time.perf_counter(); frozen = snapshotter.freeze(); frozen_at = time.perf_counter(); data = encode(frozen); end = time.perf_counter()
+        print(f"{label} capture: freeze {(frozen_at - start) * 1000:.1f} ms (simulation thread), encode {(end - frozen_at) * 1000:.1f} ms, {len(data) / 1e6:.2f} MB")
+    start = time.perf_counter(); restored = restore(data); elapsed = time.perf_counter() - start
+    print(f"restore: {elapsed * 1000:.1f} ms ({len(restored.robots)} robots, {len(restored.tasks)} tasks)")
+
+if __name__ == "__main__":
+    sys.exit(main())
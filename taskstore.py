@@ -0,0 +1,111 @@
+import heapq
+from collections import namedtuple
+
+# Indexed task storage. The hot set only holds tasks that can still change
+# (announced, bidding, assigned); finished ones are moved into a compact
+# archive so per-tick work stays bounded over long shifts. Tasks report their
+# own status changes to the store, so existing `task.status = ...` writes keep
+# every index in step.
+
+PENDING_STATUSES = ("ANNOUNCED", "BIDDING")
+FINAL_STATUSES = ("COMPLETE", "FAILED")
+ArchivedTask = namedtuple("ArchivedTask", "id target_waypoint priority status created_at completed_at completion_time assigned_robot")
+
+class TrackedTask:
+    """Base for task classes whose status is indexed by a TaskStore."""
+    store = None
+
+    @property
+    def status(self):
+        return self._status
+
+    @status.setter
+    def status(self, value):
+        old = self.__dict__.get("_status"); self._status = value
+        if self.store is not None and old != value: self.store.status_changed(self, old)
+
+class TaskStore:
+    """Tasks by id, bucketed by status, with a priority heap over pending tasks and an archive of finished ones.
+    listener(task, old status, new status) is told about every task added (old None) and every status change."""
+    def __init__(self, listener=None):
+        self.listener = listener
+        self.by_id = {} # Hot tasks only
+        self.buckets = {} # status -> {task id: task}, insertion ordered
+        self.archive = {} # task id -> ArchivedTask
+        self.counts = {} # status -> number of tasks (hot or archived) currently in it
+        self._heap = [] # (priority, created_at, seq, task id) for pending tasks; stale entries skipped lazily
+        self._live = {}; self._seq = 0 # task id -> seq of its live heap entry
+
+    def __len__(self):
+        return len(self.by_id) + len(self.archive)
+
+    def __contains__(self, task_id):
+        return task_id in self.by_id or task_id in self.archive
+
+    def __iter__(self):
+        return iter(list(self.by_id.values()))
+
+    def add(self, task):
+        if task.id in self: raise KeyError(f"duplicate task id {task.id}")
+        task.store = self; self.by_id[task.id] = task
+        if self.listener: self.listener(task, None, task.status)
+        self._enter(task, task.status)
+
+    def load(self, tasks, archive, counts):
+        """Replaces the contents with live tasks (in insertion order), an archive mapping and the per-status counts of
+        the archived tasks, without telling the listener (snapshot restore)."""
+        self.by_id = {}; self.buckets = {}; self.archive = archive; self.counts = dict(counts); self._heap = []; self._live = {}
+        for task in tasks: task.store = self; self.by_id[task.id] = task; self._enter(task, task.status)
+
+    def get(self, task_id):
+        """The live task, or None if it is unknown or archived."""
+        return self.by_id.get(task_id)
+
+    def count(self, status):
+        return self.counts.get(status, 0)
+
+    def with_status(self, status):
+        """Live {task id: task} view of one status bucket; do not mutate it."""
+        return self.buckets.get(status, {})
+
+    def pending(self, limit=None):
+        """Announced and bidding tasks, most urgent (lowest priority number, then oldest) first. A lazy walk of the heap:
+        stale entries are popped off the top and the rest visited in order through a frontier of candidate children, so
+        a caller that stops early pays only for the tasks it saw. Do not add tasks while iterating."""
+        heap = self._heap; live = self._live
+        while heap and live.get(heap[0][3]) != heap[0][2]: heapq.heappop(heap)
+        if len(heap) > 2 * len(live) + 64: self._compact(); heap = self._heap
+        frontier = [(heap[0], 0)] if heap else []; left = limit
+        while frontier and left != 0:
+            entry, i = heapq.heappop(frontier) # Entries are unique (seq), so ties never reach the index
+            if live.get(entry[3]) == entry[2]:
+                yield self.by_id[entry[3]]
+                if left is not None: left -= 1
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap): heapq.heappush(frontier, (heap[child], child))
+
+    def pending_count(self):
+        return sum(len(self.buckets.get(status, ())) for status in PENDING_STATUSES)
+
+    def archived(self, status=None):
+        return (record for record in self.archive.values() if status is None or record.status == status)
+
+    def status_changed(self, task, old):
+        if task.id not in self.by_id: return
+        self.buckets[old].pop(task.id, None); self.counts[old] -= 1
+        if old in PENDING_STATUSES and task.status not in PENDING_STATUSES: del self._live[task.id] # Its heap entry goes stale
+        if self.listener: self.listener(task, old, task.status)
+        self._enter(task, task.status)
+
+    def _enter(self, task, status):
+        self.buckets.setdefault(status, {})[task.id] = task; self.counts[status] = self.counts.get(status, 0) + 1
+        if status in PENDING_STATUSES and task.id not in self._live:
+            self._seq += 1; self._live[task.id] = self._seq
+            heapq.heappush(self._heap, (task.priority, task.created_at, self._seq, task.id))
+        elif status in FINAL_STATUSES:
+            del self.buckets[status][task.id]; del self.by_id[task.id]; self._live.pop(task.id, None)
+            self.archive[task.id] = ArchivedTask(task.id, task.target_waypoint, task.priority, status, task.created_at,
+                                                 getattr(task, "completed_at", None), getattr(task, "completion_time", None), task.assigned_robot)
+
+    def _compact(self):
+        self._heap = [entry for entry in self._heap if self._live.get(entry[3]) == entry[2]]; heapq.heapify(self._heap)
@@ -0,0 +1,40 @@
+import itertools
+import random
+
+import assignment
+from assignment import NO_BID, Assigner, greedy_assignment
+
+def random_costs(rng, n, m, gaps=0.2):
+    return [[NO_BID if rng.random() < gaps else rng.randint(0, 500) for _ in range(m)] for _ in range(n)]
+
+def total(result, row_ids, col_ids, costs):
+    """Objective of a result, with the rows it leaves out costing NO_BID each."""
+    rows = {rid: i for i, rid in enumerate(row_ids)}; cols = {cid: j for j, cid in enumerate(col_ids)}
+    assert len(set(result.values())) == len(result) and all(costs[rows[r]][cols[c]] < NO_BID for r, c in result.items())
+    return sum(costs[rows[r]][cols[c]] for r, c in result.items()) + NO_BID * (min(len(row_ids), len(col_ids)) - len(result))
+
+def brute_force(costs):
+    n, m = len(costs), len(costs[0])
+    if n <= m: return min(sum(costs[i][j] for i, j in enumerate(p)) for p in itertools.permutations(range(m), n))
+    return min(sum(costs[i][j] for j, i in enumerate(p)) for p in itertools.permutations(range(n), m))
+
+def test_matches_brute_force():
+    rng = random.Random(0)
+    for _ in range(300):
+        n, m = rng.randint(1, 6), rng.randint(1, 6); costs = random_costs(rng, n, m)
+        rows = [f"r{i}" for i in range(n)]; cols = [f"c{j}" for j in range(m)]
+        assert total(Assigner().solve(rows, cols, costs), rows, cols, costs) == brute_force(costs)
+
+def test_warm_starts_stay_optimal():
+    rng = random.Random(1); solver = Assigner(); costs = random_costs(rng, 6, 6)
+    for _ in range(200): # Rows and columns come and go, costs drift, as tick to tick
+        rows = sorted(rng.sample(range(8), rng.randint(1, 6))); cols = sorted(rng.sample(range(8), rng.randint(1, 6)))
+        matrix = [[(r * 37 + c * 11 + rng.choice((0, 0, 0, 5))) % 90 for c in cols] for r in rows]
+        assert total(solver.solve(rows, cols, matrix), rows, cols, matrix) == brute_force(matrix)
+
+def test_numpy_and_list_paths_agree(monkeypatch):
+    rng = random.Random(2); costs = random_costs(rng, 80, 90, gaps=0.5); rows = list(range(80)); cols = list(range(90))
+    fast = total(Assigner().solve(rows, cols, costs), rows, cols, costs)
+    monkeypatch.setattr(assignment, "np", None)
+    assert total(Assigner().solve(rows, cols, costs), rows, cols, costs) == fast
+    assert fast <= total(greedy_assignment(rows, cols, costs), rows, cols, costs)
@@ -0,0 +1,22 @@
+import json
+
+import benchmarks
+
+def report(**cases):
+    return {"meta": {}, "results": {name: {"median_s": t, "min_s": t, "repeat": 5} for name, t in cases.items()}}
+
+def test_compare_flags_slowdowns_over_the_threshold():
+    rows, regressions = benchmarks.compare(report(a=1.05, b=1.2, c=0.5, new=1.0), report(a=1.0, b=1.0, c=1.0), threshold=0.1)
+    assert regressions == ["b"] and rows[-1] == ("new", None, 1.0, None) and rows[2][3] == 0.5
+
+def test_suite_exit_status_follows_the_baseline(tmp_path, monkeypatch, capsys):
+    baseline = tmp_path / "base.json"; current = {"run": report(a=1.0)}
+    monkeypatch.setattr(benchmarks, "run_suite", lambda quick, seed: current["run"])
+    assert benchmarks.main(["suite", "--json", str(baseline)]) == 0 and json.loads(baseline.read_text()) == report(a=1.0)
+    current["run"] = report(a=1.02); assert benchmarks.main(["suite", "--baseline", str(baseline)]) == 0
+    current["run"] = report(a=1.5); assert benchmarks.main(["suite", "--baseline", str(baseline)]) == 1
+    assert "REGRESSION" in capsys.readouterr().out
+
+def test_measure_reports_median_and_min():
+    calls = []; stats = benchmarks.measure(lambda: calls.append(1), repeat=3, setup=lambda: calls.append(0))
+    assert calls == [0, 1] * 3 and stats["repeat"] == 3 and 0 <= stats["min_s"] <= stats["median_s"]
@@ -0,0 +1,22 @@
+from pathfinding import astar
+from simulation import Simulation
+
+def test_batched_bids_match_single_robot_bids():
+    sim = Simulation(seed=0, robot_count=8, moving_obstacles=[]); task = sim.create_task("STO")
+    robots = list(sim.robots.values())
+    for i, robot in enumerate(robots): robot.energy = 100 - 7 * i; robot.status = "BIDDING"
+    robots[-1].energy = robots[-1].low_energy_threshold - 1 # Too flat to bid
+    bids = sim.place_bids(task, robots)
+    assert all(robot.status == "IDLE" for robot in robots) and robots[-1].id not in bids
+    for robot in robots[:-1]:
+        expected = astar(sim.grid, robot.pos, task.target_pos)[1] + (100 - robot.energy) / 10 + task.priority * 5
+        assert bids[robot.id] == expected
+        robot.status = "BIDDING"; assert robot.calculate_bid(task) == expected
+
+def test_unreachable_robot_does_not_bid():
+    sim = Simulation(seed=0, moving_obstacles=[]); task = sim.create_task("STO"); robot = sim.robots["R1"]; r, c = robot.pos
+    for dr in (-1, 0, 1):
+        for dc in (-1, 0, 1):
+            if (dr or dc) and 0 <= r + dr < sim.rows and 0 <= c + dc < sim.cols: sim.grid[r + dr][c + dc] = 1; sim.distance_fields.cell_toggled((r + dr, c + dc))
+    robot.status = "BIDDING"
+    assert sim.place_bids(task, [robot]) == {}
@@ -0,0 +1,25 @@
+from cooperative import CooperativePlanner
+from pathfinding import DistanceField, Grid
+from simulation import Simulation
+
+def test_planned_paths_never_conflict():
+    grid = Grid(3, 12); grid.cells[:12] = bytes([1]) * 12; grid.cells[24:] = bytes([1]) * 12; grid[2][5] = 0 # Corridor with one lay-by
+    planner = CooperativePlanner(grid, window=24); still = [bytes(36)]
+    a = planner.plan("A", (1, 0), (1, 11), DistanceField(grid, (1, 11)), 0, still)
+    b = planner.plan("B", (1, 11), (1, 0), DistanceField(grid, (1, 0)), 0, still)
+    assert a[-1] == (1, 11) and b[-1] == (1, 0)
+    at = lambda path, t: path[min(t, len(path) - 1)]
+    for t in range(max(len(a), len(b))):
+        assert at(a, t) != at(b, t)
+        if t: assert (at(a, t - 1), at(a, t)) != (at(b, t), at(b, t - 1)) # No head-on swap
+
+def test_cooperative_fleet_never_shares_a_cell():
+    sim = Simulation(seed=2, task_rate=0.4, robot_count=6, cooperative=True)
+    for _ in range(3000):
+        sim.step(); cells = [r.pos for r in sim.robots.values()]
+        assert len(set(cells)) == len(cells)
+    assert sim.deliveries
+
+def test_surplus_robots_start_at_the_entrance():
+    sim = Simulation(seed=0, robot_count=200)
+    assert len(sim.robots) == 200 and sim.robots["R200"].pos == sim.waypoints["ENT"]
@@ -0,0 +1,23 @@
+import json
+
+from coordinator import Coordinator
+from simulation import Simulation
+from transport import InProcessBroker, InProcessClient
+
+def offer(coordinator, **message):
+    coordinator.ingest.offer(json.dumps(message).encode())
+
+def test_seen_holds_only_live_ids():
+    sim = Simulation(seed=0); coordinator = Coordinator(sim, InProcessClient(InProcessBroker()))
+    offer(coordinator, task_id="a", destination="ICU"); offer(coordinator, task_id="b", destination="EMR")
+    coordinator.tick(); assert coordinator.seen == {"a", "b"}
+    for _ in range(20000):
+        if not coordinator.external: break
+        coordinator.tick()
+    assert not coordinator.external and not coordinator.seen
+
+def test_priorities_match_the_viewer():
+    sim = Simulation(seed=0); coordinator = Coordinator(sim, InProcessClient(InProcessBroker()))
+    offer(coordinator, task_id="a", destination="ICU", priority="High"); offer(coordinator, task_id="b", destination="EMR", priority="urgent")
+    coordinator.tick()
+    assert sorted(task.priority for task in sim.tasks) == [1, 5]
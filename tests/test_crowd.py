@@ -0,0 +1,43 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from crowd import Crowd
+from occupancy import OccupancyIndex
+from pathfinding import Grid
+
+def test_counts_past_255_walkers_in_one_cell():
+    grid = Grid(1, 2); grid[0][1] = 1; occupancy = OccupancyIndex(1, 2) # One free cell: every walker stays put
+    crowd = Crowd(1, 2, seed=0); crowd.bind(grid, occupancy.obstacles)
+    for _ in range(300): crowd.add_walker((0, 0))
+    for _ in range(5): crowd.update()
+    assert occupancy.obstacles[0] == 300 and occupancy.obstacle_at((0, 0))
+
+def test_columns_grow_in_place():
+    crowd = Crowd(10, 10, seed=0); crowd.add_script([(0, 0), (0, 1), (0, 2)], delay=2)
+    for i in range(500): crowd.add_walker((i % 10, i // 10 % 10), delay=3)
+    crowd.add_script([(9, 9), (8, 9)], loop=1)
+    assert len(crowd) == len(crowd.cell) == 502 and len(crowd.script_cells) == 5
+    assert crowd.agents[-1].pos == (9, 9) and crowd.script_start[-1] == 3 and crowd.delay[1:501].tolist() == [3] * 500
+    crowd.update(); crowd.update()
+    assert crowd.agents[0].pos == (0, 1) and crowd.agents[-1].pos == (8, 9)
+
+def occupied(crowd):
+    cells = bytearray(crowd.rows * crowd.cols)
+    for slot in crowd.cell.tolist(): cells[slot] = 1
+    return bytes(cells)
+
+def test_forecast_is_exact_for_scripts():
+    crowd = Crowd(6, 6, seed=0); crowd.bind(Grid(6, 6), OccupancyIndex(6, 6).obstacles)
+    crowd.add_script([(0, 0), (0, 1), (0, 2), (1, 2)], delay=3, loop=1); crowd.add_script([(5, 5), (4, 5)], delay=2, timer=1)
+    forecast = crowd.forecast(20); seen = [occupied(crowd)]
+    for _ in range(20): crowd.update(); seen.append(occupied(crowd))
+    assert forecast == seen
+
+def test_forecast_covers_walkers_and_state_round_trips():
+    grid = Grid(8, 8); grid[3][3] = 1; counts = OccupancyIndex(8, 8).obstacles
+    crowd = Crowd(8, 8, seed=4); crowd.bind(grid, counts); crowd.scatter(grid, 12, delay=1)
+    restored = Crowd.from_state(8, 8, crowd.state()); restored.bind(grid, OccupancyIndex(8, 8).obstacles)
+    for _ in range(30):
+        ahead = crowd.forecast(1)[1]; crowd.update(); restored.update()
+        assert all(ahead[slot] for slot in crowd.cell.tolist()) and crowd.cell.tolist() == restored.cell.tolist()
@@ -0,0 +1,44 @@
+import json
+
+from egress import FleetPublisher, decode_binary, encode_events, encode_status, location_labels
+
+def test_events_burst_over_u16_records():
+    # 400 robots bidding on a 250-task burst: 100000 bids in one flush
+    bids = [(f"burst_{t}", f"R{r}", float(r)) for t in range(250) for r in range(400)]
+    decoded = decode_binary(encode_events(12.5, bids, [("burst_0", "R1", 12.5)]))
+    assert len(decoded["bids"]) == len(bids)
+    assert decoded["bids"][-1] == ["burst_249", "R399", 399.0]
+    assert decoded["complete"] == [["burst_0", "R1", 12.5]]
+
+def test_status_round_trip():
+    records = [("R1", "ENT", 90, "idle"), ("R2", "Grid(3,4)", 300, "charging")]
+    decoded = decode_binary(encode_status(1.0, records, keyframe=True))
+    assert decoded == {"t": 1.0, "keyframe": True, "robots": [["R1", "ENT", 90, "idle"], ["R2", "Grid(3,4)", 255, "unknown"]]}
+
+def test_long_multibyte_ids_truncate_on_a_character():
+    task_id = "é" * 200 # 400 bytes; 255 would split the last character
+    (bid,) = decode_binary(encode_events(0.0, [(task_id, "R1", 1.0)], []))["bids"]
+    assert bid[0] == "é" * 127
+
+class FakeRobot:
+    def __init__(self, robot_id, pos, energy=100.0, status="IDLE"): self.id = robot_id; self.pos = pos; self.energy = energy; self.status = status
+
+def test_location_labels_snap_to_waypoints():
+    labels = location_labels(5, 5, {"ICU": (2, 2)}, snap=1.5)
+    assert labels[2 * 5 + 2] == labels[1 * 5 + 1] == "ICU" and labels[0] == "Grid(0,0)" and labels[2 * 5 + 4] == "Grid(2,4)"
+
+def test_publisher_coalesces_events_and_sends_status_changes():
+    for encoding in ("json", "binary"):
+        sent = []; publisher = FleetPublisher(lambda topic, payload: sent.append((topic, payload)), location_labels(5, 5, {}), 5, encoding,
+                                              interval=5.0, keyframe_every=3)
+        decode = (lambda payload: json.loads(payload)) if encoding == "json" else decode_binary
+        robots = [FakeRobot("R1", (0, 0)), FakeRobot("R2", (1, 1))]
+        publisher.bid("t1", "R1", 12.5, now=0.0); publisher.bid("t1", "R2", 30.0, now=0.0); publisher.task_complete("t0", "R2", now=0.0)
+        publisher.flush(robots, now=0.0)
+        (events, keyframe) = [decode(payload) for _, payload in sent]
+        assert events["bids"] == [["t1", "R1", 12.5], ["t1", "R2", 30.0]] and events["complete"] == [["t0", "R2", 0.0]]
+        assert keyframe["keyframe"] and [robot[0] for robot in keyframe["robots"]] == ["R1", "R2"]
+        sent.clear(); robots[1].pos = (1, 2); publisher.flush(robots, now=1.0); assert sent == [] # Within the interval, no events
+        publisher.flush(robots, now=5.0)
+        (delta,) = [decode(payload) for _, payload in sent]
+        assert not delta["keyframe"] and delta["robots"] == [["R2", "Grid(1,2)", 100, "idle"]]
@@ -0,0 +1,26 @@
+import eventlog as ev
+from simulation import Simulation
+
+def test_obstacle_index_beyond_u16(tmp_path):
+    path = str(tmp_path / "events.log"); obstacles = [[0, 0]] * 70000
+    preamble = {"rows": 2, "cols": 2, "tick_rate": 5, "robots": ["R1"], "positions": [[0, 0]], "energy": [100.0], "statuses": ["IDLE"],
+                "waypoints": {"ENT": [0, 0]}, "obstacles": obstacles}
+    writer = ev.EventLogWriter(path, preamble, bytes(4))
+    for i in (ev.NO_ROBOT, 69999): writer(1, ev.OBSTACLE, ev.NO_ROBOT, i, 1, 1, 0.0, 0)
+    writer.close()
+    state = ev.Replayer(path).seek(2)
+    assert state.obstacles[ev.NO_ROBOT] == (1, 1) and state.obstacles[69999] == (1, 1) and state.obstacles[0] == (0, 0)
+
+def live_state(sim):
+    return {robot.id: (robot.pos, robot.status) for robot in sim.robots.values()}, [o.pos for o in sim.moving_obstacles], bytes(sim.grid.cells)
+
+def test_replay_matches_the_live_run(tmp_path):
+    path = str(tmp_path / "events.log"); sim = Simulation(seed=3, task_rate=0.5, robot_count=6, event_log=path); expected = {}
+    for tick in range(3000):
+        if tick == 1200: sim.toggle_obstacle((8, 1))
+        if tick in (0, 1, 700, 1201, 2999): expected[tick] = live_state(sim)
+        sim.step()
+    sim.close(); replayer = ev.Replayer(path)
+    for tick in (2999, 0, 1201, 700, 1, 2999): # Backwards seeks restart from a checkpoint
+        state = replayer.seek(tick)
+        assert ({robot_id: (state.positions[i], state.statuses[i]) for i, robot_id in enumerate(state.robot_ids)}, state.obstacles, bytes(state.grid)) == expected[tick]
@@ -0,0 +1,20 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from simulation import Simulation
+
+def state(sim):
+    return ([(r.id, r.pos, r.status, round(r.energy, 6), r.current_task_id, r.path_index) for r in sim.robots.values()],
+            sim.wait_ticks, sim.deliveries, {status: n for status, n in sim.metrics.robot_status.items() if n}, sim.metrics.tasks_created)
+
+@pytest.mark.parametrize("options", [{"robot_count": 8}, {"robot_count": 8, "cooperative": True}, {"assignment": "optimal", "robot_count": 8}])
+def test_arrays_fleet_matches_objects(options):
+    objects = Simulation(seed=3, task_rate=0.5, fleet="objects", **options); arrays = Simulation(seed=3, task_rate=0.5, fleet="arrays", **options)
+    for _ in range(1500):
+        objects.step(); arrays.step()
+        assert state(arrays) == state(objects)
+    assert objects.deliveries
+
+def test_unknown_fleet():
+    with pytest.raises(ValueError): Simulation(fleet="dicts")
@@ -0,0 +1,40 @@
+import random
+
+import pytest
+
+from hierarchical import Building, HierarchicalMap, hpa
+from pathfinding import INF, MOVES, Grid, astar
+
+def random_grid(seed, rows=40, cols=40, density=0.2):
+    rng = random.Random(seed)
+    return Grid(rows, cols, bytes(1 if rng.random() < density else 0 for _ in range(rows * cols)))
+
+def path_cost(grid, path):
+    steps = dict(MOVES)
+    assert all(grid[r][c] == 0 for r, c in path)
+    return sum(steps[(b[0] - a[0], b[1] - a[1])] for a, b in zip(path, path[1:]))
+
+def test_hpa_paths_are_valid_and_near_optimal():
+    for seed in range(4):
+        grid = random_grid(seed); rng = random.Random(seed); cells = [grid.pos(i) for i, v in enumerate(grid.cells) if v == 0]
+        for _ in range(25):
+            start, goal = rng.choice(cells), rng.choice(cells); best = astar(grid, start, goal)[1]
+            path, cost = hpa(grid, start, goal, cluster_size=8)
+            if best == INF: assert path is None; continue
+            assert path[0] == start and path[-1] == goal and path_cost(grid, path) == cost and best <= cost <= 1.5 * best + 40
+
+def test_hpa_follows_grid_edits():
+    grid = Grid(20, 20); assert hpa(grid, (0, 0), (19, 0), cluster_size=8)[1] == 190
+    for c in range(19): grid[10][c] = 1 # Wall with a gap at the far end
+    path, cost = hpa(grid, (0, 0), (19, 0), cluster_size=8)
+    assert (10, 19) in path and path_cost(grid, path) == cost
+
+def test_multi_floor_route_takes_the_elevator():
+    floors = [Grid(10, 10), Grid(10, 10)]
+    hierarchy = HierarchicalMap(Building(floors, [((0, 9, 9), (1, 9, 9), 50)]), cluster_size=5)
+    path, cost = hierarchy.find_path((0, 0, 0), (1, 0, 0))
+    assert path[0] == (0, 0, 0) and path[-1] == (1, 0, 0) and ((0, 9, 9), (1, 9, 9)) in zip(path, path[1:])
+    assert cost == 9 * 14 + 50 + 9 * 14
+
+def test_hpa_rejects_a_node_budget():
+    with pytest.raises(ValueError): hpa(Grid(4, 4), (0, 0), (3, 3), max_nodes=10)
@@ -0,0 +1,29 @@
+import json
+
+import hospitalsim
+from ingest import IngestQueue, decode_tasks
+from taskstore import TaskStore
+
+def test_generated_id_skips_explicit_id_later_in_batch(monkeypatch):
+    monkeypatch.setattr(hospitalsim, "tasks", TaskStore(), raising=False); monkeypatch.setattr(hospitalsim, "robots", {}, raising=False)
+    monkeypatch.setattr(hospitalsim, "task_counter", 1, raising=False); monkeypatch.setattr(hospitalsim, "ingest_queue", hospitalsim.IngestQueue())
+    hospitalsim.ingest_queue.offer(json.dumps({"destination": "ICU"}).encode())
+    hospitalsim.ingest_queue.offer(json.dumps({"task_id": "mqtt_2", "destination": "EMR"}).encode())
+    assert hospitalsim.drain_ingest() == 2
+    assert hospitalsim.tasks.get("mqtt_2").target_waypoint == "EMR"
+    assert len(hospitalsim.tasks) == 2
+
+def test_queue_drops_and_signals_backpressure():
+    queue = IngestQueue(capacity=10)
+    assert all(queue.offer(b"x") for _ in range(10)) and not queue.offer(b"x")
+    assert queue.saturated and queue.dropped == 1 and queue.peak == 10
+    assert len(queue.drain(limit=4)) == 4 and queue.saturated # Still above the low-water mark
+    assert len(queue.drain(limit=4)) == 4 and not queue.saturated and queue.stats()["drained"] == 8
+
+def test_decode_sorts_out_bad_and_repeated_payloads():
+    payloads = [b"{not json", b"[1]", json.dumps({"task_id": "a", "destination": "icu"}).encode(), json.dumps({"destination": "ENT"}).encode(),
+                json.dumps({"task_id": "a", "destination": "EMR"}).encode(), json.dumps({"task_id": "old", "destination": "EMR"}).encode(),
+                json.dumps({"destination": "STO", "priority": "high"}).encode()]
+    tasks, rejected = decode_tasks(payloads, hospitalsim.WAYPOINTS, {"old"}.__contains__)
+    assert tasks == [("a", "ICU", "medium"), (None, "STO", "high")]
+    assert rejected == {"malformed": 2, "invalid": 1, "duplicate": 2}
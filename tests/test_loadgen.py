@@ -0,0 +1,11 @@
+import snapshot
+from loadgen import poisson_stream, run_offline
+from simulation import Simulation
+
+def test_resumed_run_completes_tasks(tmp_path):
+    path = str(tmp_path / "shift.snap"); sim = Simulation(seed=0)
+    first = run_offline(poisson_stream(20.0, sim.task_waypoints, 0.5), 0.5, sim, speedup=50.0, drain=2.0, snapshot_path=path)
+    assert first["completed"] and not first["rejected"]
+    resumed = snapshot.load(path); assert resumed.tick
+    second = run_offline(poisson_stream(20.0, resumed.task_waypoints, 0.5), 0.5, resumed, speedup=50.0, drain=2.0)
+    assert second["completed"] >= 1 and second["rejected"] == 0
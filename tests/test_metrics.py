@@ -0,0 +1,20 @@
+import random
+from collections import Counter
+
+from metrics import LatencyStats
+from simulation import Simulation
+
+def test_streaming_percentiles_track_exact_ones():
+    rng = random.Random(0)
+    for draw in (rng.random, lambda: rng.expovariate(0.2), lambda: rng.gauss(30, 5)):
+        samples = [draw() for _ in range(20000)]; stats = LatencyStats()
+        for x in samples: stats.add(x)
+        ordered = sorted(samples); spread = ordered[-1] - ordered[0]
+        assert stats.count == 20000 and stats.min == ordered[0] and stats.max == ordered[-1] and abs(stats.mean - sum(samples) / 20000) < 1e-9
+        for q in (0.5, 0.95, 0.99): assert abs(stats.percentile(q) - ordered[int(q * 20000)]) < 0.02 * spread
+
+def test_counters_follow_the_engine():
+    sim = Simulation(seed=4, task_rate=0.3, robot_count=5); sim.run(4000); metrics = sim.metrics
+    assert +metrics.robot_status == Counter(robot.status for robot in sim.robots.values())
+    assert +metrics.task_status == +Counter(sim.tasks.counts) and metrics.tasks_created == sim.task_counter
+    assert metrics.completion.count == sim.deliveries and metrics.pending_tasks() == sim.tasks.pending_count()
@@ -0,0 +1,23 @@
+from collections import Counter
+
+from occupancy import OccupancyIndex
+from simulation import Simulation
+
+def test_shared_cells_and_piled_obstacles():
+    index = OccupancyIndex(3, 4); a, b = object(), object()
+    index.add_robot(a, (1, 2)); index.add_robot(b, (1, 2))
+    assert index.robot_at((1, 2)) is a and index.robot_at((1, 2), a) is b and index.robot_at((0, 0)) is None
+    index.move_robot(a, (1, 2), (2, 3))
+    assert index.robots[1 * 4 + 2] is b and index.robot_at((2, 3), a) is None
+    for _ in range(300): index.add_obstacle((0, 1)) # Past a byte
+    index.move_obstacle((0, 1), (0, 2))
+    assert index.obstacles[1] == 299 and index.obstacle_at((0, 2)) and not index.obstacle_at((0, 3))
+
+def test_index_tracks_the_fleet():
+    sim = Simulation(seed=2, task_rate=0.5, robot_count=8)
+    for _ in range(6):
+        sim.run(400); occupancy = sim.occupancy
+        robots = {(i // occupancy.cols, i % occupancy.cols): cell for i, cell in enumerate(occupancy.robots) if cell is not None}
+        assert robots == {robot.pos: robot for robot in sim.robots.values()}
+        counts = Counter(o.pos for o in sim.moving_obstacles)
+        assert {(i // occupancy.cols, i % occupancy.cols): n for i, n in enumerate(occupancy.obstacles) if n} == counts
@@ -0,0 +1,83 @@
+import heapq
+import random
+
+from pathfinding import INF, MOVES, DStarLite, DistanceField, DistanceFieldCache, Grid, astar, jps
+
+def random_grid(seed, rows=14, cols=18, density=0.25):
+    rng = random.Random(seed)
+    return Grid(rows, cols, bytes(1 if rng.random() < density else 0 for _ in range(rows * cols)))
+
+def free_cells(grid):
+    return [grid.pos(i) for i, cell in enumerate(grid.cells) if cell == 0]
+
+def dijkstra(grid, source):
+    """Reference octile costs from source to every cell."""
+    dist = {source: 0}; heap = [(0, source)]
+    while heap:
+        d, (r, c) = heapq.heappop(heap)
+        if d > dist[(r, c)]: continue
+        for (dr, dc), cost in MOVES:
+            n = (r + dr, c + dc)
+            if 0 <= n[0] < grid.rows and 0 <= n[1] < grid.cols and grid[n[0]][n[1]] == 0 and d + cost < dist.get(n, INF):
+                dist[n] = d + cost; heapq.heappush(heap, (d + cost, n))
+    return dist
+
+def assert_valid_path(grid, path, cost, start, goal):
+    assert path[0] == start and path[-1] == goal and all(grid[r][c] == 0 for r, c in path)
+    steps = dict(MOVES)
+    assert sum(steps[(b[0] - a[0], b[1] - a[1])] for a, b in zip(path, path[1:])) == cost
+
+def query_pairs(grid, seed, count=30):
+    rng = random.Random(seed); cells = free_cells(grid)
+    return [(rng.choice(cells), rng.choice(cells)) for _ in range(count)]
+
+# --- A* ---
+def test_astar_is_optimal():
+    for seed in range(5):
+        grid = random_grid(seed)
+        for start, goal in query_pairs(grid, seed):
+            path, cost = astar(grid, start, goal); expected = dijkstra(grid, start).get(goal, INF)
+            assert cost == expected
+            if path: assert_valid_path(grid, path, cost, start, goal)
+
+def test_astar_node_budget():
+    grid = Grid(30, 30); path, cost = astar(grid, (0, 0), (29, 29), max_nodes=5)
+    assert path is None and cost == INF and grid.searcher.nodes_expanded == 5
+    assert astar(grid, (0, 0), (29, 29))[1] == 29 * 14
+
+# --- Jump Point Search ---
+def test_jps_matches_astar_cost():
+    for seed in range(8):
+        grid = random_grid(seed, 24, 24, 0.2)
+        for start, goal in query_pairs(grid, seed):
+            path, cost = jps(grid, start, goal)
+            assert cost == astar(grid, start, goal)[1]
+            if path: assert_valid_path(grid, path, cost, start, goal)
+
+# --- D* Lite ---
+def test_dstar_lite_repairs_match_astar():
+    for seed in range(4):
+        grid = random_grid(seed, 20, 20, 0.15); rng = random.Random(seed); start, goal = query_pairs(grid, seed, 1)[0]
+        planner = DStarLite(grid, start, goal); pos = start
+        for _ in range(25):
+            path, cost = planner.replan(pos)
+            assert cost == astar(grid, pos, goal)[1]
+            if path: assert_valid_path(grid, path, cost, pos, goal); pos = path[min(1, len(path) - 1)]
+            for _ in range(3):
+                cell = (rng.randrange(grid.rows), rng.randrange(grid.cols))
+                if cell not in (pos, goal): grid[cell[0]][cell[1]] = 1 - grid[cell[0]][cell[1]]; planner.cell_changed(cell)
+
+# --- Distance Fields ---
+def test_distance_field_matches_dijkstra():
+    for seed in range(5):
+        grid = random_grid(seed); source = free_cells(grid)[0]; field = DistanceField(grid, source); expected = dijkstra(grid, source)
+        assert all(field.cost_from(cell) == expected.get(cell, INF) for cell in free_cells(grid))
+
+def test_cached_fields_follow_toggles():
+    grid = random_grid(1); cells = free_cells(grid); rng = random.Random(1)
+    cache = DistanceFieldCache(grid, {"A": cells[0], "B": cells[-1]})
+    for _ in range(40):
+        r, c = rng.choice([cell for cell in (grid.pos(i) for i in range(len(grid.cells))) if cell not in (cells[0], cells[-1])])
+        grid[r][c] = 1 - grid[r][c]; cache.cell_toggled((r, c))
+        name = rng.choice("AB"); expected = dijkstra(grid, cache.targets[name])
+        assert all(cache.cost(name, cell) == expected.get(cell, INF) for cell in free_cells(grid))
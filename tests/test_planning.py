@@ -0,0 +1,41 @@
+import random
+
+import pytest
+
+from pathfinding import INF, Grid, PathSearch, astar
+from planning import PlanScheduler
+from simulation import Simulation
+
+def random_grid(seed, rows=24, cols=24, density=0.25):
+    rng = random.Random(seed)
+    return Grid(rows, cols, bytes(1 if rng.random() < density else 0 for _ in range(rows * cols)))
+
+def test_sliced_search_matches_astar():
+    for seed in range(5):
+        grid = random_grid(seed); rng = random.Random(seed); cells = [grid.pos(i) for i, cell in enumerate(grid.cells) if cell == 0]
+        for _ in range(20):
+            start, goal = rng.choice(cells), rng.choice(cells); search = PathSearch(grid, start, goal)
+            while not search.run(rng.randint(1, 9)): pass
+            assert (search.path, search.cost) == astar(grid, start, goal)
+
+def test_no_path():
+    grid = Grid(3, 3, bytes([0, 1, 0, 1, 1, 0, 0, 0, 0])); search = PathSearch(grid, (0, 0), (2, 2))
+    assert search.run() and search.path is None and search.cost == INF
+
+def test_budget_is_shared_by_priority():
+    grid = Grid(40, 40, bytes(1 if c == 20 and r else 0 for r in range(40) for c in range(40))); scheduler = PlanScheduler(200, min_slice=10) # A wall to detour around
+    urgent = scheduler.submit("R1", grid, (39, 0), (39, 39), 1); routine = scheduler.submit("R2", grid, (20, 5), (20, 35), 10)
+    assert [key for key, _ in scheduler.pending()] == ["R1", "R2"] and scheduler.run() == []
+    assert urgent.nodes_expanded + routine.nodes_expanded == 200 and urgent.nodes_expanded > routine.nodes_expanded
+    finished = []
+    while scheduler.pending(): finished += [key for key, _ in scheduler.run()]
+    assert finished == ["R1", "R2"] and "R1" not in scheduler and urgent.cost == astar(grid, (39, 0), (39, 39))[1]
+
+def test_budgeted_runs_are_deterministic():
+    runs = [Simulation(seed=4, task_rate=0.5, robot_count=8, plan_budget=300) for _ in range(2)]
+    for sim in runs: sim.run(3000)
+    assert [(r.pos, r.status) for r in runs[0].robots.values()] == [(r.pos, r.status) for r in runs[1].robots.values()]
+    assert runs[0].deliveries == runs[1].deliveries and runs[0].metrics.completion.count > 0 and runs[0].planning.completed > 0
+
+def test_budget_needs_a_flat_planner():
+    with pytest.raises(ValueError): Simulation(plan_budget=100, cooperative=True)
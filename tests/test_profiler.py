@@ -0,0 +1,30 @@
+import itertools
+import json
+
+from profiler import BUCKETS, PhaseStats, Profiler
+from simulation import Simulation
+
+def test_window_percentiles_and_histogram():
+    stats = PhaseStats(window=4)
+    for us in (0.5, 1, 3, 100, 5): stats.add(us * 1e-6, nodes=2)
+    assert stats.count == 5 and stats.total_nodes == 10 and [round(s * 1e6, 6) for s in stats.window()] == [1, 3, 100, 5]
+    assert round(stats.percentile(0.5) * 1e6, 6) == 5 and round(stats.percentile(0.99) * 1e6, 6) == 100
+    histogram = stats.histogram()
+    assert len(histogram) == BUCKETS and histogram[1] == histogram[2] == histogram[3] == histogram[7] == 1 and sum(histogram) == 4
+
+def test_capture_writes_chrome_trace(tmp_path):
+    ticks = itertools.count(); prof = Profiler(clock=lambda: next(ticks) * 1e-6); path = str(tmp_path / "trace.json")
+    prof.capture(1, 1, path)
+    for tick in range(3):
+        prof.tick = tick; t = prof.clock(); t = prof.lap("tick/movement", t); prof.search("astar", t, nodes=7); prof.end_tick(tick + 1)
+    with open(path) as f: events = json.load(f)["traceEvents"]
+    assert [(e["name"], e["cat"], e["dur"], e["args"]) for e in events[1:]] == [("movement", "tick", 1.0, {"tick": 1}), ("astar", "search", 1.0, {"tick": 1, "nodes": 7})]
+    summary = prof.summary()
+    assert summary["search/astar"]["count"] == 3 and summary["search/astar"]["nodes_per_call"] == 7 and len(prof.report_lines()) == 3
+
+def test_profiling_does_not_change_the_run():
+    plain = Simulation(seed=2, task_rate=0.5); profiled = Simulation(seed=2, task_rate=0.5); profiled.profiler = Profiler()
+    plain.run(1500); profiled.run(1500)
+    assert [(r.pos, r.status) for r in plain.robots.values()] == [(r.pos, r.status) for r in profiled.robots.values()]
+    phases = profiled.profiler.summary()
+    assert phases["tick/movement"]["count"] == 1500 and any(name.startswith("search/") for name in phases)
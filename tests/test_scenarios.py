@@ -0,0 +1,16 @@
+from scenarios import expand_sweep, run_sweep, to_columns
+
+SWEEP = {"robots": [2, 4], "seeds": [0, 1], "task_rates": {"busy_icu": {"ICU": 0.2, "STO": 0.05}}, "settings": {"ticks": 1500}}
+
+def without_wall_time(rows):
+    return [{key: value for key, value in row.items() if key != "wall_s"} for row in rows]
+
+def test_sweep_expands_in_a_fixed_order():
+    scenarios = expand_sweep(SWEEP)
+    assert [(s["robots"], s["seed"], s["task_rates_label"]) for s in scenarios] == [(2, 0, "busy_icu"), (2, 1, "busy_icu"), (4, 0, "busy_icu"), (4, 1, "busy_icu")]
+    assert all(s["ticks"] == 1500 and s["planner"] == "astar" for s in scenarios)
+
+def test_results_do_not_depend_on_the_worker_count():
+    serial = run_sweep(SWEEP, workers=1); pooled = run_sweep(SWEEP, workers=3)
+    assert without_wall_time(serial) == without_wall_time(pooled)
+    assert to_columns(serial)["robots"] == [2, 2, 4, 4] and all(row["tasks_created"] for row in serial)
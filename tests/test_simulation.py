@@ -0,0 +1,18 @@
+from simulation import TICK_RATE, Simulation
+
+def fleet_state(sim):
+    return ([(r.id, r.pos, r.status, r.energy) for r in sim.robots.values()], [o.pos for o in sim.moving_obstacles],
+            sorted((t.id, t.status, t.assigned_robot) for t in sim.tasks), dict(sim.tasks.counts))
+
+def test_seeded_runs_are_identical():
+    a = Simulation(seed=7, task_rate=0.3); b = Simulation(seed=7, task_rate=0.3)
+    a.run(3000); b.run(3000)
+    assert a.tick == 3000 and a.now == 3000 / TICK_RATE
+    assert a.deliveries and fleet_state(a) == fleet_state(b)
+
+def test_step_completes_a_task_without_a_display():
+    sim = Simulation(seed=0); task = sim.create_task("ICU")
+    for _ in range(500):
+        if task.status == "COMPLETE": break
+        sim.step()
+    assert task.status == "COMPLETE" and sim.deliveries == 1
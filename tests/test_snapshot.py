@@ -0,0 +1,25 @@
+import pytest
+
+import snapshot
+from simulation import Simulation
+
+def state(sim):
+    return ({r.id: (r.pos, r.status, r.energy, r.current_task_id, tuple(r.path), r.path_index) for r in sim.robots.values()},
+            sorted((t.id, t.status, t.assigned_robot, tuple(sorted(t.bids.items()))) for t in sim.tasks), dict(sim.tasks.archive),
+            sim.metrics.snapshot(), [o.pos for o in sim.moving_obstacles], sim.tick, sim.task_counter)
+
+@pytest.mark.parametrize("options", [{}, {"cooperative": True}, {"planner": "hpa"}, {"assignment": "greedy"}])
+def test_restored_run_is_tick_identical(options):
+    sim = Simulation(seed=5, task_rate=0.6, robot_count=8, **options); sim.run(1500); sim.toggle_obstacle((8, 1))
+    other = snapshot.restore(snapshot.capture(sim, {"external": [[1, "a"]]}))
+    assert other.snapshot_extra == {"external": [[1, "a"]]} and state(other) == state(sim)
+    for _ in range(1500):
+        sim.step(); other.step()
+        assert state(other) == state(sim)
+    assert sim.rng.random() == other.rng.random()
+
+def test_save_and_load(tmp_path):
+    sim = Simulation(seed=1, task_rate=0.3); sim.run(500); path = str(tmp_path / "fleet.snap")
+    snapshot.save(sim, path); other = snapshot.load(path)
+    sim.run(500); other.run(500)
+    assert state(other) == state(sim)
@@ -0,0 +1,29 @@
+import random
+
+import pytest
+
+from taskstore import TaskStore, TrackedTask
+
+class Task(TrackedTask):
+    def __init__(self, task_id, priority, created_at, status="ANNOUNCED"):
+        self.id = task_id; self.priority = priority; self.created_at = created_at; self.target_waypoint = "ICU"
+        self.assigned_robot = None; self.status = status
+
+def test_finished_tasks_move_to_the_archive():
+    changes = []; store = TaskStore(lambda task, old, new: changes.append((task.id, old, new)))
+    task = Task(1, 3, 0.0); store.add(task); task.status = "ASSIGNED"; task.assigned_robot = "R2"; task.status = "COMPLETE"
+    assert 1 in store and store.get(1) is None and list(store) == [] and len(store) == 1
+    assert store.archive[1].status == "COMPLETE" and store.archive[1].assigned_robot == "R2"
+    assert store.count("COMPLETE") == 1 and store.count("ASSIGNED") == 0
+    assert changes == [(1, None, "ANNOUNCED"), (1, "ANNOUNCED", "ASSIGNED"), (1, "ASSIGNED", "COMPLETE")]
+    with pytest.raises(KeyError): store.add(Task(1, 3, 1.0))
+
+def test_pending_in_priority_order():
+    rng = random.Random(3); store = TaskStore(); n = 0
+    for step in range(600):
+        for _ in range(rng.randint(0, 3)): store.add(Task(n, rng.randint(1, 5), float(step))); n += 1
+        live = [task for task in store if task.status in ("ANNOUNCED", "BIDDING")]
+        for task in rng.sample(live, min(len(live), rng.randint(0, 3))): task.status = rng.choice(["BIDDING", "ASSIGNED", "COMPLETE", "FAILED", "ANNOUNCED"])
+        expected = sorted((task for task in store if task.status in ("ANNOUNCED", "BIDDING")), key=lambda task: (task.priority, task.created_at, task.id))
+        assert list(store.pending()) == expected and list(store.pending(limit=4)) == expected[:4]
+        assert store.pending_count() == len(expected)
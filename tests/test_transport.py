@@ -0,0 +1,31 @@
+import json
+
+from transport import InProcessBroker, InProcessClient, topic_matches
+
+def test_topic_filters():
+    assert topic_matches("fleet/#", "fleet/events/bin") and topic_matches("fleet/+", "fleet/status") and topic_matches("#", "a")
+    assert not topic_matches("fleet/+", "fleet/events/bin") and not topic_matches("fleet/status", "fleet") and not topic_matches("a/b", "a/c")
+
+def test_retained_and_single_delivery():
+    broker = InProcessBroker(); publisher = InProcessClient(broker); subscriber = InProcessClient(broker); received = []
+    subscriber.on_message = lambda client, userdata, msg: received.append((msg.topic, msg.payload)); subscriber.connect()
+    publisher.publish("ingest/backpressure", "true", retain=True)
+    subscriber.subscribe("ingest/#"); subscriber.subscribe("ingest/+")
+    publisher.publish("ingest/backpressure", "false"); subscriber.disconnect(); subscriber.loop_forever() # Drains the inbox, then stops
+    assert received == [("ingest/backpressure", b"true"), ("ingest/backpressure", b"true"), ("ingest/backpressure", b"false")]
+    assert broker.delivered == 1
+
+def test_task_round_trip_through_the_coordinator():
+    from coordinator import Coordinator
+    from simulation import Simulation
+    broker = InProcessBroker(); link = InProcessClient(broker); dispatcher = InProcessClient(broker)
+    coordinator = Coordinator(Simulation(seed=0), link); link.connect(); dispatcher.subscribe("fleet/events")
+    dispatcher.publish("tasks/new", json.dumps({"task_id": "rx-1", "destination": "ICU"}))
+    link.disconnect(); link.loop_forever() # Hands the queued payload to the coordinator in this thread
+    coordinator.tick(); assert coordinator.seen == {"rx-1"}
+    for _ in range(20000):
+        if not coordinator.external: break
+        coordinator.tick()
+    events = [json.loads(dispatcher.inbox.get_nowait().payload) for _ in range(dispatcher.inbox.qsize())]
+    assert any(task_id == "rx-1" for event in events for task_id, _, _ in event["bids"])
+    assert [task_id for event in events for task_id, _, _ in event["complete"]] == ["rx-1"]
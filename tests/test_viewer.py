@@ -0,0 +1,46 @@
+import os
+import types
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy"); os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+pygame = pytest.importorskip("pygame")
+
+import final_code
+from simulation import Simulation
+
+real_event_get = pygame.event.get
+
+@pytest.fixture
+def font():
+    pygame.init(); yield pygame.font.Font(None, 24); pygame.quit()
+
+def test_static_layer_repaints_only_toggled_cells(font):
+    sim = Simulation(seed=0); layer = final_code.StaticLayer(font); size = final_code.CELL_SIZE
+    assert layer.sync(sim) == [layer.surface.get_rect()] and layer.sync(sim) == []
+    assert sim.toggle_obstacle((8, 1))
+    (rect,) = layer.sync(sim)
+    assert rect == pygame.Rect(1 * size, 8 * size, size, size) and tuple(layer.surface.get_at(rect.center))[:3] == final_code.OBSTACLE_COLOR
+    assert layer.sync(sim) == []
+
+def test_text_cache_reuses_surfaces(font):
+    cache = final_code.TextCache(limit=2); surface = cache.render(font, "R1", final_code.BLACK)
+    assert cache.render(font, "R1", final_code.BLACK) is surface
+    cache.render(font, "R2", final_code.BLACK); cache.render(font, "R3", final_code.BLACK) # Full: starts over
+    assert list(cache.surfaces) == [("R3", font, final_code.BLACK)]
+
+def run_viewer(monkeypatch, frame_times, tick_rate):
+    """Runs main() for len(frame_times) frames on a fake wall clock (seconds since start per frame); returns the engine."""
+    clock = iter([0.0] + list(frame_times)); frames = iter(range(len(frame_times) + 1)); sims = []
+    monkeypatch.setattr(final_code, "time", types.SimpleNamespace(perf_counter=lambda: next(clock)))
+    monkeypatch.setattr(pygame.event, "get", lambda: real_event_get() if next(frames) < len(frame_times) else [pygame.event.Event(pygame.QUIT)])
+    monkeypatch.setattr(final_code, "Simulation", lambda **options: sims.append(Simulation(**options)) or sims[-1])
+    with pytest.raises(SystemExit): final_code.main(seed=0, tick_rate=tick_rate, render_fps=10000)
+    return sims[0]
+
+def test_tick_rate_is_independent_of_frame_rate(monkeypatch):
+    assert run_viewer(monkeypatch, [k * 0.125 for k in range(1, 41)], 4).tick == 20 # 8 frames per simulated second
+    assert run_viewer(monkeypatch, [k * 0.5 for k in range(1, 11)], 4).tick == 20 # 2 frames per simulated second
+
+def test_stall_runs_at_most_the_catch_up_budget(monkeypatch):
+    assert run_viewer(monkeypatch, [100.0], 4).tick == final_code.MAX_CATCHUP_TICKS
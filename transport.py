@@ -0,0 +1,93 @@
+import queue
+import threading
+
+# Message transports. Anything MQTT-facing in this tree talks to a client
+# object with the subset of the paho-mqtt Client API it actually uses:
+#   on_connect(client, userdata, flags, rc, properties) / on_disconnect / on_message(client, userdata, msg)
+#   connect(host, port, keepalive), loop_forever(), loop_start(), disconnect()
+#   subscribe(topic, qos), publish(topic, payload, qos, retain)
+# A paho Client satisfies it as is. InProcessBroker / InProcessClient below are
+# a stand-in with the same surface and MQTT topic semantics (+ / # wildcards,
+# retained messages) for tests and load runs without a network.
+
+_STOP = object() # Inbox sentinel that ends loop_forever()
+
+class Message:
+    """What on_message() receives, shaped like paho's MQTTMessage."""
+    __slots__ = ("topic", "payload", "qos", "retain")
+    def __init__(self, topic, payload, qos=0, retain=False):
+        self.topic = topic; self.payload = payload; self.qos = qos; self.retain = retain
+
+def topic_matches(pattern, topic):
+    """MQTT filter matching: + is one level, a trailing # any number of levels."""
+    pattern_levels = pattern.split("/"); topic_levels = topic.split("/")
+    for i, level in enumerate(pattern_levels):
+        if level == "#": return True
+        if i >= len(topic_levels) or (level != "+" and level != topic_levels[i]): return False
+    return len(pattern_levels) == len(topic_levels)
+
+class InProcessBroker:
+    """Routes messages between InProcessClients in one process. Delivery only queues the message in each matching
+    client's inbox; the client's own loop thread runs its on_message, as paho's network thread would."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = {} # filter -> set of clients
+        self.retained = {} # topic -> last retained Message
+        self.published = 0; self.delivered = 0
+
+    def subscribe(self, client, pattern):
+        with self.lock:
+            self.subscriptions.setdefault(pattern, set()).add(client)
+            retained = [message for topic, message in self.retained.items() if topic_matches(pattern, topic)]
+        for message in retained: client.inbox.put(message)
+
+    def unsubscribe_all(self, client):
+        with self.lock:
+            for clients in self.subscriptions.values(): clients.discard(client)
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        message = Message(topic, payload, qos, retain)
+        with self.lock:
+            self.published += 1
+            if retain: self.retained[topic] = message
+            targets = {client for pattern, clients in self.subscriptions.items() if topic_matches(pattern, topic) for client in clients}
+            self.delivered += len(targets)
+        for client in targets: client.inbox.put(message) # One delivery per client even if several of its filters match
+
+class InProcessClient:
+    """paho-style client for an InProcessBroker."""
+    def __init__(self, broker, client_id=None):
+        self.broker = broker; self.client_id = client_id; self.userdata = None
+        self.on_connect = None; self.on_disconnect = None; self.on_message = None
+        self.inbox = queue.SimpleQueue(); self.connected = False; self.thread = None
+
+    def connect(self, host=None, port=None, keepalive=None):
+        self.connected = True
+        if self.on_connect: self.on_connect(self, self.userdata, {}, 0, None)
+        return 0
+
+    def disconnect(self):
+        if not self.connected: return
+        self.connected = False; self.broker.unsubscribe_all(self); self.inbox.put(_STOP)
+        if self.on_disconnect: self.on_disconnect(self, self.userdata, 0, None)
+
+    def subscribe(self, topic, qos=0):
+        self.broker.subscribe(self, topic)
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        if isinstance(payload, str): payload = payload.encode("utf-8") # Subscribers always get bytes, as from paho
+        self.broker.publish(topic, payload, qos, retain)
+
+    def loop_forever(self):
+        """Dispatches incoming messages to on_message until disconnect()."""
+        while True:
+            message = self.inbox.get()
+            if message is _STOP: return
+            if self.on_message: self.on_message(self, self.userdata, message)
+
+    def loop_start(self):
+        self.thread = threading.Thread(target=self.loop_forever, daemon=True); self.thread.start()
+
+    def loop_stop(self):
+        self.disconnect()
+        if self.thread: self.thread.join(); self.thread = None